@@ -0,0 +1,329 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Optional
+
+from app.bgjob.jobs import (
+    PROCESS_FINISHED,
+    PROCESS_NOT_STARTED,
+    PROCESS_STARTED,
+    PROCESS_TERMINATED,
+    BatchJob,
+)
+from app.models.main import Job
+from django.db.models import Q
+from django.utils.timezone import make_aware
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+# format of the times in the status files and logs written by process_executor
+JOB_TIME_FORMAT = "%Y%m%d%H%M%S%f"
+
+
+def get_dump_jobs(concurrent_dumps: int = 1) -> int:
+    """Returns the number of pg_dump workers of a directory backup.
+
+    Args:
+        concurrent_dumps (int, optional): Backups expected to run at the same time and
+            share the cores. Defaults to 1.
+
+    Returns:
+        int: The cores available to one backup, at least 1 and at most
+            BACKUP_MAX_DUMP_JOBS.
+    """
+    cores = os.cpu_count() or 1
+    return max(
+        1, min(settings.BACKUP_MAX_DUMP_JOBS, cores // max(1, concurrent_dumps))
+    )
+
+
+class BackupGroup:
+    """
+    The per database jobs of a backup of several databases.
+
+    Attributes:
+        job (BatchJob): The parent job, whose log and status the scheduler writes.
+        total (int): Number of databases.
+        start_time (str): Start of the backup, as written to the status file.
+        finished (int): Number of databases done.
+        failed (list): Databases whose backup failed or was cancelled.
+    """
+
+    def __init__(self, job: BatchJob, total: int) -> None:
+        self.job = job
+        self.total = total
+        self.start_time = datetime.now().strftime(JOB_TIME_FORMAT)
+        self.finished = 0
+        self.failed = []
+
+    def log(self, message: str) -> None:
+        try:
+            with open(self.job.stdout, "a", encoding="utf-8") as fp:
+                fp.write(f"{datetime.now().strftime(JOB_TIME_FORMAT)},{message}\n")
+        except OSError:
+            # the parent job was deleted meanwhile
+            pass
+
+    def write_status(self, **status) -> None:
+        try:
+            with open(os.path.join(self.job.log_dir, "status"), "w") as fp:
+                json.dump({"start_time": self.start_time, **status}, fp)
+        except OSError:
+            pass
+
+
+class BackupScheduler:
+    """
+    Starts backup jobs, at most BACKUP_MAX_CONCURRENT_JOBS of them at the same time.
+
+    Jobs over the limit wait in a queue, in submission order, whoever submitted them.
+    One thread checks the running jobs every BACKUP_SCHEDULER_INTERVAL seconds and
+    starts queued ones as they finish. A backup of several databases runs one job per
+    database under a parent job that has no process of its own: the scheduler logs
+    every database of it as it starts and finishes, and ends its status with the last
+    one, with exit code 1 if any of them failed.
+
+    Attributes:
+        _queue (deque): BatchJob waiting to be started.
+        _running (dict): Started BatchJob keyed by job id.
+        _groups (dict): BackupGroup keyed by parent job id.
+        _lock (threading.RLock): A lock guarding the queue, the running jobs and the groups.
+        _wakeup (threading.Event): Wakes the thread up when jobs are submitted.
+        _thread (Optional[threading.Thread]): The scheduler thread, started on first use.
+    """
+
+    def __init__(self) -> None:
+        self._queue = deque()
+        self._running = {}
+        self._groups = {}
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                name="backup_scheduler", target=self._run, daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, jobs: list[BatchJob], parent: Optional[BatchJob] = None) -> None:
+        """Queues backup jobs and starts as many of them as the limit allows.
+
+        Args:
+            jobs (list[BatchJob]): The jobs, not started yet.
+            parent (Optional[BatchJob], optional): The parent job of the jobs of a backup
+                of several databases. Defaults to None.
+        """
+        with self._lock:
+            if parent is not None:
+                group = BackupGroup(parent, len(jobs))
+                self._groups[str(parent.id)] = group
+                group.write_status()
+                group.log(f"Queued the backups of {len(jobs)} databases")
+                Job.objects.filter(id=parent.id).update(process_state=PROCESS_STARTED)
+            self._queue.extend(jobs)
+        self._dispatch()
+        self._start()
+        self._wakeup.set()
+
+    def cancel(self, job_id) -> None:
+        """Removes a job, or the jobs of a parent job, from the queue.
+
+        Args:
+            job_id: Id of the job or of the parent job.
+        """
+        job_id = str(job_id)
+        with self._lock:
+            cancelled = [
+                job
+                for job in self._queue
+                if str(job.id) == job_id or str(job.parent_id) == job_id
+            ]
+            for job in cancelled:
+                self._queue.remove(job)
+        if not cancelled:
+            return
+        now = make_aware(datetime.now())
+        Job.objects.filter(id__in=[job.id for job in cancelled]).update(
+            start_time=now,
+            end_time=now,
+            exit_code=-1,
+            process_state=PROCESS_TERMINATED,
+        )
+        for job in cancelled:
+            self._finish(job, None, "was cancelled")
+
+    def terminate_orphaned_jobs(self) -> None:
+        """
+        Terminates the jobs a previous server process left behind, called on startup.
+
+        The queue is kept in memory only: jobs still queued when the server stopped
+        would never start, and backups of several databases would never finish. They
+        end with exit code -1. Database backups that were already running are left
+        to finish on their own.
+        """
+        now = make_aware(datetime.now())
+        with self._lock:
+            queued = {str(job.id) for job in self._queue}
+        candidates = Job.objects.filter(
+            Q(process_state__isnull=True) | Q(process_state=PROCESS_NOT_STARTED),
+            exit_code__isnull=True,
+            end_time__isnull=True,
+        )
+        orphans = [
+            job.id
+            for job in candidates
+            if str(job.id) not in queued
+            # process_executor writes the status of a job that ran
+            and not os.path.isfile(os.path.join(job.logdir, "status"))
+        ]
+        Job.objects.filter(id__in=orphans, start_time__isnull=True).update(
+            start_time=now
+        )
+        Job.objects.filter(id__in=orphans).update(
+            end_time=now, exit_code=-1, process_state=PROCESS_TERMINATED
+        )
+
+        parents = Job.objects.filter(
+            children__isnull=False, exit_code__isnull=True
+        ).distinct()
+        for parent in parents:
+            if str(parent.id) in self._groups:
+                continue
+            _, updated = BatchJob.update_job_info(parent)
+            if parent.exit_code is not None:
+                if updated:
+                    parent.save()
+                continue
+            group = BackupGroup(BatchJob(id=parent.id), parent.children.count())
+            try:
+                with open(os.path.join(parent.logdir, "status")) as fp:
+                    group.start_time = json.load(fp).get("start_time", group.start_time)
+            except (OSError, ValueError):
+                pass
+            group.log("The server restarted before the databases were backed up")
+            group.write_status(
+                end_time=datetime.now().strftime(JOB_TIME_FORMAT), exit_code=-1
+            )
+            Job.objects.filter(id=parent.id, start_time__isnull=True).update(
+                start_time=now
+            )
+            Job.objects.filter(id=parent.id).update(
+                end_time=now, exit_code=-1, process_state=PROCESS_TERMINATED
+            )
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                idle = not self._queue and not self._running
+            if idle:
+                self._wakeup.wait()
+            else:
+                self._wakeup.wait(settings.BACKUP_SCHEDULER_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self._poll()
+                self._dispatch()
+            except Exception as exc:
+                logger.error("Failed to schedule backup jobs: %s", exc)
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._lock:
+                if (
+                    not self._queue
+                    or len(self._running) >= settings.BACKUP_MAX_CONCURRENT_JOBS
+                ):
+                    return
+                job = self._queue.popleft()
+                # the slot is taken before the job starts outside of the lock
+                self._running[str(job.id)] = job
+            try:
+                job.start()
+            except Exception as exc:
+                logger.error("Failed to start backup job %s: %s", job.id, exc)
+                now = make_aware(datetime.now())
+                Job.objects.filter(id=job.id).update(
+                    start_time=now,
+                    end_time=now,
+                    exit_code=-1,
+                    process_state=PROCESS_FINISHED,
+                )
+                self._finish(job, -1, "failed to start")
+                continue
+            group = self._get_group(job)
+            if group is not None:
+                group.log(f"Started the backup of database '{job.description.database}'")
+
+    def _poll(self) -> None:
+        with self._lock:
+            running = list(self._running.values())
+        for job in running:
+            row = Job.objects.filter(id=job.id).first()
+            if row is not None:
+                _, updated = BatchJob.update_job_info(row)
+                if updated:
+                    row.save(
+                        update_fields=[
+                            "start_time",
+                            "end_time",
+                            "exit_code",
+                            "utility_pid",
+                        ]
+                    )
+                if row.exit_code is None:
+                    continue
+                self._finish(job, row.exit_code)
+            else:
+                # deleted while it ran
+                self._finish(job, None, "was deleted")
+
+    def _get_group(self, job: BatchJob) -> Optional[BackupGroup]:
+        if job.parent_id is None:
+            return None
+        with self._lock:
+            return self._groups.get(str(job.parent_id))
+
+    def _finish(
+        self, job: BatchJob, exit_code: Optional[int], outcome: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            self._running.pop(str(job.id), None)
+            group = self._get_group(job)
+            if group is None:
+                return
+            database = job.description.database
+            group.finished += 1
+            if exit_code != 0:
+                group.failed.append(database)
+            if outcome is None:
+                outcome = f"finished with exit code {exit_code}"
+            group.log(
+                f"The backup of database '{database}' {outcome} "
+                f"({group.finished} of {group.total})"
+            )
+            if group.finished < group.total:
+                return
+            del self._groups[str(job.parent_id)]
+            if group.failed:
+                group.log(
+                    f"{len(group.failed)} of {group.total} database backups failed: "
+                    + ", ".join(group.failed)
+                )
+            else:
+                group.log(f"Backed up {group.total} databases")
+            group.write_status(
+                end_time=datetime.now().strftime(JOB_TIME_FORMAT),
+                exit_code=1 if group.failed else 0,
+            )
+
+
+backup_scheduler = BackupScheduler()
@@ -1,7 +1,6 @@
 import csv
 import json
 import os
-import re
 import secrets
 import shutil
 import string
@@ -13,9 +12,11 @@ from pickle import dumps, loads
 from subprocess import Popen
 
 import psutil
+from app.bgjob.log_tailer import LogTail
 from app.models.main import Connection, Job
 from app.views.polling import get_duration
 from django.utils.timezone import make_aware
+from pgmanage import settings
 from pgmanage.settings import HOME_DIR
 
 PROCESS_NOT_STARTED = 0
@@ -51,6 +52,7 @@ class BatchJob:
         ) = self.stderr = self.start_time = self.end_time = self.exit_code = None
         self.env = dict()
         self.user = kwargs.get("user", None)
+        self.parent_id = kwargs.get("parent_id", None)
         if "id" in kwargs:
             self._retrieve_job(kwargs["id"])
         else:
@@ -79,9 +81,13 @@ class BatchJob:
         self.exit_code = job.exit_code
         self.process_state = job.process_state
         self.user = job.user
+        self.parent_id = job.parent_id
 
     def _create_job(self, description, command, args):
         current_time = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        # jobs created in a loop can share a clock tick where the clock is coarse
+        while Job.objects.filter(id=current_time).exists():
+            current_time = datetime.now().strftime("%Y%m%d%H%M%S%f")
         log_dir = os.path.join(HOME_DIR, "process_logs", str(self.user.id))
 
         def random_number(size):
@@ -134,6 +140,7 @@ class BatchJob:
             description=tmp_desc,
             user=self.user,
             connection=connection,
+            parent_id=self.parent_id,
         )
         job.save()
 
@@ -210,50 +217,24 @@ class BatchJob:
             job.process_state = PROCESS_STARTED
             job.save()
 
-    def read_log(
-        self, logfile, log, pos, ctime, ecode=None, enc="utf-8", all_records=False
-    ):
-        completed = True
-        idx = 0
-        c = re.compile(r"(\d+),(.*$)")
-
+    def read_log(self, logfile, log, pos, ecode=None, enc="utf-8", all_records=False):
         # If file is not present then
         if not os.path.isfile(logfile):
             return 0, True
 
-        with open(logfile, "rb") as f:
-            eofs = os.fstat(f.fileno()).st_size
-            f.seek(pos, 0)
-            if pos == eofs and ecode is None:
-                completed = False
-
-            while pos < eofs:
-                idx += 1
-                line = f.readline()
-                line = line.decode(enc, "replace")
-                r = c.split(line)
-                if len(r) < 3:
-                    # ignore this line
-                    pos = f.tell()
-                    continue
-                if r[1] > ctime:
-                    completed = False
-                    break
-                log.append([r[1], r[2]])
-                pos = f.tell()
-                if idx >= 1024 and not all_records:
-                    completed = False
-                    break
-                if pos == eofs:
-                    if ecode is None:
-                        completed = False
-                    break
-
-        return pos, completed
+        tail = LogTail(logfile, pos, enc)
+        try:
+            lines, at_end = tail.read(
+                sys.maxsize if all_records else settings.JOB_LOG_BATCH_LINES,
+                finished=ecode is not None,
+            )
+        finally:
+            tail.close()
+        log.extend(lines)
 
-    def status(self, out=0, err=0):
-        ctime = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        return tail.pos, at_end and ecode is not None
 
+    def status(self, out=0, err=0):
         stdout = []
         stderr = []
         out_completed = err_completed = False
@@ -283,10 +264,10 @@ class BatchJob:
 
             if process_output:
                 out, out_completed = self.read_log(
-                    self.stdout, stdout, out, ctime, self.exit_code, enc, all_records
+                    self.stdout, stdout, out, self.exit_code, enc, all_records
                 )
                 err, err_completed = self.read_log(
-                    self.stderr, stderr, err, ctime, self.exit_code, enc, all_records
+                    self.stderr, stderr, err, self.exit_code, enc, all_records
                 )
         else:
             out_completed = err_completed = False
@@ -433,19 +414,14 @@ class BatchJob:
         if job is None:
             raise LookupError(PROCESS_NOT_FOUND)
 
-        logdir = job.logdir
+        logdirs = [job.logdir] + list(job.children.values_list("logdir", flat=True))
 
-        try:
-            process = psutil.Process(job.utility_pid)
-            process.terminate()
-        except psutil.NoSuchProcess:
-            job.process_state = PROCESS_TERMINATED
-        except psutil.Error as error:
-            raise
+        BatchJob._terminate(job)
 
         job.delete()
 
-        shutil.rmtree(logdir, True)
+        for logdir in logdirs:
+            shutil.rmtree(logdir, True)
 
     @staticmethod
     def stop_job(job_id, user):
@@ -454,17 +430,41 @@ class BatchJob:
         if job is None:
             raise LookupError(PROCESS_NOT_FOUND)
 
-        try:
-            process = psutil.Process(job.utility_pid)
-            process.terminate()
+        BatchJob._terminate(job)
 
-            job.process_state = PROCESS_TERMINATED
-        except psutil.NoSuchProcess:
-            job.process_state = PROCESS_TERMINATED
-        except psutil.Error as error:
-            raise
+        job.process_state = PROCESS_TERMINATED
+        # the row of a queued job was updated by the scheduler
+        job.save(update_fields=["process_state"])
 
-        job.save()
+    @staticmethod
+    def _terminate(job):
+        """
+        Stops a job, a queued one is not started anymore and the jobs of a backup of
+        several databases are stopped with their parent.
+        :param job: Job.
+        """
+        # avoid a cycle with backup_scheduler, which imports this module
+        from app.bgjob.backup_scheduler import backup_scheduler
+
+        backup_scheduler.cancel(job.id)
+
+        running = [job]
+        for child in job.children.all():
+            BatchJob.update_job_info(child)
+            if child.exit_code is None:
+                running.append(child)
+
+        for running_job in running:
+            # a queued job has no process yet, Process(None) would be this one
+            if running_job.utility_pid is None:
+                continue
+            try:
+                process = psutil.Process(running_job.utility_pid)
+                process.terminate()
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.Error as error:
+                raise
 
 
 def escape_dquotes_process_arg(arg):
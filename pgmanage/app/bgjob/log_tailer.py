@@ -0,0 +1,330 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from app.client_manager.client_manager import Client, client_manager
+from app.models.main import Job
+from app.views.polling import ResponseType, get_duration
+from django.db import DatabaseError
+from django.utils.timezone import make_aware
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+# process_executor prefixes every line with a %Y%m%d%H%M%S%f timestamp and a comma
+LOG_TIMESTAMP_LENGTH = 20
+LOG_LINE_REGEX = re.compile(rb"(\d+),(.*)", re.DOTALL)
+
+
+def get_log_encoding() -> str:
+    encoding = sys.getdefaultencoding()
+    return "utf-8" if encoding == "ascii" else encoding
+
+
+def parse_log_lines(data: bytes, encoding: str) -> list[list[str]]:
+    """Parses complete lines of a job log.
+
+    Args:
+        data (bytes): Lines read from the log, each ending with a newline.
+        encoding (str): Encoding of the messages.
+
+    Returns:
+        list[list[str]]: [timestamp, message] of every line, lines without a timestamp
+            are skipped.
+    """
+    lines = []
+    for line in data.split(b"\n")[:-1]:
+        # fast path for the lines written by process_executor
+        if (
+            len(line) > LOG_TIMESTAMP_LENGTH
+            and line[LOG_TIMESTAMP_LENGTH] == 44
+            and line[:LOG_TIMESTAMP_LENGTH].isdigit()
+        ):
+            lines.append(
+                [
+                    line[:LOG_TIMESTAMP_LENGTH].decode("ascii"),
+                    line[LOG_TIMESTAMP_LENGTH + 1 :].decode(encoding, "replace"),
+                ]
+            )
+            continue
+        match = LOG_LINE_REGEX.search(line)
+        if match:
+            lines.append(
+                [
+                    match.group(1).decode("ascii"),
+                    match.group(2).decode(encoding, "replace"),
+                ]
+            )
+    return lines
+
+
+class LogTail:
+    """
+    Reads the lines appended to a job log, keeping the file open between reads.
+
+    Attributes:
+        path (str): Path of the log.
+        pos (int): Offset of the first line not read yet.
+        encoding (str): Encoding of the messages.
+    """
+
+    def __init__(self, path: str, pos: int = 0, encoding: Optional[str] = None) -> None:
+        self.path = path
+        self.pos = pos
+        self.encoding = encoding or get_log_encoding()
+        self._handle = None
+        # start of a line that is still being written
+        self._pending = b""
+
+    def _open(self) -> bool:
+        if self._handle is None:
+            try:
+                self._handle = open(self.path, "rb")
+            except OSError:
+                return False
+            self._handle.seek(self.pos)
+        return True
+
+    def has_data(self) -> bool:
+        """
+        Tells whether the log grew since the last read.
+        """
+        if not self._open():
+            return False
+        return os.fstat(self._handle.fileno()).st_size > self._handle.tell()
+
+    def read(self, max_lines: int, finished: bool = False) -> tuple[list, bool]:
+        """Reads the complete lines appended since the last read.
+
+        Lines are read in chunks of JOB_LOG_READ_SIZE bytes until at least max_lines
+        lines were read or the end of the log is reached.
+
+        Args:
+            max_lines (int): Number of lines after which reading stops.
+            finished (bool, optional): Whether the job is over, a last line without a
+                newline is then returned as well. Defaults to False.
+
+        Returns:
+            tuple[list, bool]: The [timestamp, message] lines and whether the end of
+                the log was reached.
+        """
+        lines = []
+        if not self._open():
+            return lines, True
+        while len(lines) < max_lines:
+            chunk = self._handle.read(settings.JOB_LOG_READ_SIZE)
+            if not chunk:
+                break
+            data = self._pending + chunk
+            end = data.rfind(b"\n") + 1
+            self._pending = data[end:]
+            lines.extend(parse_log_lines(data[:end], self.encoding))
+        at_end = not self.has_data()
+        if finished and at_end and self._pending:
+            lines.extend(parse_log_lines(self._pending + b"\n", self.encoding))
+            self._pending = b""
+        self.pos = self._handle.tell() - len(self._pending)
+        return lines, at_end
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class JobWatch:
+    """
+    A client following the progress of a job.
+
+    Attributes:
+        client (Client): The client the progress is pushed to.
+        context_code (str): Context code of the watch request.
+        job (Job): The job, refreshed from its status file when that changes.
+        out (LogTail): The stdout log.
+        err (LogTail): The stderr log.
+        status_mtime (Optional[float]): Modification time of the status file last read.
+        last_sent (float): Monotonic time of the last progress report.
+    """
+
+    def __init__(
+        self, client: Client, context_code: str, job: Job, out: int, err: int
+    ) -> None:
+        self.client = client
+        self.context_code = context_code
+        self.job = job
+        encoding = get_log_encoding()
+        self.out = LogTail(os.path.join(job.logdir, "out"), out, encoding)
+        self.err = LogTail(os.path.join(job.logdir, "err"), err, encoding)
+        self.status_mtime: Optional[float] = None
+        self.last_sent = 0
+
+    def close(self) -> None:
+        self.out.close()
+        self.err.close()
+
+
+class JobWatcher:
+    """
+    Pushes the log lines and state of background jobs to the clients watching them.
+
+    One thread serves every watch. It checks the open logs for new data every
+    JOB_LOG_POLL_INTERVAL seconds and sends what was appended in batches of
+    JOB_LOG_BATCH_LINES lines. The Job row and the status file are only read again when
+    the status file changes, a report with just the duration is sent every
+    JOB_PROGRESS_INTERVAL seconds while the job runs. A watch ends with the report
+    in which both logs are done.
+
+    Attributes:
+        _watches (dict): JobWatch keyed by client id and job id.
+        _lock (threading.Lock): A lock guarding _watches.
+        _wakeup (threading.Event): Wakes the thread up when a watch is added.
+        _thread (Optional[threading.Thread]): The watcher thread, started on first use.
+    """
+
+    def __init__(self) -> None:
+        self._watches = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                name="job_watcher", target=self._run, daemon=True
+            )
+            self._thread.start()
+
+    def watch(
+        self, client: Client, context_code: str, job: Job, out: int = 0, err: int = 0
+    ) -> None:
+        """Starts pushing the progress of a job to a client.
+
+        Args:
+            client (Client): The client.
+            context_code (str): Context code of the reports.
+            job (Job): The job.
+            out (int, optional): Offset in the stdout log to start from. Defaults to 0.
+            err (int, optional): Offset in the stderr log to start from. Defaults to 0.
+        """
+        watch = JobWatch(client, context_code, job, out, err)
+        with self._lock:
+            previous = self._watches.pop((client.id, str(job.id)), None)
+            self._watches[(client.id, str(job.id))] = watch
+        if previous is not None:
+            previous.close()
+        self._start()
+        self._wakeup.set()
+
+    def unwatch(self, client: Client, job_id) -> None:
+        with self._lock:
+            watch = self._watches.pop((client.id, str(job_id)), None)
+        if watch is not None:
+            watch.close()
+
+    def _drop(self, key: tuple, watch: JobWatch) -> None:
+        with self._lock:
+            if self._watches.get(key) is watch:
+                del self._watches[key]
+        watch.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                watches = list(self._watches.items())
+            if not watches:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            busy = False
+            for key, watch in watches:
+                try:
+                    busy = self._tail(key, watch) or busy
+                except Exception as exc:
+                    logger.error("Failed to report progress of job %s: %s", key[1], exc)
+                    self._drop(key, watch)
+            if not busy:
+                self._wakeup.wait(settings.JOB_LOG_POLL_INTERVAL)
+                self._wakeup.clear()
+
+    def _refresh_job(self, watch: JobWatch) -> bool:
+        # only runs until the job recorded its end
+        if watch.job.end_time is not None:
+            return False
+        try:
+            mtime = os.stat(os.path.join(watch.job.logdir, "status")).st_mtime
+        except OSError:
+            return False
+        if mtime == watch.status_mtime:
+            return False
+        watch.status_mtime = mtime
+
+        # avoid a cycle with jobs.py, which imports this module
+        from app.bgjob.jobs import BatchJob
+
+        _, updated = BatchJob.update_job_info(watch.job)
+        if updated:
+            watch.job.save(
+                update_fields=["start_time", "end_time", "exit_code", "utility_pid"]
+            )
+        return updated
+
+    def _tail(self, key: tuple, watch: JobWatch) -> bool:
+        if client_manager.get_client(watch.client.id) is not watch.client:
+            self._drop(key, watch)
+            return False
+        try:
+            changed = self._refresh_job(watch)
+        except DatabaseError:
+            # the job was deleted
+            self._drop(key, watch)
+            return False
+
+        job = watch.job
+        finished = job.exit_code is not None
+        if not (
+            changed
+            or watch.out.has_data()
+            or watch.err.has_data()
+            or finished
+            or time.monotonic() - watch.last_sent >= settings.JOB_PROGRESS_INTERVAL
+        ):
+            return False
+
+        max_lines = settings.JOB_LOG_BATCH_LINES
+        out_lines, out_end = watch.out.read(max_lines, finished)
+        err_lines, err_end = watch.err.read(max_lines, finished)
+        duration = None
+        if job.start_time is not None:
+            duration = get_duration(
+                job.start_time, job.end_time or make_aware(datetime.now())
+            )
+        done = finished and out_end and err_end
+        watch.client.queue_response(
+            {
+                "response_type": ResponseType.JOB_PROGRESS,
+                "context_code": watch.context_code,
+                "data": {
+                    "out": {"pos": watch.out.pos, "lines": out_lines, "done": done},
+                    "err": {"pos": watch.err.pos, "lines": err_lines, "done": done},
+                    "start_time": job.start_time,
+                    "exit_code": job.exit_code,
+                    "duration": duration,
+                },
+            }
+        )
+        watch.last_sent = time.monotonic()
+        if done:
+            self._drop(key, watch)
+            return False
+        return not (out_end and err_end)
+
+
+job_watcher = JobWatcher()
@@ -21,14 +21,18 @@ OUTDIR - Output directory
 import json
 import logging
 import os
+import selectors
 import signal
 import subprocess
 import sys
 from datetime import datetime
-from threading import Thread
+from threading import Lock, Thread
 from typing import Any, Dict, List, Optional
 
 _IS_WIN = os.name == "nt"
+# bytes read from a pipe at once and seconds a pipe of exited processes may stay idle
+LOG_READ_SIZE = 1024 * 64
+LOG_IDLE_TIMEOUT = 1
 sys_encoding = None
 out_dir = None
 log_file = None
@@ -49,11 +53,25 @@ def unescape_dquotes_process_arg(arg):
 
 
 class ProcessLogger(Thread):
+    """
+    Writes the output of the attached pipes to a log file, one timestamped line each.
+
+    Every pipe is drained as soon as it has data, with reads of up to LOG_READ_SIZE
+    bytes, so a process in a pipeline never blocks on a full pipe while the logger
+    waits on another one. The lines of a read are written at once. The logger ends
+    when every pipe is closed, or when every attached process has exited and its pipes
+    stayed idle for LOG_IDLE_TIMEOUT seconds.
+
+    Pipes are watched with a selector, on Windows, where pipes cannot be selected, each
+    pipe is read by a thread of its own.
+    """
+
     def __init__(self, stream_type):
         Thread.__init__(self)
         self.processes = []
         self.streams = []
         self.logger = open(os.path.join(out_dir, stream_type), "wb", buffering=0)
+        self._lock = Lock()
 
     def attach_process_stream(self, process, stream):
         self.processes.append(process)
@@ -71,31 +89,109 @@ class ProcessLogger(Thread):
         """
         if self.logger:
             if msg:
-                self.logger.write(
+                self._write(
                     datetime.now().strftime("%Y%m%d%H%M%S%f").encode("utf-8")
+                    + b","
+                    + msg.lstrip(b"\r\n" if _IS_WIN else b"\n")
                 )
-                self.logger.write(b",")
-                self.logger.write(msg.lstrip(b"\r\n" if _IS_WIN else b"\n"))
 
             return True
         return False
 
-    def run(self):
-        for process, stream in zip(self.processes, self.streams):
-            if process and stream:
-                while True:
-                    nextline = stream.readline()
+    def _write(self, data):
+        with self._lock:
+            if self.logger:
+                self.logger.write(data)
+
+    def _log_lines(self, data):
+        prefix = datetime.now().strftime("%Y%m%d%H%M%S%f").encode("utf-8") + b","
+        self._write(
+            b"".join(
+                prefix + line + b"\n"
+                for line in data.split(b"\n")
+                if line.strip(b"\r")
+            )
+        )
+
+    def _drain(self, pending, data):
+        """Logs the complete lines of data, returns the start of an unfinished line."""
+        data = pending + data
+        end = data.rfind(b"\n") + 1
+        if end == 0 and len(data) < LOG_READ_SIZE:
+            return data
+        if end == 0:
+            end = len(data)
+        self._log_lines(data[:end])
+        return data[end:]
 
-                    if nextline:
-                        self.log(nextline)
-                    else:
-                        if process.poll() is not None:
-                            break
+    def _processes_exited(self):
+        return all(process.poll() is not None for process in self.processes if process)
+
+    def run(self):
+        streams = [stream for stream in self.streams if stream]
+        if not streams:
+            return
+        if _IS_WIN:
+            self._run_threads(streams)
+        else:
+            self._run_selector(streams)
+
+    def _run_selector(self, streams):
+        pending = {}
+        with selectors.DefaultSelector() as selector:
+            for stream in streams:
+                selector.register(stream.fileno(), selectors.EVENT_READ)
+                pending[stream.fileno()] = b""
+
+            while selector.get_map():
+                events = selector.select(LOG_IDLE_TIMEOUT)
+                if not events and self._processes_exited():
+                    # a grandchild may still hold a pipe open
+                    break
+                for key, _ in events:
+                    data = os.read(key.fd, LOG_READ_SIZE)
+                    if data:
+                        pending[key.fd] = self._drain(pending[key.fd], data)
+                        continue
+                    selector.unregister(key.fd)
+                    if pending[key.fd]:
+                        self._log_lines(pending[key.fd])
+                        pending[key.fd] = b""
+
+        for data in pending.values():
+            if data:
+                self._log_lines(data)
+
+    def _read_stream(self, stream):
+        pending = b""
+        while True:
+            data = stream.read1(LOG_READ_SIZE)
+            if not data:
+                break
+            pending = self._drain(pending, data)
+        if pending:
+            self._log_lines(pending)
+
+    def _run_threads(self, streams):
+        readers = [
+            Thread(target=self._read_stream, args=(stream,), daemon=True)
+            for stream in streams
+        ]
+        for reader in readers:
+            reader.start()
+        while any(reader.is_alive() for reader in readers):
+            for reader in readers:
+                reader.join(LOG_IDLE_TIMEOUT)
+            if self._processes_exited():
+                for reader in readers:
+                    reader.join(LOG_IDLE_TIMEOUT)
+                break
 
     def release(self):
-        if self.logger:
-            self.logger.close()
-            self.logger = None
+        with self._lock:
+            if self.logger:
+                self.logger.close()
+                self.logger = None
 
 
 class ProcessExecutor:
@@ -312,9 +408,14 @@ class ProcessExecutor:
             "Status updated after starting decompress/restore child process..."
         )
 
+        # pigz and the restore share the error log, neither may block on a full pipe
+        self.process_stdout.attach_process_stream(second_process, second_process.stdout)
+        self.process_stdout.start()
+        self.process_stderr.attach_process_stream(process, process.stderr)
         self.process_stderr.attach_process_stream(second_process, second_process.stderr)
         self.process_stderr.start()
 
+        self.process_stdout.join()
         self.process_stderr.join()
 
         exit_code = second_process.wait()
@@ -1,11 +1,18 @@
+import logging
 import threading
 import time
-from collections import deque
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, Union
 
+from app.client_manager.connection_pool import POOLED_DB_TYPES, connection_pool
+from app.client_manager.response_queue import ResponseQueue
 from app.include import OmniDatabase
 from app.include.Session import Session
+from django.core.serializers.json import DjangoJSONEncoder
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
 
 
 class Client:
@@ -15,20 +22,25 @@ class Client:
     Attributes:
         _to_be_removed (List[Any]): A list of tabs to be removed.
         id (str): The unique identifier of the client.
-        polling_lock (threading.Lock): A lock used for synchronization during polling.
-        returning_data_lock (threading.Lock): A lock used for synchronization while accessing returning_data.
-        returning_data (deque): A list-like container containing data returned by the client.
+        returning_data (ResponseQueue): A queue of serialized responses waiting to be delivered to the client.
         _connection_sessions (dict): A dictionary storing connection sessions for the client.
         last_update (datetime.datetime): The timestamp of the client's last update.
     """
 
     to_be_removed = []
+    _encoder = DjangoJSONEncoder()
 
     def __init__(self, client_id: str) -> None:
         self.id = client_id
-        self.polling_lock = threading.Lock()
-        self.returning_data_lock = threading.Lock()
-        self.returning_data = deque()
+        self.returning_data = ResponseQueue(
+            max_bytes=settings.CLIENT_QUEUE_MAX_BYTES,
+            max_spill_bytes=settings.CLIENT_QUEUE_MAX_SPILL_BYTES,
+            spill_dir=settings.TEMP_DIR,
+        )
+        self.response_condition = self.returning_data.condition
+        self._consumer_generation = 0
+        self._push_stream_id = 0
+        self._overflowed_contexts = set()
         self._connection_sessions = {}
         self.last_update = datetime.now()
 
@@ -42,23 +54,130 @@ class Client:
         """
         return self._connection_sessions
 
-    def release_polling_lock(self) -> None:
+    def queue_response(self, data: Dict[str, Any]) -> bool:
+        """Serializes a response, adds it to the client queue and wakes up the consumers.
+
+        When the queue is over CLIENT_QUEUE_MAX_BYTES the producing thread waits up to
+        CLIENT_QUEUE_PUT_TIMEOUT seconds for the client to drain it, then the response
+        is spilled to disk. If the spill file is full the response is dropped, the
+        producing query thread is stopped and its context gets an error response
+        instead, later responses of that context are dropped too.
+
+        Args:
+            data (Dict[str, Any]): The response to be delivered.
+
+        Returns:
+            bool: True if the response was queued, False if it was dropped.
         """
-        Releases the polling lock if acquired.
+        context_code = data.get("context_code")
+        if context_code is not None and context_code in self._overflowed_contexts:
+            return False
+        # serialize right away, producers keep mutating their response dicts
+        response = self._encoder.encode(data)
+        queued = self.returning_data.put(
+            response, timeout=settings.CLIENT_QUEUE_PUT_TIMEOUT
+        )
+        if not queued:
+            logger.warning(
+                "Response queue of client %s is full, dropping response", self.id
+            )
+            self._abort_response(data)
+        return queued
+
+    def _abort_response(self, data: Dict[str, Any]) -> None:
+        # query threads are StoppableThread, they stop fetching once cancelled
+        thread = threading.current_thread()
+        if hasattr(thread, "cancel") and callable(getattr(thread, "stop", None)):
+            thread.stop()
+        context_code = data.get("context_code")
+        if context_code is None:
+            return
+        self._overflowed_contexts.add(context_code)
+        message = (
+            "The result is too large to be delivered, the server response queue is full."
+        )
+        error = self._encoder.encode(
+            {
+                "response_type": data.get("response_type"),
+                "context_code": context_code,
+                "error": True,
+                "data": {
+                    "message": message,
+                    "data": message,
+                    "duration": "",
+                    "chunks": False,
+                    "last_block": True,
+                },
+            }
+        )
+        # small enough to go over the spill limit, the client has to learn about it
+        self.returning_data.put(error, timeout=0, force=True)
+
+    def get_responses(
+        self, timeout: Optional[float] = None, stream_id: Optional[int] = None
+    ) -> list[str]:
+        """Waits for queued responses and removes them from the queue.
+
+        At most CLIENT_QUEUE_MAX_BYTES worth of responses are returned at once.
+
+        Args:
+            timeout (Optional[float], optional): Maximum number of seconds to wait. Defaults to None.
+            stream_id (Optional[int], optional): The push stream the caller belongs to.
+                Long polling consumers pass None. Defaults to None.
+
+        Returns:
+            list[str]: The serialized responses, empty when the wait timed out or
+            the consumer was superseded.
         """
-        try:
-            self.polling_lock.release()
-        except RuntimeError:
-            pass
+        with self.response_condition:
+            generation = self._consumer_generation
+            self.response_condition.wait_for(
+                lambda: len(self.returning_data)
+                or generation != self._consumer_generation
+                or (stream_id is not None and stream_id != self._push_stream_id),
+                timeout=timeout,
+            )
+            if stream_id is not None and stream_id != self._push_stream_id:
+                return []
+            return self.returning_data.get(settings.CLIENT_QUEUE_MAX_BYTES)
+
+    def get_queue_stats(self) -> Dict[str, int]:
+        """Current size of the response queue, used for monitoring.
+
+        Returns:
+            Dict[str, int]: Number of queued responses and bytes kept in memory and on disk.
+        """
+        return self.returning_data.stats()
 
-    def release_returning_data_lock(self) -> None:
+    def wake_consumers(self) -> None:
         """
-        Releases the returning data lock if acquired.
+        Makes long polling consumers that are currently waiting return.
         """
-        try:
-            self.returning_data_lock.release()
-        except RuntimeError:
-            pass
+        with self.response_condition:
+            self._consumer_generation += 1
+            self.response_condition.notify_all()
+
+    def open_push_stream(self) -> int:
+        """Registers a new push stream, superseding the previous one.
+
+        Returns:
+            int: The ID of the new push stream.
+        """
+        with self.response_condition:
+            self._push_stream_id += 1
+            self.response_condition.notify_all()
+            return self._push_stream_id
+
+    def is_push_stream_active(self, stream_id: int) -> bool:
+        """Checks whether the given push stream is still the current one.
+
+        Args:
+            stream_id (int): The ID of the push stream.
+
+        Returns:
+            bool: True if the stream was not superseded.
+        """
+        return stream_id == self._push_stream_id
 
     def get_tab(
         self, workspace_id: str, tab_id: Optional[str] = None
@@ -182,7 +301,10 @@ class Client:
         else:
             del self._connection_sessions[workspace_id]
 
-        if tab.get("type") in ["query", "console", "connection", "edit", "schema_edit"]:
+        if tab.get("type") == "connection" and self._is_pooled(tab["omnidatabase"]):
+            self._retire_database(tab["omnidatabase"])
+
+        elif tab.get("type") in ["query", "console", "connection", "edit", "schema_edit"]:
             try:
                 tab["thread"].stop()
                 tab["omnidatabase"].connection.Cancel(False)
@@ -193,6 +315,13 @@ class Client:
             except Exception:
                 pass
 
+        elif tab.get("type") == "advancedobjectsearch":
+            tab["thread_pool"].stop()
+            try:
+                tab["omnidatabase"].connection.Close()
+            except Exception:
+                pass
+
         elif tab.get("type") == "debug":
             self._close_debug_tab(tab)
 
@@ -244,6 +373,38 @@ class Client:
             tab["terminal_object"].close()
             tab["terminal_ssh_client"].close()
 
+    @staticmethod
+    def _is_pooled(database) -> bool:
+        """Checks whether a database object was acquired from the connection pool.
+
+        Args:
+            database: The database object.
+
+        Returns:
+            bool: True if the object belongs to the connection pool.
+        """
+        return getattr(database, "pool_created_at", None) is not None
+
+    def _retire_database(self, database) -> None:
+        """Gives a database object that is no longer used by a tab back to the connection pool.
+
+        Objects still running a request are handed to the cleanup thread instead.
+
+        Args:
+            database: The database object.
+
+        Returns:
+            None
+        """
+        if database.lock is None or database.lock.acquire(blocking=False):
+            try:
+                connection_pool.release(database)
+            finally:
+                if database.lock is not None:
+                    database.lock.release()
+        else:
+            self.to_be_removed.append(database)
+
     def _should_update_database(
         self, tab: Dict[str, Any], current_tab_database: str, main_tab_database
     ) -> bool:
@@ -288,38 +449,53 @@ class Client:
         Returns:
             None.
         """
-        connection_params = (
-            main_tab_database.connection_params
-            if hasattr(main_tab_database, "connection_params")
-            else None
+        # tree and metadata requests do not need a session of their own
+        pooled = (
+            tab.get("type") == "connection"
+            and main_tab_database.db_type in POOLED_DB_TYPES
         )
 
-        database_new = OmniDatabase.Generic.InstantiateDatabase(
-            db_type=main_tab_database.db_type,
-            server=main_tab_database.connection.host,
-            port=str(main_tab_database.connection.port),
-            service=current_tab_database,
-            user=main_tab_database.active_user,
-            password=main_tab_database.connection.password,
-            conn_id=main_tab_database.conn_id,
-            alias=main_tab_database.alias,
-            conn_string=main_tab_database.conn_string,
-            parse_conn_string=False,
-            connection_params=connection_params,
-        )
+        if pooled:
+            database_new = connection_pool.acquire(
+                main_tab_database, current_tab_database
+            )
+        else:
+            connection_params = (
+                main_tab_database.connection_params
+                if hasattr(main_tab_database, "connection_params")
+                else None
+            )
 
-        # check if database connection is valid
-        try:
-            database_new.connection.Open()
-        except Exception:
-            # otherwise revert to main connection
-            database_new = main_tab_database
+            database_new = OmniDatabase.Generic.InstantiateDatabase(
+                db_type=main_tab_database.db_type,
+                server=main_tab_database.connection.host,
+                port=str(main_tab_database.connection.port),
+                service=current_tab_database,
+                user=main_tab_database.active_user,
+                password=main_tab_database.connection.password,
+                conn_id=main_tab_database.conn_id,
+                alias=main_tab_database.alias,
+                conn_string=main_tab_database.conn_string,
+                parse_conn_string=False,
+                connection_params=connection_params,
+            )
+
+            # check if database connection is valid
+            try:
+                database_new.connection.Open()
+            except Exception:
+                # otherwise revert to main connection
+                database_new = main_tab_database
 
-        if use_lock:
+        # pooled objects keep the lock they were created with
+        if use_lock and not (self._is_pooled(database_new) and database_new.lock):
             database_new.lock = threading.Lock()
 
         if tab["omnidatabase"]:
-            self.to_be_removed.append(tab["omnidatabase"])
+            if self._is_pooled(tab["omnidatabase"]):
+                self._retire_database(tab["omnidatabase"])
+            else:
+                self.to_be_removed.append(tab["omnidatabase"])
 
         tab["omnidatabase"] = database_new
 
@@ -443,11 +619,13 @@ class ClientManager:
         _clients (Dict[str, Client]): A dictionary of clients, where the client ID is the key.
         _instance (ClientManager): The singleton instance of the ClientManager class.
         _lock (threading.Lock): A lock for thread safety.
+        _push_streams (int): Number of open push streams.
     """
 
     _clients = {}
     _instance = None
     _lock = threading.Lock()
+    _push_streams = 0
 
     def __new__(cls, *args, **kwargs):
         with cls._lock:
@@ -515,6 +693,28 @@ class ClientManager:
 
         return client
 
+    def acquire_push_stream(self) -> bool:
+        """Takes one of the PUSH_MAX_STREAMS push streams of the server.
+
+        Every open push stream holds a server thread, the limit keeps threads for the
+        other requests.
+
+        Returns:
+            bool: False if every push stream is taken.
+        """
+        with self._lock:
+            if self._push_streams >= settings.PUSH_MAX_STREAMS:
+                return False
+            ClientManager._push_streams += 1
+            return True
+
+    def release_push_stream(self) -> None:
+        """
+        Gives back a push stream taken by acquire_push_stream.
+        """
+        with self._lock:
+            ClientManager._push_streams -= 1
+
     def clear_client(self, client_id: str) -> None:
         """Clears the client with the given client_id by removing
         all associated connection sessions and releasing locks.
@@ -533,9 +733,7 @@ class ClientManager:
                 tab["to_be_removed"] = True
             conn_tab["to_be_removed"] = True
 
-        client.release_polling_lock()
-
-        client.release_returning_data_lock()
+        client.wake_consumers()
 
     def remove_client(self, client_id: str) -> None:
         """Removes the client with the specified client_id.
@@ -546,7 +744,9 @@ class ClientManager:
         Returns:
             None
         """
-        self.clients.pop(client_id, None)
+        client = self.clients.pop(client_id, None)
+        if client is not None:
+            client.returning_data.clear()
 
 
 client_manager = ClientManager()
@@ -566,7 +766,11 @@ def cleanup_thread():
     while True:
         while Client.to_be_removed:
             conn = Client.to_be_removed.pop(0)
-            conn.connection.Close()
+            if Client._is_pooled(conn):
+                connection_pool.release(conn)
+            else:
+                conn.connection.Close()
+        connection_pool.prune()
 
         for client_id in list(client_manager.clients):
             client = client_manager.get_client(client_id=client_id)
@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Optional
+
+from app.include import OmniDatabase
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+# database types whose connections are stateless enough to be shared between requests
+POOLED_DB_TYPES = ("postgresql",)
+
+
+class ConnectionPool:
+    """
+    Pool of idle database objects used by tree and metadata requests.
+
+    Idle objects are grouped by connection id, server, database and role. Each
+    keeps its open connection together with everything cached on it, such as the
+    PostgreSQL type names, so switching the tree back and forth between databases
+    does not pay for a new connection every time.
+
+    Attributes:
+        _lock (threading.Lock): A lock guarding the idle objects.
+        _idle (OrderedDict): Deques of (database, created_at, released_at) keyed by pool key,
+            in least recently used order.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()
+
+    @staticmethod
+    def get_key(database, database_name: str) -> tuple:
+        """Builds the pool key of a database object.
+
+        Args:
+            database: OmniDatabase object of the connection.
+            database_name (str): The database the object is connected to.
+
+        Returns:
+            tuple: The pool key.
+        """
+        return (
+            database.conn_id,
+            database.db_type,
+            database.connection.host,
+            str(database.connection.port),
+            database_name,
+            database.active_user,
+        )
+
+    def _count_idle(self) -> int:
+        return sum(len(entries) for entries in self._idle.values())
+
+    def _is_reusable(
+        self, database, password: str, created_at: float, released_at: float
+    ) -> bool:
+        now = time.monotonic()
+        if now - created_at >= settings.CONNECTION_POOL_MAX_AGE:
+            return False
+        if database.connection.password != password:
+            return False
+        if database.connection.GetConStatus() != 1:
+            return False
+        if now - released_at >= settings.CONNECTION_POOL_HEALTH_CHECK_INTERVAL:
+            try:
+                database.connection.ExecuteScalar("select 1")
+            except Exception:
+                return False
+        return True
+
+    def acquire(self, main_database, database_name: str):
+        """Returns a connected database object for the given database.
+
+        An idle object is reused when it is healthy, younger than CONNECTION_POOL_MAX_AGE
+        and uses the current password. Otherwise a new object is created from the main
+        database of the connection.
+
+        Args:
+            main_database: OmniDatabase object of the connection, used as a template.
+            database_name (str): The database to connect to.
+
+        Returns:
+            The database object. Falls back to main_database if the database can not be opened.
+        """
+        key = self.get_key(main_database, database_name)
+        password = main_database.connection.password
+
+        while True:
+            with self._lock:
+                entries = self._idle.get(key)
+                if not entries:
+                    break
+                database, created_at, released_at = entries.pop()
+                if not entries:
+                    del self._idle[key]
+            if self._is_reusable(database, password, created_at, released_at):
+                database.pool_created_at = created_at
+                return database
+            self._close(database)
+
+        connection_params = (
+            main_database.connection_params
+            if hasattr(main_database, "connection_params")
+            else None
+        )
+
+        database = OmniDatabase.Generic.InstantiateDatabase(
+            db_type=main_database.db_type,
+            server=main_database.connection.host,
+            port=str(main_database.connection.port),
+            service=database_name,
+            user=main_database.active_user,
+            password=main_database.connection.password,
+            conn_id=main_database.conn_id,
+            alias=main_database.alias,
+            conn_string=main_database.conn_string,
+            parse_conn_string=False,
+            connection_params=connection_params,
+        )
+
+        # check if database connection is valid
+        try:
+            database.connection.Open()
+        except Exception:
+            # otherwise revert to main connection
+            return main_database
+
+        database.pool_created_at = time.monotonic()
+        # catalog reads borrow other pooled objects while this one is busy
+        database.reader_pool = self
+        database.readers = threading.BoundedSemaphore(settings.CONNECTION_POOL_MAX_READERS)
+        return database
+
+    def release(self, database) -> bool:
+        """Gives a database object back to the pool.
+
+        Objects that are not idle, are too old or do not fit in the pool are closed.
+        Objects that were not created by the pool, like the main database returned
+        when a connection could not be opened, are left untouched.
+
+        Args:
+            database: OmniDatabase object returned by acquire.
+
+        Returns:
+            bool: True if the object was kept in the pool.
+        """
+        created_at: Optional[float] = getattr(database, "pool_created_at", None)
+        if created_at is None:
+            return False
+        now = time.monotonic()
+        keep = (
+            now - created_at < settings.CONNECTION_POOL_MAX_AGE
+            and database.connection.GetConStatus() == 1
+        )
+        if keep:
+            key = self.get_key(database, database.active_service)
+            with self._lock:
+                entries = self._idle.setdefault(key, deque())
+                self._idle.move_to_end(key)
+                if len(entries) < settings.CONNECTION_POOL_MAX_IDLE_PER_KEY:
+                    entries.append((database, created_at, now))
+                    evicted = self._evict()
+                else:
+                    keep = False
+                    evicted = []
+            for idle_database in evicted:
+                self._close(idle_database)
+        if not keep:
+            self._close(database)
+        return keep
+
+    def _evict(self) -> list[Any]:
+        evicted = []
+        while self._count_idle() > settings.CONNECTION_POOL_MAX_IDLE:
+            key, entries = next(iter(self._idle.items()))
+            evicted.append(entries.popleft()[0])
+            if not entries:
+                del self._idle[key]
+        return evicted
+
+    def prune(self) -> None:
+        """
+        Closes idle objects that were not used for CONNECTION_POOL_IDLE_TIMEOUT seconds
+        or are older than CONNECTION_POOL_MAX_AGE.
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key in list(self._idle):
+                entries = self._idle[key]
+                kept = deque()
+                for entry in entries:
+                    database, created_at, released_at = entry
+                    if (
+                        now - released_at >= settings.CONNECTION_POOL_IDLE_TIMEOUT
+                        or now - created_at >= settings.CONNECTION_POOL_MAX_AGE
+                    ):
+                        expired.append(database)
+                    else:
+                        kept.append(entry)
+                if kept:
+                    self._idle[key] = kept
+                else:
+                    del self._idle[key]
+        for database in expired:
+            self._close(database)
+
+    def clear(self) -> None:
+        """
+        Closes every idle object.
+        """
+        with self._lock:
+            idle = [entry[0] for entries in self._idle.values() for entry in entries]
+            self._idle.clear()
+        for database in idle:
+            self._close(database)
+
+    @staticmethod
+    def _close(database) -> None:
+        try:
+            database.connection.Close()
+        except Exception as exc:
+            logger.debug("Failed to close pooled connection: %s", exc)
+
+
+connection_pool = ConnectionPool()
@@ -0,0 +1,149 @@
+import tempfile
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class ResponseQueue:
+    """
+    FIFO queue of serialized responses with a memory budget in bytes.
+
+    Responses that do not fit in the memory budget are appended to a temporary
+    spill file and read back in order once the consumer catches up.
+
+    Attributes:
+        condition (threading.Condition): A condition guarding the queue, notified on every change.
+        max_bytes (int): The memory budget of the queue.
+        max_spill_bytes (int): Maximum size of the spill file.
+        spill_dir (str): The directory where the spill file is created.
+        memory_bytes (int): Size of the responses currently kept in memory.
+        spilled_bytes (int): Size of the responses currently kept in the spill file.
+    """
+
+    def __init__(self, max_bytes: int, max_spill_bytes: int, spill_dir: str) -> None:
+        self.condition = threading.Condition()
+        self.max_bytes = max_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.spill_dir = spill_dir
+        self.memory_bytes = 0
+        self.spilled_bytes = 0
+        # str for responses kept in memory, (offset, length) for spilled ones
+        self._entries = deque()
+        self._spill_file = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def has_room(self, size: int) -> bool:
+        """Checks whether a response of the given size can be kept in memory.
+
+        A single response is always accepted by an empty queue, even if it is bigger than the budget.
+
+        Args:
+            size (int): The size of the response.
+
+        Returns:
+            bool: True if the response fits in memory.
+        """
+        if self.spilled_bytes:
+            return False
+        return self.memory_bytes == 0 or self.memory_bytes + size <= self.max_bytes
+
+    def put(
+        self, response: str, timeout: Optional[float] = None, force: bool = False
+    ) -> bool:
+        """Appends a serialized response to the queue.
+
+        When the queue first goes over its memory budget the caller waits up to timeout
+        seconds for the consumer to drain it, then the response is spilled to disk.
+        While anything is spilled, responses go straight to the spill file, they
+        could not be kept in memory ahead of the spilled ones anyway.
+
+        Args:
+            response (str): The serialized response.
+            timeout (Optional[float], optional): Maximum number of seconds to wait for room in memory.
+            force (bool, optional): Spill the response even if the spill file is full.
+                Defaults to False.
+
+        Returns:
+            bool: True if the response was queued, False if the spill file is full.
+        """
+        size = len(response)
+        with self.condition:
+            if not self.spilled_bytes:
+                self.condition.wait_for(
+                    lambda: self.has_room(size) or self.spilled_bytes, timeout=timeout
+                )
+            if self.has_room(size):
+                self._entries.append(response)
+                self.memory_bytes += size
+            else:
+                data = response.encode("utf-8")
+                if not force and self.spilled_bytes + len(data) > self.max_spill_bytes:
+                    return False
+                if self._spill_file is None:
+                    self._spill_file = tempfile.TemporaryFile(
+                        prefix="pgmanage_queue_", dir=self.spill_dir
+                    )
+                offset = self._spill_file.seek(0, 2)
+                self._spill_file.write(data)
+                self._entries.append((offset, len(data)))
+                self.spilled_bytes += len(data)
+            self.condition.notify_all()
+        return True
+
+    def get(self, max_bytes: int) -> list[str]:
+        """Removes responses from the head of the queue.
+
+        Args:
+            max_bytes (int): Stop after this many bytes, at least one response is returned if available.
+
+        Returns:
+            list[str]: The serialized responses in queue order.
+        """
+        responses = []
+        total = 0
+        with self.condition:
+            while self._entries and (not responses or total < max_bytes):
+                entry = self._entries.popleft()
+                if isinstance(entry, str):
+                    self.memory_bytes -= len(entry)
+                    total += len(entry)
+                    responses.append(entry)
+                else:
+                    offset, length = entry
+                    self._spill_file.seek(offset)
+                    responses.append(self._spill_file.read(length).decode("utf-8"))
+                    self.spilled_bytes -= length
+                    total += length
+            if not self.spilled_bytes and self._spill_file is not None:
+                # reuse the file from the beginning the next time the queue overflows
+                self._spill_file.truncate(0)
+            self.condition.notify_all()
+        return responses
+
+    def clear(self) -> None:
+        """
+        Discards all queued responses and removes the spill file.
+        """
+        with self.condition:
+            self._entries.clear()
+            self.memory_bytes = 0
+            self.spilled_bytes = 0
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            self.condition.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """Current size of the queue.
+
+        Returns:
+            Dict[str, int]: Number of queued responses and bytes kept in memory and on disk.
+        """
+        with self.condition:
+            return {
+                "responses": len(self._entries),
+                "memory_bytes": self.memory_bytes,
+                "spilled_bytes": self.spilled_bytes,
+            }
@@ -234,6 +234,41 @@ ORDER BY c.column_id;
             True,
         )
 
+    def QueryFieldsGrouped(self, object_type, all_schemas=False, schema=None):
+        query_filter = ""
+        if not all_schemas:
+            query_filter = f"AND s.name = '{schema or self.schema}'"
+        fields = self.Query(
+            """
+SELECT
+    o.name       AS table_name,
+    s.name       AS table_schema,
+    c.name       AS column_name,
+    t.name       AS data_type,
+    c.max_length,
+    c.precision,
+    c.scale,
+    c.is_nullable,
+    c.is_identity
+FROM sys.columns c
+JOIN sys.objects o ON c.object_id = o.object_id
+JOIN sys.schemas s ON o.schema_id = s.schema_id
+JOIN sys.types t ON c.user_type_id = t.user_type_id
+WHERE o.type = '{0}'
+{1}
+ORDER BY s.name, o.name, c.column_id;
+""".format(
+                object_type, query_filter
+            ),
+            True,
+        )
+        if all_schemas:
+            return fields.GroupBy(["table_schema", "table_name"])
+        return fields.GroupBy("table_name")
+
+    def QueryTablesFieldsGrouped(self, all_schemas=False, schema=None):
+        return self.QueryFieldsGrouped("U", all_schemas, schema)
+
     def QueryTablesStatistics(self, table=None, all_schemas=False, schema=None):
         query_filter = ""
         if not all_schemas:
@@ -301,6 +336,9 @@ ORDER BY c.column_id;
             True,
         )
 
+    def QueryViewFieldsGrouped(self, all_schemas=False, schema=None):
+        return self.QueryFieldsGrouped("V", all_schemas, schema)
+
     def QueryProcedures(self, all_schemas=False, schema=None):
         query_filter = ""
         if not all_schemas:
@@ -297,6 +297,7 @@ class MySQL:
                 query_filter = "and t.table_name = '{0}' ".format(table)
         return self.Query('''
             select distinct c.table_name as "table_name",
+                   c.table_schema as "table_schema",
                    c.column_name as "column_name",
                    c.data_type as "data_type",
                    c.is_nullable as "nullable",
@@ -307,12 +308,19 @@ class MySQL:
             from information_schema.columns c,
                  information_schema.tables t
             where t.table_name = c.table_name
+              and t.table_schema = c.table_schema
               and t.table_type in ('BASE TABLE', 'SYSTEM VIEW')
             {0}
             order by c.table_name,
                      c.ordinal_position
         '''.format(query_filter), True)
 
+    def QueryTablesFieldsGrouped(self, all_schemas=False, schema=None):
+        fields = self.QueryTablesFields(None, all_schemas, schema)
+        if all_schemas:
+            return fields.GroupBy(['table_schema', 'table_name'])
+        return fields.GroupBy('table_name')
+
     def QueryTablesForeignKeys(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -714,6 +722,7 @@ class MySQL:
                 query_filter = "and c.table_name = '{0}' ".format(table)
         return self.Query('''
             select distinct c.table_name as "table_name",
+                   c.table_schema as "table_schema",
                    c.column_name as "column_name",
                    c.data_type as "data_type",
                    c.is_nullable as "nullable",
@@ -724,12 +733,19 @@ class MySQL:
             from information_schema.columns c,
                  information_schema.tables t
             where t.table_name = c.table_name
+              and t.table_schema = c.table_schema
               and t.table_type = 'VIEW'
             {0}
             order by c.table_name,
                      c.ordinal_position
         '''.format(query_filter), True)
 
+    def QueryViewFieldsGrouped(self, all_schemas=False, schema=None):
+        fields = self.QueryViewFields(None, all_schemas, schema)
+        if all_schemas:
+            return fields.GroupBy(['table_schema', 'table_name'])
+        return fields.GroupBy('table_name')
+
     def GetViewDefinition(self, view, schema):
         if schema:
             schema_name = schema
@@ -303,6 +303,7 @@ class Oracle:
                 query_filter = "and table_name = '{0}' ".format(table)
         return self.connection.Query('''
             select (case when upper(replace(table_name, ' ', '')) <> table_name then '"' || table_name || '"' else table_name end) as "table_name",
+                   (case when upper(replace(owner, ' ', '')) <> owner then '"' || owner || '"' else owner end) as "table_schema",
                    (case when upper(replace(column_name, ' ', '')) <> column_name then '"' || column_name || '"' else column_name end) as "column_name",
                    case when data_type = 'NUMBER' and data_scale = '0' then 'INTEGER' else data_type end as "data_type",
                    case nullable when 'Y' then 'YES' else 'NO' end as "nullable",
@@ -316,6 +317,12 @@ class Oracle:
                      column_id
         '''.format(query_filter), True)
 
+    def QueryTablesFieldsGrouped(self, all_schemas=False, schema=None):
+        fields = self.QueryTablesFields(None, all_schemas, schema)
+        if all_schemas:
+            return fields.GroupBy(['table_schema', 'table_name'])
+        return fields.GroupBy('table_name')
+
     @lock_required
     def QueryTablesForeignKeys(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
@@ -808,6 +815,7 @@ class Oracle:
                 query_filter = "and (case when upper(replace(table_name, ' ', '')) <> table_name then '"' || table_name || '"' else table_name end) = '{0}' ".format(table)
         return self.connection.Query('''
             select (case when upper(replace(table_name, ' ', '')) <> table_name then '"' || table_name || '"' else table_name end) as "table_name",
+                   (case when upper(replace(owner, ' ', '')) <> owner then '"' || owner || '"' else owner end) as "table_schema",
                    (case when upper(replace(column_name, ' ', '')) <> column_name then '"' || column_name || '"' else column_name end) as "column_name",
                    case when data_type = 'NUMBER' and data_scale = '0' then 'INTEGER' else data_type end as "data_type",
                    case nullable when 'Y' then 'YES' else 'NO' end as "nullable",
@@ -820,6 +828,12 @@ class Oracle:
             order by table_name, column_id
         '''.format(query_filter), True)
 
+    def QueryViewFieldsGrouped(self, all_schemas=False, schema=None):
+        fields = self.QueryViewFields(None, all_schemas, schema)
+        if all_schemas:
+            return fields.GroupBy(['table_schema', 'table_name'])
+        return fields.GroupBy('table_name')
+
     @lock_required
     def GetViewDefinition(self, view, schema):
         if schema:
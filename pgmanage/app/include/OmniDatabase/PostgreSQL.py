@@ -28,6 +28,7 @@ from urllib.parse import urlparse
 
 import app.include.Spartacus as Spartacus
 
+from .catalog_cache import catalog_cache
 from .sql_templates import get_template
 
 '''
@@ -254,6 +255,57 @@ class PostgreSQL:
         wrap.__name__ = function.__name__
         return wrap
 
+    # Decorator for catalog reads, which run on another pooled connection to the
+    # same database instead of waiting while this object is busy
+    def read_lock_required(function):
+        def wrap(self, *args, **kwargs):
+            if self.lock is None:
+                return function(self, *args, **kwargs)
+            pool = getattr(self, 'reader_pool', None)
+            busy = not self.lock.acquire(blocking=False)
+            if busy and pool is not None and self.readers.acquire(blocking=False):
+                try:
+                    reader = pool.acquire(self, self.active_service)
+                    if reader is not self:
+                        try:
+                            return function(reader, *args, **kwargs)
+                        finally:
+                            pool.release(reader)
+                finally:
+                    self.readers.release()
+            if busy:
+                self.lock.acquire()
+            try:
+                return function(self, *args, **kwargs)
+            finally:
+                self.lock.release()
+        wrap.__doc__ = function.__doc__
+        wrap.__name__ = function.__name__
+        return wrap
+
+    # Decorator to serve catalog queries from the catalog cache shared by all tabs
+    def catalog_cached(function):
+        def wrap(self, *args, **kwargs):
+            return catalog_cache.get_or_query(
+                self,
+                (function.__name__, args, tuple(sorted(kwargs.items()))),
+                lambda: function(self, *args, **kwargs),
+                self.QueryCatalogFingerprint,
+            )
+        wrap.__doc__ = function.__doc__
+        wrap.__name__ = function.__name__
+        return wrap
+
+    @read_lock_required
+    def QueryCatalogFingerprint(self):
+        # statistics counters of the catalogs read by cached queries, they change on every DDL
+        return self.connection.ExecuteScalar('''
+            select coalesce(sum(n_tup_ins + n_tup_upd + n_tup_del), 0)::text
+            from pg_stat_sys_tables
+            where relname in ('pg_class', 'pg_namespace', 'pg_attribute', 'pg_type',
+                              'pg_database', 'pg_authid', 'pg_tablespace', 'pg_extension', 'pg_proc')
+        ''')
+
     def GetName(self):
         return self.service
 
@@ -263,7 +315,7 @@ class PostgreSQL:
             self.update_feature_flags()
         return f"PostgreSQL {self.version.split(' ')[0]}" if self.version else "Unknown"
 
-    @lock_required
+    @read_lock_required
     def GetUserSuper(self):
         return self.connection.ExecuteScalar("select rolsuper from pg_roles where rolname = '{0}'".format(self.user))
 
@@ -327,7 +379,7 @@ class PostgreSQL:
     def Terminate(self, pid):
         return self.connection.Terminate(pid)
 
-    @lock_required
+    @read_lock_required
     def QueryRoles(self):
         return self.connection.Query('''
             select quote_ident(rolname) as name_raw,
@@ -337,7 +389,7 @@ class PostgreSQL:
             order by rolname
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryRoleDetails(self, oid):
         return self.connection.Query('''
             select quote_ident(rolname) as name_raw,
@@ -364,7 +416,7 @@ class PostgreSQL:
             where oid={0}
         '''.format(oid), False)
 
-    @lock_required
+    @read_lock_required
     def QueryTablespaces(self):
         return self.connection.Query('''
             select quote_ident(spcname) as tablespace_name,
@@ -373,7 +425,7 @@ class PostgreSQL:
             order by spcname
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryDatabases(self):
         return self.connection.Query('''
             select database_name,
@@ -401,7 +453,7 @@ class PostgreSQL:
             order by sort
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryExtensions(self):
         return self.connection.Query('''
             select extname as extension_name,
@@ -412,7 +464,7 @@ class PostgreSQL:
         ''', True)
 
 
-    @lock_required
+    @read_lock_required
     def QueryAvailableExtensionsVersions(self):
         return self.connection.Query('''
                 SELECT name, ARRAY_AGG(version ORDER BY version ASC) AS versions, MAX(comment) as comment, MAX(schema) as required_schema
@@ -422,7 +474,7 @@ class PostgreSQL:
                 ORDER BY name ASC;
         ''')
 
-    @lock_required
+    @read_lock_required
     def QueryExtensionByName(self, name):
         return self.connection.Query('''
             SELECT x.oid AS oid,
@@ -451,7 +503,7 @@ class PostgreSQL:
         ORDER BY name;
     '''.format(catname))
 
-    @lock_required
+    @read_lock_required
     def QueryConfiguration(self, exclude_read_only=False):
         namesQ = self.QueryOptionNamesForCategory('Preset Options')
         names = [f"'{x[0]}'"  for x in namesQ.Rows]
@@ -475,14 +527,15 @@ class PostgreSQL:
         ORDER BY category, name
     '''.format(where, ','.join(names)), True)
 
-    @lock_required
+    @read_lock_required
     def QueryConfigCategories(self):
         return self.connection.Query(
             '''
             SELECT DISTINCT(category) FROM pg_settings ORDER BY category
             ''', True)
 
-    @lock_required
+    @catalog_cached
+    @read_lock_required
     def QuerySchemas(self):
         return self.connection.Query('''
             select schema_name,
@@ -515,11 +568,12 @@ class PostgreSQL:
             order by sort
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryCurrentSchema(self):
         return self.connection.Query('Select current_schema();', True)
 
-    @lock_required
+    @catalog_cached
+    @read_lock_required
     def QueryTables(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -571,7 +625,8 @@ class PostgreSQL:
             order by 2, 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @catalog_cached
+    @read_lock_required
     def QueryTablesFields(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -590,6 +645,7 @@ class PostgreSQL:
                 query_filter = "and quote_ident(n.nspname) not in ('information_schema','pg_catalog') "
         return self.connection.Query('''
             select quote_ident(c.relname) as table_name,
+                   quote_ident(n.nspname) as table_schema,
                    quote_ident(a.attname) as name_raw,
                     a.attname as column_name,
                    (case when t.typtype = 'd'::"char"
@@ -658,7 +714,7 @@ class PostgreSQL:
                      a.attnum
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTableDefinition(self, table=None, schema=None):
         in_schema = schema if schema else self.schema
 
@@ -681,7 +737,7 @@ class PostgreSQL:
             ORDER BY ordinal_position
         '''.format(in_schema, table), False)
 
-    @lock_required
+    @read_lock_required
     def QueryTablePKColumns(self, table=None, schema=None):
         in_schema = schema if schema else self.schema
 
@@ -694,7 +750,13 @@ class PostgreSQL:
             AND    i.indisprimary;
         '''.format(in_schema, table), True)
 
-    @lock_required
+    def QueryTablesFieldsGrouped(self, all_schemas=False, schema=None):
+        fields = self.QueryTablesFields(None, all_schemas, schema)
+        if all_schemas:
+            return fields.GroupBy(['table_schema', 'table_name'])
+        return fields.GroupBy('table_name')
+
+    @read_lock_required
     def QueryTablesForeignKeys(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -818,7 +880,7 @@ class PostgreSQL:
                      quote_ident(t.relname)
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesForeignKeysColumns(self, fkey, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -877,7 +939,7 @@ class PostgreSQL:
             order by ordinal_position
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesPrimaryKeys(self, table=None, all_schemas=False, schema=None):
         if self.version_num < 90500:
             table_schema_column = "quote_ident(n.nspname)"
@@ -923,7 +985,7 @@ class PostgreSQL:
                       {table_schema_column}
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesPrimaryKeysColumns(self, pkey, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -953,7 +1015,7 @@ class PostgreSQL:
             order by kc.ordinal_position
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesUniques(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -991,7 +1053,7 @@ class PostgreSQL:
                      quote_ident(t.relnamespace::regnamespace::text)
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesUniquesColumns(self, unique_name, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1021,7 +1083,7 @@ class PostgreSQL:
             order by kc.ordinal_position
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesIndexes(self, table=None, all_schemas=False, schema=None):
         return self.QueryTablesIndexesHelper(table, all_schemas, schema)
 
@@ -1075,7 +1137,7 @@ class PostgreSQL:
             order by 1, 2
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesIndexesColumns(self, index_name, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1112,7 +1174,7 @@ class PostgreSQL:
             ) t
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesChecks(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1146,7 +1208,7 @@ class PostgreSQL:
             order by 1, 2, 3
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesExcludes(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1238,7 +1300,7 @@ class PostgreSQL:
             order by 1, 2, 3
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesRules(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1269,7 +1331,7 @@ class PostgreSQL:
             order by 1, 2, 3
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def GetRuleDefinition(self, rule, table, schema):
         return self.connection.ExecuteScalar('''
             select r.definition ||
@@ -1290,7 +1352,7 @@ class PostgreSQL:
               and quote_ident(r.rulename) = '{2}'
         '''.format(schema, table, rule)).replace('CREATE RULE', 'CREATE OR REPLACE RULE')
 
-    @lock_required
+    @read_lock_required
     def QueryEventTriggers(self):
         return self.connection.Query('''
             select quote_ident(t.evtname) as name_raw,
@@ -1308,7 +1370,7 @@ class PostgreSQL:
             on np.oid = p.pronamespace
         ''')
 
-    @lock_required
+    @read_lock_required
     def QueryTablesTriggers(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1349,7 +1411,7 @@ class PostgreSQL:
             order by 1, 2, 3
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTablesInheriteds(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1397,7 +1459,7 @@ class PostgreSQL:
                 order by 1, 2, 3, 4
             '''.format(query_filter))
 
-    @lock_required
+    @read_lock_required
     def QueryTablesInheritedsParents(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1422,7 +1484,7 @@ class PostgreSQL:
             order by 2, 1
         '''.format(query_filter))
 
-    @lock_required
+    @read_lock_required
     def QueryTablesInheritedsChildren(self, table, schema):
             return self.connection.Query('''
                 select quote_ident(cc.relname) as name_raw,
@@ -1440,7 +1502,7 @@ class PostgreSQL:
                 order by 2, 1
             '''.format(table, schema))
 
-    @lock_required
+    @read_lock_required
     def QueryTablesPartitions(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1472,7 +1534,7 @@ class PostgreSQL:
             order by 1, 2, 3, 4
         '''.format(query_filter))
 
-    @lock_required
+    @read_lock_required
     def QueryTablesPartitionsParents(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1497,7 +1559,7 @@ class PostgreSQL:
             order by 2, 1
         '''.format(query_filter))
 
-    @lock_required
+    @read_lock_required
     def QueryTablesPartitionsChildren(self, table, schema):
         return self.connection.Query('''
             select quote_ident(cc.relname) as name_raw,
@@ -1515,7 +1577,7 @@ class PostgreSQL:
             order by 2, 1
         '''.format(table, schema))
 
-    @lock_required
+    @read_lock_required
     def QueryTablesStatistics(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
 
@@ -1559,7 +1621,7 @@ class PostgreSQL:
             True
         )
 
-    @lock_required
+    @read_lock_required
     def QueryStatisticsFields(self, statistics_name=None, all_schemas=False, schema=None):
         query_filter = ''
 
@@ -1641,7 +1703,7 @@ class PostgreSQL:
             ), False
         )
 
-    @lock_required
+    @read_lock_required
     def QueryFunctions(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1667,7 +1729,7 @@ class PostgreSQL:
             order by 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryFunctionFields(self, function_name, schema):
         if schema:
             return self.connection.Query('''
@@ -1726,11 +1788,11 @@ class PostgreSQL:
                 order by 3
             '''.format(self.schema, function_name), True)
 
-    @lock_required
+    @read_lock_required
     def GetFunctionDefinition(self, function_name):
         return self.connection.ExecuteScalar("select pg_get_functiondef('{0}'::regprocedure)".format(function_name))
 
-    @lock_required
+    @read_lock_required
     def GetFunctionDebug(self, function_name):
         return self.connection.ExecuteScalar('''
             select p.prosrc
@@ -1740,7 +1802,7 @@ class PostgreSQL:
             where quote_ident(n.nspname) || '.' || quote_ident(p.proname) || '(' || oidvectortypes(p.proargtypes) || ')' = '{0}'
         '''.format(function_name))
 
-    @lock_required
+    @read_lock_required
     def QueryProcedures(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1763,7 +1825,7 @@ class PostgreSQL:
             order by 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryProcedureFields(self, procedure, schema):
         if schema:
             return self.connection.Query('''
@@ -1796,11 +1858,11 @@ class PostgreSQL:
                 order by 3
             '''.format(self.schema, procedure), True)
 
-    @lock_required
+    @read_lock_required
     def GetProcedureDefinition(self, procedure):
         return self.connection.ExecuteScalar("select pg_get_functiondef('{0}'::regprocedure)".format(procedure))
 
-    @lock_required
+    @read_lock_required
     def GetProcedureDebug(self, procedure):
         return self.connection.ExecuteScalar('''
             select p.prosrc
@@ -1810,7 +1872,7 @@ class PostgreSQL:
             where quote_ident(n.nspname) || '.' || quote_ident(p.proname) || '(' || oidvectortypes(p.proargtypes) || ')' = '{0}'
         '''.format(procedure))
 
-    @lock_required
+    @read_lock_required
     def QueryTriggerFunctions(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1834,11 +1896,11 @@ class PostgreSQL:
             order by 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def GetTriggerFunctionDefinition(self, function_name):
         return self.connection.ExecuteScalar("select pg_get_functiondef('{0}'::regprocedure)".format(function_name))
 
-    @lock_required
+    @read_lock_required
     def QueryEventTriggerFunctions(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1862,7 +1924,7 @@ class PostgreSQL:
             order by 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryAggregates(self, all_schemas=False, schema=None):
         query_filter = ''
 
@@ -1894,11 +1956,11 @@ class PostgreSQL:
             True
         )
 
-    @lock_required
+    @read_lock_required
     def GetEventTriggerFunctionDefinition(self, function_name):
         return self.connection.ExecuteScalar("select pg_get_functiondef('{0}'::regprocedure)".format(function_name))
 
-    @lock_required
+    @read_lock_required
     def QuerySequences(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1920,7 +1982,8 @@ class PostgreSQL:
         '''.format(query_filter), True)
         return table
 
-    @lock_required
+    @catalog_cached
+    @read_lock_required
     def QueryViews(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1943,7 +2006,8 @@ class PostgreSQL:
             order by 2, 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @catalog_cached
+    @read_lock_required
     def QueryViewFields(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -1962,6 +2026,7 @@ class PostgreSQL:
                 query_filter = "and quote_ident(n.nspname) not in ('information_schema','pg_catalog') "
         return self.connection.Query('''
             select quote_ident(c.relname) as table_name,
+                   quote_ident(n.nspname) as table_schema,
                    quote_ident(a.attname) as name_raw,
                    a.attname as column_name,
                    t.typname as data_type,
@@ -2008,7 +2073,13 @@ class PostgreSQL:
                      a.attnum
         '''.format(query_filter), True)
 
-    @lock_required
+    def QueryViewFieldsGrouped(self, all_schemas=False, schema=None):
+        fields = self.QueryViewFields(None, all_schemas, schema)
+        if all_schemas:
+            return fields.GroupBy(['table_schema', 'table_name'])
+        return fields.GroupBy('table_name')
+
+    @read_lock_required
     def GetViewDefinition(self, view, schema):
         return '''CREATE OR REPLACE VIEW {0}.{1} AS
 {2}
@@ -2021,7 +2092,7 @@ class PostgreSQL:
             '''.format(schema, view)
     ))
 
-    @lock_required
+    @read_lock_required
     def QueryMaterializedViews(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -2044,7 +2115,7 @@ class PostgreSQL:
             order by 2, 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryMaterializedViewFields(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -2109,7 +2180,7 @@ class PostgreSQL:
                      a.attnum
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def GetMaterializedViewDefinition(self, view, schema):
         return '''DROP MATERIALIZED VIEW {0}.{1};
 
@@ -2133,7 +2204,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
     ])
 )
 
-    @lock_required
+    @read_lock_required
     def QueryPhysicalReplicationSlots(self):
         return self.connection.Query('''
             select quote_ident(slot_name) as slot_name
@@ -2142,7 +2213,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryLogicalReplicationSlots(self):
         return self.connection.Query('''
             select quote_ident(slot_name) as slot_name
@@ -2151,7 +2222,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryPublications(self):
         return self.connection.Query('''
             select quote_ident(pubname) as name_raw,
@@ -2166,7 +2237,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         ''', True)
 
-    @lock_required
+    @read_lock_required
     def QueryPublicationTables(self, pub):
         return self.connection.Query('''
             select quote_ident(schemaname) || '.' || quote_ident(tablename) as table_name
@@ -2175,7 +2246,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         '''.format(pub), True)
 
-    @lock_required
+    @read_lock_required
     def QuerySubscriptions(self):
         return self.connection.Query('''
             select quote_ident(s.subname) as name_raw,
@@ -2191,7 +2262,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         '''.format(self.service), True)
 
-    @lock_required
+    @read_lock_required
     def QuerySubscriptionTables(self, sub):
         return self.connection.Query('''
             select quote_ident(n.nspname) || '.' || quote_ident(c.relname) as table_name
@@ -2209,7 +2280,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         '''.format(self.service, sub), True)
 
-    @lock_required
+    @read_lock_required
     def QueryForeignDataWrappers(self):
         return self.connection.Query('''
             select fdwname,
@@ -2218,7 +2289,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         ''')
 
-    @lock_required
+    @read_lock_required
     def QueryForeignServers(self, fdw):
         return self.connection.Query('''
             select s.srvname,
@@ -2234,7 +2305,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 1
         '''.format(fdw))
 
-    @lock_required
+    @read_lock_required
     def QueryUserMappings(self, foreign_server):
         return self.connection.Query('''
             select quote_ident(rolname) as name_raw,
@@ -2283,7 +2354,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by seq
 '''.format(foreign_server))
 
-    @lock_required
+    @read_lock_required
     def QueryForeignTables(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -2308,7 +2379,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             order by 2, 1
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryForeignTablesFields(self, table=None, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -2382,7 +2453,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                      a.attnum
         '''.format(query_filter), True)
 
-    @lock_required
+    @read_lock_required
     def QueryTypes(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -2408,7 +2479,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
         '''.format(query_filter), True)
         return table
 
-    @lock_required
+    @read_lock_required
     def QueryDomains(self, all_schemas=False, schema=None):
         query_filter = ''
         if not all_schemas:
@@ -2435,7 +2506,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
         return table
 
 
-    @lock_required
+    @read_lock_required
     def QueryPgCronJobs(self):
         return self.connection.Query('''select jobid, jobname from cron.job''', True)
 
@@ -2447,18 +2518,18 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
     def DeletePgCronJobLogs(self, job_id):
         return self.connection.Query('''delete from cron.job_run_details where jobid = {0}'''.format(job_id), True)
 
-    @lock_required
+    @read_lock_required
     def GetPgCronJob(self, job_id):
         return self.connection.Query('''select jobid, jobname, schedule, command, database from cron.job where jobid = {0}'''.format(job_id), True)
 
-    @lock_required
+    @read_lock_required
     def GetPgCronJobLogs(self, job_id):
         return self.connection.Query('''select runid, job_pid, database, username, status, start_time, end_time, return_message, command
             from cron.job_run_details
             where jobid = {0}
             order by runid desc limit 50'''.format(job_id), True)
 
-    @lock_required
+    @read_lock_required
     def GetPgCronJobStats(self, job_id):
         return self.connection.Query('''select
             (select count(job_run_details.status) from cron.job_run_details where jobid = {0} and status='succeeded') as succeeded,
@@ -4755,7 +4826,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
         template = get_template("postgres", "drop_statistics", self.version_num)
         return template.safe_substitute(major_version=self.major_version)
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesRole(self, role_name):
         return self.connection.Query('''
             select rolname as "Role",
@@ -4772,7 +4843,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(rolname) = '{0}'
         '''.format(role_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesTablespace(self, tablespace_name):
         return self.connection.Query('''
             select t.spcname as "Tablespace",
@@ -4787,7 +4858,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(t.spcname) = '{0}'
         '''.format(tablespace_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesDatabase(self, database_name):
         datcollate = 'd.datcollate as "LC_COLLATE",' if self.version_num >= 80400 else ""
         datctype = 'd.datctype as "LC_CTYPE",' if self.version_num >= 80400 else ""
@@ -4811,7 +4882,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(d.datname) = '{database_name}'
         ''')
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesExtension(self, extension_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -4828,7 +4899,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(e.extname) = '{0}'
         '''.format(extension_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesSchema(self, schema_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -4841,7 +4912,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(n.nspname) = '{0}'
         '''.format(schema_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesTable(self, schema, table_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -4894,7 +4965,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                 and quote_ident(c.relname) = '{1}'
         '''.format(schema, table_name))
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesTableField(self, schema, table, table_field):
         return self.connection.Query(
             '''
@@ -4943,7 +5014,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             )
         )
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesIndex(self, schema, index_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -4986,7 +5057,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(c.relname) = '{1}'
         '''.format(schema, index_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesSequence(self, schema, sequence_name):
         table1 = self.connection.Query('''
             select current_database() as "Database",
@@ -5030,7 +5101,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
         table1.Merge(table2)
         return table1
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesView(self, schema, view_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5047,7 +5118,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(c.relname) = '{1}'
         '''.format(schema, view_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesFunction(self, function_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5082,7 +5153,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                 and p.prokind = 'f'
         '''.format(function_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesProcedure(self, procedure_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5115,7 +5186,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and p.prokind = 'p'
         '''.format(procedure_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesTrigger(self, schema, table, trigger_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5177,7 +5248,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             and y.trigger_name = x.trigger_name
         '''.format(schema, table, trigger_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesEventTrigger(self, event_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5198,7 +5269,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(t.evtname) = '{0}'
         '''.format(event_name))
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesAggregate(self, aggregate_name):
         return self.connection.Query(
             '''
@@ -5292,7 +5363,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             )
         )
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesPK(self, schema, table, constraint_name):
         return self.connection.Query('''
             create or replace function pg_temp.fnc_omnidb_constraint_attrs(text, text, text)
@@ -5352,7 +5423,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(c.conname) = '{2}'
         '''.format(schema, table, constraint_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesFK(self, schema, table, constraint_name):
         return self.connection.Query('''
             create or replace function pg_temp.fnc_omnidb_constraint_attrs(text, text, text)
@@ -5536,7 +5607,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(c.conname) = '{2}'
         '''.format(schema, table, constraint_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesUnique(self, schema, table, constraint_name):
         return self.connection.Query('''
             create or replace function pg_temp.fnc_omnidb_constraint_attrs(text, text, text)
@@ -5596,7 +5667,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(c.conname) = '{2}'
         '''.format(schema, table, constraint_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesCheck(self, schema, table, constraint_name):
         return self.connection.Query('''
             create or replace function pg_temp.fnc_omnidb_constraint_attrs(text, text, text)
@@ -5654,7 +5725,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(c.conname) = '{2}'
         '''.format(schema, table, constraint_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesExclude(self, schema, table, constraint_name):
         return self.connection.Query('''
             create or replace function pg_temp.fnc_omnidb_constraint_ops(text, text, text)
@@ -5739,7 +5810,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(c.conname) = '{2}'
         '''.format(schema, table, constraint_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesRule(self, schema, table, rule):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5752,7 +5823,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(rulename) = '{2}'
         '''.format(schema, table, rule))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesForeignTable(self, schema, table):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5814,7 +5885,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                 and quote_ident(c.relname) = '{1}'
         '''.format(schema, table))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesUserMapping(self, server, role_name):
         if role_name == 'PUBLIC':
             return self.connection.Query('''
@@ -5851,7 +5922,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                   and quote_ident(r.rolname) = '{1}'
             '''.format(server, role_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesForeignServer(self, server_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5870,7 +5941,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(s.srvname) = '{0}'
         '''.format(server_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesForeignDataWrapper(self, fdw_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5890,7 +5961,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(w.fdwname) = '{0}'
         '''.format(fdw_name))
     
-    @lock_required
+    @read_lock_required
     def GetPropertiesType(self, schema, type_name):
         return self.connection.Query('''
             select current_database() as "Database",
@@ -5992,7 +6063,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
               and quote_ident(t.typname) = '{1}'
         '''.format(schema, type_name))
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesPublication(self, pub_name):
         if self.version_num < 130000:
             return self.connection.Query('''
@@ -6028,7 +6099,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                 WHERE quote_ident(p.pubname) = '{0}'
             '''.format(pub_name))
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesSubscription(self, sub_name):
         return self.connection.Query('''
             SELECT d.datname AS "Database",
@@ -6048,7 +6119,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             WHERE quote_ident(s.subname) = '{0}'
         '''.format(sub_name))
 
-    @lock_required
+    @read_lock_required
     def GetPropertiesStatistic(self, schema, statistic_name):
         return self.connection.Query(
             '''
@@ -6152,7 +6223,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             else:
                 raise exc
     
-    @lock_required
+    @read_lock_required
     def GetDDLRole(self, role_name):
         return self.connection.ExecuteScalar('''
             with
@@ -6230,7 +6301,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             left join q3 on true;
         '''.format(role_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLTablespace(self, tablespace_name):
         return self.connection.ExecuteScalar('''
             select format(E'CREATE TABLESPACE %s\nLOCATION %s\nOWNER %s;%s',
@@ -6252,7 +6323,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(t.spcname) = '{0}'
         '''.format(tablespace_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLDatabase(self, database_name):
         datcollate = 'datcollate,' if self.version_num >= 80400 else ""
         datctype = 'datctype,' if self.version_num >= 80400 else ""
@@ -6322,7 +6393,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
         ''')
     
 
-    @lock_required
+    @read_lock_required
     def GetDDLExtension(self, extension_name):
         return self.connection.ExecuteScalar(
             '''
@@ -6347,7 +6418,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             )
         )
 
-    @lock_required
+    @read_lock_required
     def GetDDLSchema(self, schema_name):
         return self.connection.ExecuteScalar('''
             with obj as (
@@ -6435,7 +6506,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
              where quote_ident(n.nspname) = '{0}'
         '''.format(schema_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLClass(self, schema, class_name):
         return self.connection.ExecuteScalar('''
             with obj as (
@@ -6985,7 +7056,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                     (SELECT text FROM columnsgrants)
         '''.format(schema, class_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLTrigger(self, trigger, table, schema):
         return self.connection.ExecuteScalar('''
             select 'CREATE TRIGGER ' || x.trigger_name || chr(10) ||
@@ -7047,7 +7118,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             ) x
         '''.format(schema, table, trigger))
     
-    @lock_required
+    @read_lock_required
     def GetDDLEventTrigger(self, trigger):
         return self.connection.ExecuteScalar('''
             select format(E'CREATE EVENT TRIGGER %s\n  ON %s%s\n  EXECUTE PROCEDURE %s;\n\nALTER EVENT TRIGGER %s OWNER TO %s;\n%s',
@@ -7079,7 +7150,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(t.evtname) = '{0}'
         '''.format(trigger))
     
-    @lock_required
+    @read_lock_required
     def GetDDLFunction(self, function_name):
         return self.connection.ExecuteScalar('''
             with obj as (
@@ -7173,7 +7244,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                     (SELECT text FROM comment_on)
     '''.format(function_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLProcedure(self, procedure):
         return self.connection.ExecuteScalar('''
             with obj as (
@@ -7267,7 +7338,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                    (SELECT text FROM comment_on)
         '''.format(procedure))
     
-    @lock_required
+    @read_lock_required
     def GetDDLConstraint(self, schema, table, constraint_name):
         return self.connection.ExecuteScalar('''
             with cs as (
@@ -7315,7 +7386,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                      c.sql
         '''.format(schema, table, constraint_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLUserMapping(self, server, role_name):
         if role_name == 'PUBLIC':
             return self.connection.ExecuteScalar('''
@@ -7375,7 +7446,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                   and quote_ident(r.rolname) = '{1}'
             '''.format(server, role_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLForeignServer(self, server_name):
         return self.connection.ExecuteScalar('''
             WITH privileges AS (
@@ -7495,7 +7566,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(s.srvname) = '{0}'
         '''.format(server_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLForeignDataWrapper(self, fdw):
         return self.connection.ExecuteScalar('''
             WITH privileges AS (
@@ -7612,7 +7683,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             where quote_ident(w.fdwname) = '{0}'
         '''.format(fdw))
     
-    @lock_required
+    @read_lock_required
     def GetDDLType(self, schema, type_name):
         typtype = self.connection.ExecuteScalar('''
             select t.typtype
@@ -7761,7 +7832,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                   and quote_ident(t.typname) = '{1}'
             '''.format(schema, type_name))
     
-    @lock_required
+    @read_lock_required
     def GetDDLDomain(self, schema, type_name):
         return self.connection.ExecuteScalar('''
             with domain as (
@@ -7823,7 +7894,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                    )
         '''.format(schema, type_name))
 
-    @lock_required
+    @read_lock_required
     def GetDDLPublication(self, pub_name):
         if self.version_num < 130000:
             return self.connection.ExecuteScalar("""
@@ -8034,7 +8105,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                         ON 1 = 1
             """.format(pub_name))
 
-    @lock_required
+    @read_lock_required
     def GetDDLSubscription(self, sub_name):
         return self.connection.ExecuteScalar("""
             WITH subscription AS (
@@ -8100,7 +8171,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
                     ON 1 = 1
         """.format(sub_name))
 
-    @lock_required
+    @read_lock_required
     def GetDDLStatistic(self, schema, statistic):
         return self.connection.ExecuteScalar(
             """
@@ -8215,7 +8286,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             )
         )
 
-    @lock_required
+    @read_lock_required
     def GetDDLAggregate(self, aggregate_name):
         return self.connection.ExecuteScalar(
             '''
@@ -8461,7 +8532,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             )
         )
 
-    @lock_required
+    @read_lock_required
     def GetDDLTableField(self, schema, table, table_field):
         if self.version_num < 130000:
             return self.connection.ExecuteScalar(
@@ -8800,7 +8871,8 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
         else:
             return ''
 
-    @lock_required
+    @catalog_cached
+    @read_lock_required
     def GetAutocompleteValues(self, columns, query_filter):
         return self.connection.Query('''
             select {0}
@@ -8970,7 +9042,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             )
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionAggregate(self, oid):
         row = self.connection.Query(
             '''
@@ -8986,7 +9058,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionTableField(self, oid, position):
         row = self.connection.Query(
             '''
@@ -9010,7 +9082,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionConstraint(self, oid):
         row = self.connection.Query(
             '''
@@ -9030,7 +9102,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionDatabase(self, oid):
         row = self.connection.Query(
             '''
@@ -9048,7 +9120,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionDomain(self, oid):
         row = self.connection.Query(
             '''
@@ -9064,7 +9136,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionExtension(self, oid):
         row = self.connection.Query(
             '''
@@ -9082,7 +9154,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionEventTrigger(self, oid):
         row = self.connection.Query(
             '''
@@ -9100,7 +9172,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionForeignDataWrapper(self, oid):
         row = self.connection.Query(
             '''
@@ -9118,7 +9190,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionForeignServer(self, oid):
         row = self.connection.Query(
             '''
@@ -9136,7 +9208,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionForeignTable(self, oid):
         row = self.connection.Query(
             '''
@@ -9152,7 +9224,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionFunction(self, oid):
         row = self.connection.Query(
             '''
@@ -9168,7 +9240,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionIndex(self, oid):
         row = self.connection.Query(
             '''
@@ -9184,7 +9256,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionMaterializedView(self, oid):
         row = self.connection.Query(
             '''
@@ -9200,7 +9272,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionProcedure(self, oid):
         row = self.connection.Query(
             '''
@@ -9216,7 +9288,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionPublication(self, oid):
         row = self.connection.Query(
             '''
@@ -9234,7 +9306,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionRole(self, oid):
         row = self.connection.Query(
             '''
@@ -9250,7 +9322,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionRule(self, oid):
         row = self.connection.Query(
             '''
@@ -9272,7 +9344,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionSchema(self, oid):
         row = self.connection.Query(
             '''
@@ -9288,7 +9360,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionSequence(self, oid):
         row = self.connection.Query(
             '''
@@ -9304,7 +9376,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionStatistic(self, oid):
         row = self.connection.Query(
             '''
@@ -9322,7 +9394,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionSubscription(self, oid):
         row = self.connection.Query(
             '''
@@ -9340,7 +9412,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionTable(self, oid):
         row = self.connection.Query(
             '''
@@ -9356,7 +9428,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionTablespace(self, oid):
         row = self.connection.Query(
             '''
@@ -9374,7 +9446,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionTrigger(self, oid):
         row = self.connection.Query(
             '''
@@ -9394,7 +9466,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionType(self, oid):
         row = self.connection.Query(
             '''
@@ -9410,7 +9482,7 @@ CREATE MATERIALIZED VIEW {0}.{1} AS
             row['description']
         )
 
-    @lock_required
+    @read_lock_required
     def GetObjectDescriptionView(self, oid):
         row = self.connection.Query(
             '''
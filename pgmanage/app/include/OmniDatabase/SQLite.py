@@ -217,38 +217,71 @@ class SQLite:
                 'table_name'
             ]
             for r in table_columns_tmp.Rows:
-                row = []
-                row.append(r['name'])
-                if '(' in r['type']:
-                    index = r['type'].find('(')
-                    data_type = r['type'].lower()[0 : index]
-                    if ',' in r['type']:
-                        sizes = r['type'][index + 1 : r['type'].find(')')].split(',')
-                        data_length = ''
-                        data_precision = sizes[0]
-                        data_scale = sizes[1]
-                    else:
-                        data_length = r['type'][index + 1 : r['type'].find(')')]
-                        data_precision = ''
-                        data_scale = ''
-                else:
-                    data_type = r['type'].lower()
-                    data_length = ''
-                    data_precision = ''
-                    data_scale = ''
-                row.append(data_type)
-                if r['notnull'] == '1':
-                    row.append('NO')
-                else:
-                    row.append('YES')
-                row.append(data_length)
-                row.append(data_precision)
-                row.append(data_scale)
-                row.append(table['table_name'])
+                row = self.BuildFieldRow(r, table['table_name'])
                 table_columns.Rows.append(OrderedDict(zip(table_columns.Columns, row)))
             table_columns_all.Merge(table_columns)
         return table_columns_all
 
+    def BuildFieldRow(self, column_info, table_name):
+        row = []
+        row.append(column_info['name'])
+        if '(' in column_info['type']:
+            index = column_info['type'].find('(')
+            data_type = column_info['type'].lower()[0 : index]
+            if ',' in column_info['type']:
+                sizes = column_info['type'][index + 1 : column_info['type'].find(')')].split(',')
+                data_length = ''
+                data_precision = sizes[0]
+                data_scale = sizes[1]
+            else:
+                data_length = column_info['type'][index + 1 : column_info['type'].find(')')]
+                data_precision = ''
+                data_scale = ''
+        else:
+            data_type = column_info['type'].lower()
+            data_length = ''
+            data_precision = ''
+            data_scale = ''
+        row.append(data_type)
+        if column_info['notnull'] == '1':
+            row.append('NO')
+        else:
+            row.append('YES')
+        row.append(data_length)
+        row.append(data_precision)
+        row.append(data_scale)
+        row.append(table_name)
+        return row
+
+    def QueryFieldsGrouped(self, object_type):
+        fields = self.connection.Query('''
+            select quote(m.name) as table_name,
+                   p.name,
+                   p.type,
+                   p."notnull"
+            from sqlite_master m
+            inner join pragma_table_info(m.name) p
+            where m.type = '{0}'
+            order by m.name, p.cid
+        '''.format(object_type), True)
+        table_columns = Spartacus.Database.DataTable()
+        table_columns.Columns = [
+            'column_name',
+            'data_type',
+            'nullable',
+            'data_length',
+            'data_precision',
+            'data_scale',
+            'table_name'
+        ]
+        for r in fields.Rows:
+            table_columns.AddRow(self.BuildFieldRow(r, r['table_name']))
+        return table_columns.GroupBy('table_name')
+
+    @lock_required
+    def QueryTablesFieldsGrouped(self, *args):
+        return self.QueryFieldsGrouped('table')
+
     @lock_required
     def QueryTablesForeignKeys(self, table_name=None, *args):
         fks_all = Spartacus.Database.DataTable()
@@ -668,38 +701,15 @@ class SQLite:
                 'table_name'
             ]
             for r in table_columns_tmp.Rows:
-                row = []
-                row.append(r['name'])
-                if '(' in r['type']:
-                    index = r['type'].find('(')
-                    data_type = r['type'].lower()[0 : index]
-                    if ',' in r['type']:
-                        sizes = r['type'][index + 1 : r['type'].find(')')].split(',')
-                        data_length = ''
-                        data_precision = sizes[0]
-                        data_scale = sizes[1]
-                    else:
-                        data_length = r['type'][index + 1 : r['type'].find(')')]
-                        data_precision = ''
-                        data_scale = ''
-                else:
-                    data_type = r['type'].lower()
-                    data_length = ''
-                    data_precision = ''
-                    data_scale = ''
-                row.append(data_type)
-                if r['notnull'] == '1':
-                    row.append('NO')
-                else:
-                    row.append('YES')
-                row.append(data_length)
-                row.append(data_precision)
-                row.append(data_scale)
-                row.append(table['table_name'])
+                row = self.BuildFieldRow(r, table['table_name'])
                 table_columns.Rows.append(OrderedDict(zip(table_columns.Columns, row)))
             table_columns_all.Merge(table_columns)
         return table_columns_all
 
+    @lock_required
+    def QueryViewFieldsGrouped(self, *args):
+        return self.QueryFieldsGrouped('view')
+
     @lock_required
     def QueryTablesTriggers(self, p_table=None):
         return self.connection.Query('''
@@ -0,0 +1,169 @@
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import app.include.Spartacus as Spartacus
+
+from pgmanage import settings
+
+# statements that may change what catalog queries return
+DDL_REGEX = re.compile(
+    r"(?:^|;)\s*(?:create|alter|drop|comment|grant|revoke|rename|import\s+foreign\s+schema|security\s+label)\b",
+    re.IGNORECASE,
+)
+
+
+def get_namespace(database) -> tuple:
+    """Identifies the database a cached result belongs to.
+
+    Every tab gets its own database object, so results are shared by all objects
+    pointing to the same database with the same user.
+
+    Args:
+        database: OmniDatabase object.
+
+    Returns:
+        tuple: The cache namespace of the database.
+    """
+    return (
+        database.conn_id,
+        getattr(database, "active_server", ""),
+        str(getattr(database, "active_port", "")),
+        database.active_service,
+        database.active_user,
+    )
+
+
+def copy_result(result: Any) -> Any:
+    """Copies a cached result so callers can modify it without affecting the cache.
+
+    Args:
+        result (Any): The cached result.
+
+    Returns:
+        Any: A copy of the result sharing the row objects.
+    """
+    if isinstance(result, Spartacus.Database.DataTable):
+        table = copy.copy(result)
+        table.Columns = list(result.Columns)
+        table.Rows = list(result.Rows)
+        return table
+    return copy.copy(result)
+
+
+class CatalogCache:
+    """
+    LRU cache with TTL for catalog queries, grouped by database.
+
+    A namespace is validated with a cheap catalog fingerprint at most every
+    CATALOG_CACHE_CHECK_INTERVAL seconds, all its entries are dropped when the
+    fingerprint changes, which covers DDL executed outside of PgManage.
+
+    Attributes:
+        _lock (threading.Lock): A lock guarding the entries and fingerprints.
+        _entries (OrderedDict): Cached results in LRU order, keyed by (namespace, key).
+        _fingerprints (dict): Last known fingerprint and check time of each namespace.
+        _generations (dict): Incremented whenever a namespace is dropped, so results of
+            queries that were running at that moment are not stored.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._fingerprints = {}
+        self._generations = {}
+
+    def _drop_namespace(self, namespace: tuple) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        for entry_key in [k for k in self._entries if k[0] == namespace]:
+            del self._entries[entry_key]
+
+    def _validate(
+        self, namespace: tuple, fingerprint: Optional[Callable[[], Any]]
+    ) -> None:
+        if fingerprint is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            last = self._fingerprints.get(namespace)
+            if last and now - last[0] < settings.CATALOG_CACHE_CHECK_INTERVAL:
+                return
+        try:
+            value = fingerprint()
+        except Exception:
+            # without a fingerprint nothing cached can be trusted
+            value = None
+        with self._lock:
+            if last is None or value is None or last[1] != value:
+                self._drop_namespace(namespace)
+            self._fingerprints[namespace] = (now, value)
+
+    def get_or_query(
+        self,
+        database,
+        key: tuple,
+        query: Callable[[], Any],
+        fingerprint: Optional[Callable[[], Any]] = None,
+    ) -> Any:
+        """Returns a cached result, running the query when it is missing or expired.
+
+        Args:
+            database: OmniDatabase object the query runs on.
+            key (tuple): Identifies the query within the database, usually method name and arguments.
+            query (Callable[[], Any]): Runs the query.
+            fingerprint (Optional[Callable[[], Any]], optional): Returns a value that changes with the catalog.
+
+        Returns:
+            Any: A copy of the result.
+        """
+        if settings.CATALOG_CACHE_TTL <= 0:
+            return query()
+
+        namespace = get_namespace(database)
+        self._validate(namespace, fingerprint)
+
+        entry_key = (namespace, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry and now - entry[0] < settings.CATALOG_CACHE_TTL:
+                self._entries.move_to_end(entry_key)
+                return copy_result(entry[1])
+            generation = self._generations.get(namespace, 0)
+
+        result = query()
+
+        with self._lock:
+            if generation != self._generations.get(namespace, 0):
+                return copy_result(result)
+            self._entries[entry_key] = (now, result)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > settings.CATALOG_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return copy_result(result)
+
+    def invalidate(self, database) -> None:
+        """Drops every cached result of a database.
+
+        Args:
+            database: OmniDatabase object.
+        """
+        namespace = get_namespace(database)
+        with self._lock:
+            self._drop_namespace(namespace)
+            self._fingerprints.pop(namespace, None)
+
+    def clear(self) -> None:
+        """
+        Drops every cached result.
+        """
+        with self._lock:
+            for namespace in {k[0] for k in self._entries} | set(self._fingerprints):
+                self._drop_namespace(namespace)
+            self._fingerprints.clear()
+
+
+catalog_cache = CatalogCache()
@@ -25,15 +25,18 @@ SOFTWARE.
 import base64
 import datetime
 import decimal
+import hashlib
 import json
 import math
 import re
+import threading
 from abc import ABC, abstractmethod
 from collections import OrderedDict
 from urllib.parse import urlparse
 
 import app.include.Spartacus as Spartacus
-from prettytable import PrettyTable, from_db_cursor
+import wcwidth
+from prettytable import from_db_cursor
 
 supported_rdbms = []
 
@@ -91,6 +94,31 @@ except ImportError:
     pass
 
 
+# escape sequences PrettyTable leaves out of the width of a text
+PRETTY_ESCAPE_REGEX = re.compile(r"\033\[[0-9;]*m|\033\(B")
+PRETTY_LINK_REGEX = re.compile(r"\033\]8;;.*?\033\\(.*?)\033\]8;;\033\\")
+
+
+def TextWidth(text):
+    """
+    Returns the terminal width of a line of text, as PrettyTable computes it.
+    """
+    if text.isascii() and text.isprintable():
+        return len(text)
+    return wcwidth.wcswidth(
+        PRETTY_ESCAPE_REGEX.sub("", PRETTY_LINK_REGEX.sub(r"\1", text))
+    )
+
+
+def BlockWidth(text):
+    """
+    Returns the terminal width of the widest line of a text.
+    """
+    if "\n" not in text:
+        return TextWidth(text)
+    return max(TextWidth(line) for line in text.split("\n"))
+
+
 class Exception(Exception):
     pass
 
@@ -100,13 +128,87 @@ class InvalidPasswordException(Exception):
 
 
 class DataTable(object):
+    """
+    Result of a query.
+
+    Rows added with AddRow are kept as plain tuples sharing the column list of
+    the table. Row dicts (or lists for simple tables) and the string conversion
+    of alltypesstr tables are only built when Rows is accessed, so callers that
+    only need RowCount, Column, IterValues or Jsonify never pay for them.
+    """
+
+    __slots__ = (
+        "Name",
+        "Columns",
+        "ColumnTypeCodes",
+        "AllTypesStr",
+        "Simple",
+        "_values",
+        "_rows",
+    )
+
     def __init__(self, name=None, alltypesstr=False, simple=False):
         self.Name = name
         self.Columns = []
         self.ColumnTypeCodes = []
-        self.Rows = []
         self.AllTypesStr = alltypesstr
         self.Simple = simple
+        # exactly one of _values (compact tuples) and _rows (materialized rows) is in use
+        self._values = []
+        self._rows = None
+
+    @property
+    def Rows(self):
+        if self._rows is None:
+            if self.Simple:
+                self._rows = [list(values) for values in self._IterCompact()]
+            else:
+                columns = self.Columns
+                self._rows = [
+                    OrderedDict(zip(columns, values)) for values in self._IterCompact()
+                ]
+            self._values = None
+        return self._rows
+
+    @Rows.setter
+    def Rows(self, rows):
+        self._rows = rows
+        self._values = None
+
+    @property
+    def RowCount(self):
+        if self._rows is None:
+            return len(self._values)
+        return len(self._rows)
+
+    def _IterCompact(self):
+        if self.AllTypesStr:
+            for values in self._values:
+                yield tuple(str(x) if x is not None else "" for x in values)
+        else:
+            yield from self._values
+
+    def IterValues(self):
+        """Yields the values of each row in column order without building row dicts."""
+        if self._rows is None:
+            yield from self._IterCompact()
+        else:
+            columns = self.Columns
+            for r in self._rows:
+                if isinstance(r, dict):
+                    yield tuple(r[c] for c in columns)
+                else:
+                    yield r
+
+    def Column(self, column_name):
+        """Returns all the values of a column as a list."""
+        try:
+            k = self.Columns.index(column_name)
+        except ValueError:
+            raise Spartacus.Database.Exception(
+                "Column {0} does not exist.".format(column_name)
+            )
+        return [values[k] for values in self.IterValues()]
 
     def AddColumn(self, column_name):
         self.Columns.append(column_name)
@@ -125,16 +227,33 @@ class DataTable(object):
                 "Can not add row to a table with different columns."
             )
 
-        if not isinstance(row, list):
-            row = list(row)
+        if self._rows is None:
+            self._values.append(tuple(row))
+            return
 
         if self.AllTypesStr:
             row = [str(x) if x is not None else "" for x in row]
+        elif not isinstance(row, list):
+            row = list(row)
 
-        self.Rows.append(
+        self._rows.append(
             row if self.Simple else OrderedDict(zip(self.Columns, row))
         )
 
+    def AddRows(self, rows):
+        """Appends a block of rows fetched from the same cursor, only the first one is validated."""
+        if not rows:
+            return
+        if len(self.Columns) != len(rows[0]):
+            raise Spartacus.Database.Exception(
+                "Can not add row to a table with different columns."
+            )
+        if self._rows is None:
+            self._values.extend(map(tuple, rows))
+        else:
+            for row in rows:
+                self.AddRow(row)
+
     def Select(self, key, value):
         if not isinstance(key, list):
             key = [key]
@@ -374,6 +493,11 @@ class DataTable(object):
             )
 
     def Jsonify(self):
+        if self._rows is None:
+            columns = self.Columns
+            return json.dumps(
+                [OrderedDict(zip(columns, values)) for values in self._IterCompact()]
+            )
         if self.Simple:
             if len(self.Rows) > 0:
                 if isinstance(self.Rows[0], OrderedDict):
@@ -403,143 +527,126 @@ class DataTable(object):
             else:
                 return json.dumps(self.Rows)
 
-    def Pretty(self, transpose=False):
-        if self.Simple:
-            if transpose:
-                maxc = 0
-                for c in self.Columns:
-                    if len(c) > maxc:
-                        maxc = len(c)
-                if maxc < (14 + len(str(len(self.Rows)))):
-                    maxc = 14 + len(str(len(self.Rows)))
-                else:
-                    maxc = maxc + 1
-                k = 0
-                s = 0
-                maxf = 0
-                for r in self.Rows:
-                    for c in range(0, len(self.Columns)):
-                        for snippet in str(r[c]).split("\n"):
-                            k = k + 1
-                            s = s + len(snippet)
-                            if len(str(r[c])) > maxf:
-                                maxf = len(snippet)
-                if maxf > 30:
-                    maxf = int(s / k) + int((maxf - int(s / k)) / 2)
-                maxf = maxf + 10
-                return_string = ""
-                row = 1
-                for r in self.Rows:
-                    aux = "-[ RECORD {0} ]".format(row)
-                    for k in range(len(aux), maxc):
-                        aux = aux + "-"
-                    return_string = return_string + aux + "+"
-                    for k in range(0, maxf):
-                        return_string = return_string + "-"
-                    return_string = return_string + "\n"
-                    for c in range(0, len(self.Columns)):
-                        first = True
-                        for snippet in str(r[c]).split("\n"):
-                            n = math.ceil(len(snippet) / (maxf - 2))
-                            j = 0
-                            for i in range(0, n):
-                                if first:
-                                    x = self.Columns[c].ljust(maxc)
-                                    first = False
-                                else:
-                                    x = " ".ljust(maxc)
-                                if i < n - 1:
-                                    y = " " + snippet[j : j + maxf - 2] + "+"
-                                    j = j + maxf - 2
-                                else:
-                                    y = " " + snippet[j:]
-                                return_string = return_string + "{0}|{1}\n".format(x, y)
-                    row = row + 1
-                return return_string
-            else:
-                table = PrettyTable()
-                table.field_names = self.Columns
-                table.align = "l"
-                table.add_rows(self.Rows)
-                table_string = table.get_string()
-                return table_string
+    def Pretty(self, transpose=False, newline="\n"):
+        return "".join(self.IterPretty(transpose, newline))
+
+    def IterPretty(self, transpose=False, newline="\n"):
+        """
+        Yields the lines of the text rendering of the table, each one ending with
+        newline. The table is drawn like PrettyTable, transpose draws every row as a
+        record like psql expanded mode.
+        """
+        if transpose:
+            return self._IterExpanded(newline)
+        return self._IterGrid(newline)
+
+    def _IterExpanded(self, newline):
+        rows = [[str(value) for value in values] for values in self.IterValues()]
+        maxc = 0
+        for c in self.Columns:
+            if len(c) > maxc:
+                maxc = len(c)
+        if maxc < (14 + len(str(len(rows)))):
+            maxc = 14 + len(str(len(rows)))
         else:
-            if transpose:
-                maxc = 0
-                for c in self.Columns:
-                    if len(c) > maxc:
-                        maxc = len(c)
-                if maxc < (14 + len(str(len(self.Rows)))):
-                    maxc = 14 + len(str(len(self.Rows)))
-                else:
-                    maxc = maxc + 1
-                k = 0
-                s = 0
-                maxf = 0
-                for r in self.Rows:
-                    for c in self.Columns:
-                        for snippet in str(r[c]).split("\n"):
-                            k = k + 1
-                            s = s + len(snippet)
-                            if len(str(r[c])) > maxf:
-                                maxf = len(snippet)
-                if maxf > 30:
-                    maxf = int(s / k) + int((maxf - int(s / k)) / 2)
-                maxf = maxf + 10
-                return_string = ""
-                row = 1
-                for r in self.Rows:
-                    aux = "-[ RECORD {0} ]".format(row)
-                    for k in range(len(aux), maxc):
-                        aux = aux + "-"
-                    return_string = return_string + aux + "+"
-                    for k in range(0, maxf):
-                        return_string = return_string + "-"
-                    return_string = return_string + "\n"
-                    for c in self.Columns:
-                        first = True
-                        for snippet in str(r[c]).split("\n"):
-                            n = math.ceil(len(snippet) / (maxf - 2))
-                            j = 0
-                            for i in range(0, n):
-                                if first:
-                                    x = c.ljust(maxc)
-                                    first = False
-                                else:
-                                    x = " ".ljust(maxc)
-                                if i < n - 1:
-                                    y = " " + snippet[j : j + maxf - 2] + "+"
-                                    j = j + maxf - 2
-                                else:
-                                    y = " " + snippet[j:]
-                                return_string = return_string + "{0}|{1}\n".format(x, y)
-                    row = row + 1
-                return return_string
-            else:
-                table = PrettyTable()
-                table.field_names = self.Columns
-                table.align = "l"
-                table.add_rows(self.Rows)
-                table_string = table.get_string()
-                return table_string
+            maxc = maxc + 1
+        k = 0
+        s = 0
+        maxf = 0
+        for r in rows:
+            for value in r:
+                for snippet in value.split("\n"):
+                    k = k + 1
+                    s = s + len(snippet)
+                    if len(value) > maxf:
+                        maxf = len(snippet)
+        if maxf > 30:
+            maxf = int(s / k) + int((maxf - int(s / k)) / 2)
+        maxf = maxf + 10
+        width = maxf - 2
+        labels = [c.ljust(maxc) for c in self.Columns]
+        blank = " ".ljust(maxc)
+        border = "+" + "-" * maxf + newline
+        for row, r in enumerate(rows, 1):
+            yield "-[ RECORD {0} ]".format(row).ljust(maxc, "-") + border
+            for label, value in zip(labels, r):
+                for snippet in value.split("\n"):
+                    # long values are wrapped, empty lines are left out
+                    n = math.ceil(len(snippet) / width)
+                    for i in range(n):
+                        y = snippet[i * width : (i + 1) * width]
+                        yield "{0}| {1}{2}{3}".format(
+                            label, y, "+" if i < n - 1 else "", newline
+                        )
+                        label = blank
+
+    def _IterGrid(self, newline):
+        header = [str(c) for c in self.Columns]
+        rows = [[str(value) for value in values] for values in self.IterValues()]
+        widths = [BlockWidth(h) for h in header]
+        for r in rows:
+            for i, value in enumerate(r):
+                w = BlockWidth(value)
+                if w > widths[i]:
+                    widths[i] = w
+        if widths:
+            rule = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+        else:
+            rule = "++"
+        yield rule + newline
+        yield "|" + "|".join(
+            " " + h + " " * (w - TextWidth(h)) + " " for h, w in zip(header, widths)
+        ) + "|" + newline
+        yield rule + newline
+        for r in rows:
+            if not widths:
+                yield newline
+                continue
+            if not any("\n" in value for value in r):
+                yield "|" + "|".join(
+                    " " + value + " " * (w - TextWidth(value)) + " "
+                    for value, w in zip(r, widths)
+                ) + "|" + newline
+                continue
+            # multi-line values take one table line per line of text
+            lines = [value.split("\n") for value in r]
+            for y in range(max(len(l) for l in lines)):
+                yield "|" + "|".join(
+                    " " + line + " " * (w - TextWidth(line)) + " "
+                    for line, w in (
+                        (l[y] if y < len(l) else "", w) for l, w in zip(lines, widths)
+                    )
+                ) + "|" + newline
+        yield rule
 
     def Transpose(self, column_1, column_2):
-        if len(self.Rows) == 1:
+        if self.RowCount == 1:
             table = Spartacus.Database.DataTable()
             table.AddColumn(column_1)
             table.AddColumn(column_2)
-            if self.Simple:
-                for k in range(len(self.Columns)):
-                    table.AddRow([self.Columns[k], self.Rows[0][k]])
-            else:
-                for c in self.Columns:
-                    table.AddRow([c, self.Rows[0][c]])
+            values = next(self.IterValues())
+            for k in range(len(self.Columns)):
+                table.AddRow([self.Columns[k], values[k]])
             return table
         else:
             raise Spartacus.Database.Exception(
                 "Can only transpose a table with a single row."
             )
 
+    def GroupBy(self, columns):
+        """Groups rows by the value of one column, or by a tuple of values if a list of columns is given.
+
+        Returns an OrderedDict mapping each key to its rows, in the order the keys first appear.
+        """
+        if isinstance(columns, list):
+            get_key = lambda r: tuple(r[c] for c in columns)
+        else:
+            get_key = lambda r: r[columns]
+        groups = OrderedDict()
+        for r in self.Rows:
+            groups.setdefault(get_key(r), []).append(r)
+        return groups
+
     def Distinct(self, pkcols):
         table = Spartacus.Database.DataTable(
             None, alltypesstr=self.AllTypesStr, simple=self.Simple
@@ -685,6 +792,27 @@ class Generic(ABC):
             ret = str(value)
         return ret
 
+    def ConvertColumns(self, rows, converters, null=None):
+        """
+        Converts a block of rows column by column and returns them as lists.
+        A converter of None keeps the values of its column, None values are replaced by null.
+        """
+        if not rows:
+            return rows
+        columns = list(zip(*rows))
+        changed = False
+        for j, convert in enumerate(converters):
+            if convert is None:
+                if null is None:
+                    continue
+                columns[j] = [null if v is None else v for v in columns[j]]
+            else:
+                columns[j] = [null if v is None else convert(v) for v in columns[j]]
+            changed = True
+        if not changed:
+            return rows
+        return [list(r) for r in zip(*columns)]
+
     def MogrifyValue(self, value):
         if type(value) == type(list()):
             ret = self.MogrifyArray(value)
@@ -780,9 +908,9 @@ class Generic(ABC):
                 if sql is not None
                 else table
             )
-            if len(table.Rows) > 0:
+            if table.RowCount > 0:
                 target_database.InsertBlock(table, tablename, fields)
-            data.numrecords = len(table.Rows)
+            data.numrecords = table.RowCount
             data.hasmorerecords = not self.start
         except Spartacus.Database.Exception as exc:
             data.log = str(exc)
@@ -992,7 +1120,7 @@ class SQLite(Generic):
                     table.AddColumn(c[0])
                 row = self.cur.fetchone()
                 while row is not None:
-                    table.AddRow(list(row))
+                    table.AddRow(row)
                     row = self.cur.fetchone()
             return table
         except Spartacus.Database.Exception as exc:
@@ -1165,17 +1293,17 @@ class SQLite(Generic):
                     if blocksize > 0:
                         k = 0
                         while row is not None and k < blocksize:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             k = k + 1
                             if k < blocksize:
                                 row = self.cur.fetchone()
                     else:
                         while row is not None:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             row = self.cur.fetchone()
                 if self.start:
                     self.start = False
-                if len(table.Rows) < blocksize:
+                if table.RowCount < blocksize:
                     self.start = True
                 return table
         except Spartacus.Database.Exception as exc:
@@ -1295,7 +1423,7 @@ class Memory(Generic):
                         table.AddColumn(c[0])
                     row = self.cur.fetchone()
                     while row is not None:
-                        table.AddRow(list(row))
+                        table.AddRow(row)
                         row = self.cur.fetchone()
                 return table
         except Spartacus.Database.Exception as exc:
@@ -1452,13 +1580,13 @@ class Memory(Generic):
                     if blocksize > 0:
                         k = 0
                         while row is not None and k < blocksize:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             k = k + 1
                             if k < blocksize:
                                 row = self.cur.fetchone()
                     else:
                         while row is not None:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             row = self.cur.fetchone()
                 if self.start:
                     self.start = False
@@ -1513,6 +1641,310 @@ PostgreSQL
 """
 
 
+# statements that create, rename or drop entries in pg_type
+TYPE_DDL_REGEX = re.compile(
+    r"\b(?:create|alter|drop)\s+(?:\w+\s+){0,3}?(?:type|domain|table|view|sequence|extension)\b",
+    re.IGNORECASE,
+)
+
+# alltypesstr converters of built-in types keyed by oid, None keeps the value.
+# Character, json, interval and date/time types already arrive as str, see
+# PostgreSQL.Handler and the type registrations in PostgreSQL.__init__
+STRING_CONVERTERS = {
+    16: str,  # bool
+    18: None,  # char
+    19: None,  # name
+    20: int.__repr__,  # int8
+    21: int.__repr__,  # int2
+    23: int.__repr__,  # int4
+    25: None,  # text
+    26: int.__repr__,  # oid
+    114: None,  # json
+    700: float.__repr__,  # float4
+    701: float.__repr__,  # float8
+    705: None,  # unknown
+    790: None,  # money
+    1042: None,  # bpchar
+    1043: None,  # varchar
+    1082: None,  # date
+    1083: datetime.time.isoformat,  # time
+    1114: None,  # timestamp
+    1184: None,  # timestamptz
+    1186: None,  # interval
+    1266: datetime.time.isoformat,  # timetz
+    1700: decimal.Decimal.__str__,  # numeric
+    2950: None,  # uuid
+    3802: None,  # jsonb
+}
+
+
+# PostgreSQL.Parse looks for the SELECT that receives the result cursor. Scripts are
+# split by a scanner that agrees with sqlparse.split, statements are classified by
+# their first keyword and sqlparse only runs for constructs the two may read
+# differently. Results are cached by the sha1 of the script, so running the same
+# text again skips parsing.
+PARSE_CACHE_SIZE = 256
+
+PARSE_SCAN_REGEX = re.compile(
+    r"[;()'\"$\[`´#]|--|/\*|%\(\w+\)s"
+    r"|(?<![\w$.])(select|into|with|insert|update|delete|upsert|replace|merge"
+    r"|commit|rollback|start|create|begin|declare|go)(?![\w$#])(?!\s*\.|\()",
+    re.IGNORECASE,
+)
+# sqlparse reads a word followed by a dot, a cast or a parenthesis as a name
+PARSE_FIRST_WORD_REGEX = re.compile(r"(?!\d)\w[\w$#]*(\s*(?:\.|::)|\()?")
+PARSE_STRING_REGEX = re.compile(r"'(?:[^']|'')*'")
+PARSE_IDENTIFIER_REGEX = re.compile(r'"(?:[^"]|"")*"')
+PARSE_DOLLAR_TAG_REGEX = re.compile(r"\$(?:[A-Za-z_]\w*)?\$")
+PARSE_BRACKET_REGEX = re.compile(r"\[[^\]\[]+\]")
+# sqlparse tokenizes these as DML keywords, see the CTE check in PostgreSQL.Parse
+PARSE_DML_WORDS = {
+    "INSERT",
+    "UPDATE",
+    "DELETE",
+    "UPSERT",
+    "REPLACE",
+    "MERGE",
+    "COMMIT",
+    "ROLLBACK",
+    "START",
+}
+# sqlparse reads "--" and "/*" after these characters as part of an operator
+PARSE_OPERATOR_CHARS = "+/@#%^&|-"
+
+parse_cache = OrderedDict()
+parse_cache_lock = threading.Lock()
+
+
+class AmbiguousSQL(Exception):
+    pass
+
+
+def _ParseLineEnd(sql, pos):
+    for index in range(pos, len(sql)):
+        if sql[index] == "\n":
+            return index + 1
+        if sql[index] == "\r":
+            return index + 2 if sql.startswith("\r\n", index) else index + 1
+    return len(sql)
+
+
+def _ParseBlockCommentEnd(sql, pos):
+    end = sql.find("*/", pos + 2)
+    # PostgreSQL nests block comments, sqlparse does not
+    if end < 0 or sql.find("/*", pos + 2, end) >= 0:
+        raise AmbiguousSQL()
+    return end + 2
+
+
+def _ParseSkipComments(sql, pos):
+    length = len(sql)
+    while pos < length:
+        if sql[pos].isspace():
+            pos += 1
+        elif sql.startswith("--", pos):
+            pos = _ParseLineEnd(sql, pos)
+        elif sql.startswith("/*", pos):
+            pos = _ParseBlockCommentEnd(sql, pos)
+        elif sql.startswith("# ", pos):
+            raise AmbiguousSQL()
+        else:
+            break
+    return pos
+
+
+def _ParseStatementEnd(sql, pos):
+    # like sqlparse, whitespace and "--" comments on the line of the semicolon belong
+    # to the statement it ends
+    length = len(sql)
+    while pos < length:
+        if sql[pos] in "\r\n":
+            break
+        if sql[pos].isspace():
+            pos += 1
+        elif sql.startswith("--", pos) and not sql.startswith("--+", pos):
+            pos = _ParseLineEnd(sql, pos)
+        elif sql.startswith("# ", pos):
+            raise AmbiguousSQL()
+        else:
+            break
+    return pos
+
+
+def _ParseSkipQuoted(sql, match):
+    token = match.group()
+    pos = match.end()
+    previous = sql[match.start() - 1] if match.start() > 0 else ""
+    if token == "'" or token == '"':
+        regex = PARSE_STRING_REGEX if token == "'" else PARSE_IDENTIFIER_REGEX
+        quoted = regex.match(sql, match.start())
+        # sqlparse reads backslashes as escapes, PostgreSQL does not
+        if quoted is None or "\\" in quoted.group():
+            raise AmbiguousSQL()
+        return quoted.end()
+    if token == "$":
+        # sqlparse reads "#" as part of a word or as an operator, depending on what
+        # precedes it
+        if previous == "#":
+            raise AmbiguousSQL()
+        if previous and (previous.isalnum() or previous in '_"$'):
+            return pos
+        tag = PARSE_DOLLAR_TAG_REGEX.match(sql, match.start())
+        if tag is None:
+            if pos < len(sql) and not sql[pos].isascii():
+                raise AmbiguousSQL()
+            return pos
+        end = sql.find(tag.group(), tag.end())
+        if end < 0:
+            raise AmbiguousSQL()
+        return end + len(tag.group())
+    if token == "--" or token == "/*":
+        if previous and previous in PARSE_OPERATOR_CHARS:
+            raise AmbiguousSQL()
+        if token == "--":
+            return _ParseLineEnd(sql, match.start())
+        return _ParseBlockCommentEnd(sql, match.start())
+    if token == "#":
+        if sql.startswith(" ", pos):
+            raise AmbiguousSQL()
+        return pos
+    if token == "[":
+        if previous and (previous.isalnum() or previous in "_])"):
+            return pos
+        bracket = PARSE_BRACKET_REGEX.match(sql, match.start())
+        if bracket is None:
+            return pos
+        if any(c in bracket.group() for c in ";()'\"$-/#`´"):
+            raise AmbiguousSQL()
+        return bracket.end()
+    # backtick and acute accent quoted names, psycopg2 placeholders
+    raise AmbiguousSQL()
+
+
+def ScanStatements(sql):
+    """
+    Splits a PostgreSQL script at the same places as sqlparse.split.
+
+    Returns a list of (start, end, first_word, words) tuples: the offsets of the
+    stripped statement, its first word in upper case (None when it does not start
+    with a word or the word is read as a name) and the keywords of PARSE_SCAN_REGEX
+    found in it. Raises AmbiguousSQL when the script has constructs sqlparse may
+    tokenize differently.
+    """
+    statements = []
+    length = len(sql)
+    pos = 0
+    while pos < length:
+        start = pos
+        pos = _ParseSkipComments(sql, pos)
+        first_word = None
+        word = PARSE_FIRST_WORD_REGEX.match(sql, pos)
+        if word is not None and word.group(1) is None:
+            first_word = word.group().upper()
+        depth = 0
+        words = set()
+        while pos < length:
+            match = PARSE_SCAN_REGEX.search(sql, pos)
+            if match is None:
+                pos = length
+                break
+            pos = match.end()
+            token = match.group()
+            if match.group(1) is not None:
+                # sqlparse also splits at an upper case GO
+                if token == "GO":
+                    raise AmbiguousSQL()
+                words.add(token.upper())
+                if token.upper() in ("BEGIN", "DECLARE") and "CREATE" in words:
+                    raise AmbiguousSQL()
+            elif token == ";":
+                if depth > 0:
+                    raise AmbiguousSQL()
+                pos = _ParseStatementEnd(sql, pos)
+                break
+            elif token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            else:
+                pos = _ParseSkipQuoted(sql, match)
+        end = pos
+        while end > start and sql[end - 1].isspace():
+            end -= 1
+        while start < end and sql[start].isspace():
+            start += 1
+        if start < end:
+            statements.append((start, end, first_word, words))
+    return statements
+
+
+def IsCursorSelect(statement):
+    """
+    Tells if a sqlparse statement is a query PostgreSQL.Parse can declare a cursor for.
+    """
+    if statement.get_type() != "SELECT":
+        return False
+    found_cte = False
+    found_dml = False
+    found_into = False
+    for token in statement.flatten():
+        if token.ttype == sqlparse.tokens.Token.Keyword.CTE:
+            found_cte = True
+        if (
+            token.ttype == sqlparse.tokens.Token.Keyword.DML
+            and token.value.upper() != "SELECT"
+        ):
+            found_dml = True
+        if token.is_keyword and token.value.upper() == "INTO":
+            found_into = True
+    return not (found_cte and found_dml) and not found_into
+
+
+def _ClassifyStatement(sql, start, end, first_word, words):
+    if first_word not in ("SELECT", "WITH"):
+        return False
+    if "INTO" in words:
+        return False
+    if "WITH" in words and words & PARSE_DML_WORDS:
+        # the words may be names, e.g. replace(), which sqlparse does not count
+        return IsCursorSelect(sqlparse.parse(sql[start:end])[0])
+    if first_word == "WITH" and "SELECT" not in words:
+        return IsCursorSelect(sqlparse.parse(sql[start:end])[0])
+    return True
+
+
+def ClassifyStatements(sql):
+    """
+    Returns a tuple of (start, end, cursor_select) for every statement of a
+    PostgreSQL script, where cursor_select tells if PostgreSQL.Parse can declare a
+    cursor for the statement. Results are cached by the sha1 of the script.
+    """
+    key = hashlib.sha1(sql.encode("utf-8", "surrogatepass")).digest()
+    with parse_cache_lock:
+        statements = parse_cache.get(key)
+        if statements is not None:
+            parse_cache.move_to_end(key)
+            return statements
+    try:
+        statements = tuple(
+            (start, end, _ClassifyStatement(sql, start, end, first_word, words))
+            for start, end, first_word, words in ScanStatements(sql)
+        )
+    except AmbiguousSQL:
+        statements = []
+        pos = 0
+        for text, statement in zip(sqlparse.split(sql), sqlparse.parse(sql)):
+            start = sql.find(text, pos)
+            pos = start + len(text)
+            statements.append((start, pos, IsCursorSelect(statement)))
+        statements = tuple(statements)
+    with parse_cache_lock:
+        parse_cache[key] = statements
+        while len(parse_cache) > PARSE_CACHE_SIZE:
+            parse_cache.popitem(last=False)
+    return statements
+
+
 class PostgreSQL(Generic):
     def __init__(
         self,
@@ -1563,6 +1995,7 @@ class PostgreSQL(Generic):
             self.expanded = False
             self.timing = False
             self.types = None
+            self.type_names = None
             psycopg2.extras.register_default_json(loads=lambda x: x)
             psycopg2.extras.register_default_jsonb(loads=lambda x: x)
             psycopg2.extensions.register_type(
@@ -1652,10 +2085,12 @@ class PostgreSQL(Generic):
             self.cursor = None
             # PostgreSQL types
             if self.types is None:
-                self.cur.execute("select oid, typname from pg_type")
-                self.types = dict(
-                    [(r["oid"], r["typname"]) for r in self.cur.fetchall()]
+                self.cur.execute(
+                    "select oid, typname, format_type(oid, NULL) as typformat from pg_type"
                 )
+                rows = self.cur.fetchall()
+                self.types = dict([(r["oid"], r["typname"]) for r in rows])
+                self.type_names = dict([(r["oid"], r["typformat"]) for r in rows])
                 tmp = []
                 for oid, name in self.types.items():
                     if name == "date" or name == "timestamp" or name == "timestamptz":
@@ -1693,7 +2128,7 @@ class PostgreSQL(Generic):
                     table.AddColumn(c[0])
                 table.Rows = self.cur.fetchall()
                 if alltypesstr:
-                    for i in range(0, len(table.Rows)):
+                    for i in range(0, table.RowCount):
                         for j in range(0, len(table.Columns)):
                             if table.Rows[i][j] != None:
                                 table.Rows[i][j] = self.String(table.Rows[i][j])
@@ -1718,6 +2153,7 @@ class PostgreSQL(Generic):
                 keep = False
             else:
                 keep = True
+            self.InvalidateTypeCache(sql)
             self.cur.execute(sql)
         except Spartacus.Database.Exception as exc:
             raise exc
@@ -1970,75 +2406,57 @@ class PostgreSQL(Generic):
 
     def Parse(self, sql):
         try:
-            statement = sqlparse.split(sql)
-            analysis = sqlparse.parse(sql)
-            if len(statement) == len(analysis):
-                cursors = []
-                for i in range(0, len(statement)):
-                    if analysis[i].get_type() == "SELECT":
-                        found_cte = False
-                        found_dml = False
-                        found_into = False
-                        for token in analysis[i].flatten():
-                            if token.ttype == sqlparse.tokens.Token.Keyword.CTE:
-                                found_cte = True
-                            if (
-                                token.ttype == sqlparse.tokens.Token.Keyword.DML
-                                and token.value.upper() != "SELECT"
-                            ):
-                                found_dml = True
-                            if token.is_keyword and token.value.upper() == "INTO":
-                                found_into = True
-                        if not (found_cte and found_dml) and not found_into:
-                            cursors.append(
-                                "{0}_{1}".format(
-                                    self.application_name, uuid.uuid4().hex
-                                )
-                            )
-                if len(cursors) > 0:
-                    cursor_sql = ""
-                    j = 0
-                    for i in range(0, len(statement)):
-                        if analysis[i].get_type() == "SELECT":
-                            if j < len(cursors) - 1:
-                                cursor_sql = cursor_sql + statement[i]
-                            else:
-                                if self.autocommit:
-                                    cursor_sql = (
-                                        cursor_sql
-                                        + " DECLARE {0} CURSOR WITH HOLD FOR {1}".format(
-                                            cursors[j], statement[i]
-                                        )
-                                    )
-                                else:
-                                    cursor_sql = (
-                                        cursor_sql
-                                        + " DECLARE {0} CURSOR WITHOUT HOLD FOR {1}".format(
-                                            cursors[j], statement[i]
-                                        )
-                                    )
-                                self.cursor = cursors[j]
-                            j = j + 1
-                        else:
-                            cursor_sql = cursor_sql + statement[i]
-                    return cursor_sql
-                else:
-                    self.cursor = None
-                    return sql
-            else:
+            # the cursor receives the result of the last query of the script
+            cursor_start = None
+            for start, end, cursor_select in ClassifyStatements(sql):
+                if cursor_select:
+                    cursor_start = start
+            if cursor_start is None:
                 self.cursor = None
                 return sql
+            self.cursor = "{0}_{1}".format(self.application_name, uuid.uuid4().hex)
+            return "{0}DECLARE {1} CURSOR {2} HOLD FOR {3}".format(
+                sql[:cursor_start],
+                self.cursor,
+                "WITH" if self.autocommit else "WITHOUT",
+                sql[cursor_start:],
+            )
         except Exception as exc:
             self.cursor = None
             return sql
 
+    def QueryTypeNames(self, type_code=None):
+        # uses its own cursor so the status of the main cursor is preserved
+        sql = "select oid, format_type(oid, NULL) from pg_type"
+        if type_code is not None:
+            sql = sql + " where oid = {0}".format(int(type_code))
+        cur = self.con.cursor()
+        try:
+            cur.execute(sql)
+            return dict([(r[0], r[1]) for r in cur.fetchall()])
+        finally:
+            cur.close()
+
     def ResolveType(self, type_code):
         try:
-            res = self.Query("select format_type({0}, NULL)".format(type_code))
-            return res.Rows[0][0]
+            if self.type_names is None:
+                self.type_names = self.QueryTypeNames()
+            type_name = self.type_names.get(type_code)
+            if type_name is None:
+                # type created after the cache was filled
+                self.type_names.update(self.QueryTypeNames(type_code))
+                type_name = self.type_names[type_code]
+            return type_name
         except:
             return "???"
 
+    def GetStringConverters(self, description):
+        return [STRING_CONVERTERS.get(c.type_code, self.String) for c in description]
+
+    def InvalidateTypeCache(self, sql):
+        if self.type_names and TYPE_DDL_REGEX.search(sql):
+            self.type_names = None
+
     def QueryBlock(self, sql, blocksize, alltypesstr=False, simple=False):
         try:
             if self.con is None:
@@ -2052,6 +2470,7 @@ class PostgreSQL(Generic):
                             self.cur.execute("CLOSE {0}".format(self.cursor))
                         except:
                             None
+                    self.InvalidateTypeCache(sql)
                     parsed_sql = self.Parse(sql)
                     if (
                         not self.autocommit
@@ -2077,14 +2496,21 @@ class PostgreSQL(Generic):
                     else:
                         table.Rows = self.cur.fetchall()
                     if alltypesstr:
-                        for i in range(0, len(table.Rows)):
-                            for j in range(0, len(table.Columns)):
-                                if table.Rows[i][j] != None:
-                                    table.Rows[i][j] = self.String(table.Rows[i][j])
+                        converters = self.GetStringConverters(self.cur.description)
+                        if simple:
+                            table.Rows = self.ConvertColumns(table.Rows, converters)
+                        else:
+                            # keeps the rows accessible by column name
+                            for j, convert in enumerate(converters):
+                                if convert is None:
+                                    continue
+                                for row in table.Rows:
+                                    if row[j] is not None:
+                                        row[j] = convert(row[j])
 
                 if self.start:
                     self.start = False
-                if len(table.Rows) < blocksize:
+                if table.RowCount < blocksize:
                     self.start = True
                     if self.cursor:
                         self.cur.execute("CLOSE {0}".format(self.cursor))
@@ -2103,6 +2529,27 @@ class PostgreSQL(Generic):
             self.cursor = None
             raise Spartacus.Database.Exception(str(exc))
 
+    def CopyTo(self, sql, file_handle, delimiter=",", header=True):
+        try:
+            if self.con is None:
+                raise Spartacus.Database.Exception(
+                    "This method should be called in the middle of Open() and Close() calls."
+                )
+            else:
+                # the closing parenthesis on its own line survives a trailing comment
+                self.cur.copy_expert(
+                    "COPY ({0}\n) TO STDOUT WITH (FORMAT csv, DELIMITER '{1}', HEADER {2})".format(
+                        sql, delimiter.replace("'", "''"), "true" if header else "false"
+                    ),
+                    file_handle,
+                )
+        except Spartacus.Database.Exception as exc:
+            raise exc
+        except psycopg2.Error as exc:
+            raise Spartacus.Database.Exception(str(exc))
+        except Exception as exc:
+            raise Spartacus.Database.Exception(str(exc))
+
     def InsertBlock(self, block, tablename, fields=None):
         try:
             column_names = []
@@ -2153,7 +2600,7 @@ class PostgreSQL(Generic):
                 table = self.help_commands
             else:
                 aux = self.help.Select("Command", command)
-                if len(aux.Rows) > 0:
+                if aux.RowCount > 0:
                     for title, rows, headers, status in self.special.execute(
                         self.cur, sql
                     ):
@@ -2181,25 +2628,25 @@ class PostgreSQL(Generic):
                     if self.timing:
                         start_time = datetime.datetime.now()
                     table = self.QueryBlock(sql, 50, True, True)
-                    self.last_fetched_size = len(table.Rows)
+                    self.last_fetched_size = table.RowCount
                     status = self.GetStatus()
                     if self.timing:
                         status = status + "\nTime: {0}".format(
                             datetime.datetime.now() - start_time
                         )
-            if heading and table and len(table.Rows) > 0 and status:
+            if heading and table and table.RowCount > 0 and status:
                 return (
                     heading + "\n" + table.Pretty(self.expanded) + "\n" + status
                 )
-            elif heading and table and len(table.Rows) > 0:
+            elif heading and table and table.RowCount > 0:
                 return heading + "\n" + table.Pretty(self.expanded)
             elif heading and status:
                 return heading + "\n" + status
             elif heading:
                 return heading
-            elif table and len(table.Rows) > 0 and status:
+            elif table and table.RowCount > 0 and status:
                 return table.Pretty(self.expanded) + "\n" + status
-            elif table and len(table.Rows) > 0:
+            elif table and table.RowCount > 0:
                 return table.Pretty(self.expanded)
             elif status:
                 return status
@@ -2340,7 +2787,7 @@ class MySQL(Generic):
                     table.AddColumn(c[0])
                 row = self.cur.fetchone()
                 while row is not None:
-                    table.AddRow(list(row))
+                    table.AddRow(row)
                     row = self.cur.fetchone()
             return table
         except Spartacus.Database.Exception as exc:
@@ -2547,17 +2994,17 @@ class MySQL(Generic):
                     if blocksize > 0:
                         k = 0
                         while row is not None and k < blocksize:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             k = k + 1
                             if k < blocksize:
                                 row = self.cur.fetchone()
                     else:
                         while row is not None:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             row = self.cur.fetchone()
                 if self.start:
                     self.start = False
-                if len(table.Rows) < blocksize:
+                if table.RowCount < blocksize:
                     self.start = True
                 return table
         except Spartacus.Database.Exception as exc:
@@ -2613,7 +3060,7 @@ class MySQL(Generic):
                 table = self.help
             else:
                 aux = self.help.Select("Command", command)
-                if len(aux.Rows) > 0:
+                if aux.RowCount > 0:
                     if command == "\\x" and not self.expanded:
                         status = "Expanded display is on."
                         self.expanded = True
@@ -2643,19 +3090,19 @@ class MySQL(Generic):
                         status = status + "\nTime: {0}".format(
                             datetime.datetime.now() - start_time
                         )
-            if title and table and len(table.Rows) > 0 and status:
+            if title and table and table.RowCount > 0 and status:
                 return (
                     title + "\n" + table.Pretty(self.expanded) + "\n" + status
                 )
-            elif title and table and len(table.Rows) > 0:
+            elif title and table and table.RowCount > 0:
                 return title + "\n" + table.Pretty(self.expanded)
             elif title and status:
                 return title + "\n" + status
             elif title:
                 return title
-            elif table and len(table.Rows) > 0 and status:
+            elif table and table.RowCount > 0 and status:
                 return table.Pretty(self.expanded) + "\n" + status
-            elif table and len(table.Rows) > 0:
+            elif table and table.RowCount > 0:
                 return table.Pretty(self.expanded)
             elif status:
                 return status
@@ -2796,7 +3243,7 @@ class MariaDB(Generic):
                     table.AddColumn(c[0])
                 row = self.cur.fetchone()
                 while row is not None:
-                    table.AddRow(list(row))
+                    table.AddRow(row)
                     row = self.cur.fetchone()
             return table
         except Spartacus.Database.Exception as exc:
@@ -3003,17 +3450,17 @@ class MariaDB(Generic):
                     if blocksize > 0:
                         k = 0
                         while row is not None and k < blocksize:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             k = k + 1
                             if k < blocksize:
                                 row = self.cur.fetchone()
                     else:
                         while row is not None:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             row = self.cur.fetchone()
                 if self.start:
                     self.start = False
-                if len(table.Rows) < blocksize:
+                if table.RowCount < blocksize:
                     self.start = True
                 return table
         except Spartacus.Database.Exception as exc:
@@ -3069,7 +3516,7 @@ class MariaDB(Generic):
                 table = self.help
             else:
                 aux = self.help.Select("Command", command)
-                if len(aux.Rows) > 0:
+                if aux.RowCount > 0:
                     if command == "\\x" and not self.expanded:
                         status = "Expanded display is on."
                         self.expanded = True
@@ -3099,19 +3546,19 @@ class MariaDB(Generic):
                         status = status + "\nTime: {0}".format(
                             datetime.datetime.now() - start_time
                         )
-            if title and table and len(table.Rows) > 0 and status:
+            if title and table and table.RowCount > 0 and status:
                 return (
                     title + "\n" + table.Pretty(self.expanded) + "\n" + status
                 )
-            elif title and table and len(table.Rows) > 0:
+            elif title and table and table.RowCount > 0:
                 return title + "\n" + table.Pretty(self.expanded)
             elif title and status:
                 return title + "\n" + status
             elif title:
                 return title
-            elif table and len(table.Rows) > 0 and status:
+            elif table and table.RowCount > 0 and status:
                 return table.Pretty(self.expanded) + "\n" + status
-            elif table and len(table.Rows) > 0:
+            elif table and table.RowCount > 0:
                 return table.Pretty(self.expanded)
             elif status:
                 return status
@@ -3201,7 +3648,7 @@ class Firebird(Generic):
                     table.AddColumn(c[0])
                 row = self.cur.fetchone()
                 while row is not None:
-                    table.AddRow(list(row))
+                    table.AddRow(row)
                     row = self.cur.fetchone()
             return table
         except Spartacus.Database.Exception as exc:
@@ -3373,13 +3820,13 @@ class Firebird(Generic):
                     if blocksize > 0:
                         k = 0
                         while row is not None and k < blocksize:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             k = k + 1
                             if k < blocksize:
                                 row = self.cur.fetchone()
                     else:
                         while row is not None:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             row = self.cur.fetchone()
                 if self.start:
                     self.start = False
@@ -3431,6 +3878,9 @@ Oracle
 ------------------------------------------------------------------------
 """
 
+# rows transferred per round trip when a query is fetched without a block size
+ARRAY_FETCH_SIZE = 1000
+
 
 class Oracle(Generic):
     def __init__(
@@ -3530,15 +3980,14 @@ class Oracle(Generic):
                 keep = False
             else:
                 keep = True
+            self.cur.arraysize = ARRAY_FETCH_SIZE
+            self.cur.prefetchrows = ARRAY_FETCH_SIZE + 1
             self.cur.execute(sql)
             table = DataTable(None, alltypesstr, simple)
             if self.cur.description:
                 for c in self.cur.description:
                     table.AddColumn(c.name)
-                row = self.cur.fetchone()
-                while row is not None:
-                    table.AddRow(list(row))
-                    row = self.cur.fetchone()
+                table.AddRows(self.cur.fetchall())
             return table
         except Spartacus.Database.Exception as exc:
             raise exc
@@ -3759,27 +4208,23 @@ class Oracle(Generic):
             else:
                 if self.start:
                     self.con.autocommit = self.autocommit
+                    # the first block comes back with the execute round trip
+                    fetch_size = blocksize if blocksize > 0 else ARRAY_FETCH_SIZE
+                    self.cur.arraysize = fetch_size
+                    self.cur.prefetchrows = fetch_size + 1
                     self.cur.execute(sql)
                 table = DataTable(None, alltypesstr, simple)
                 if self.cur.description:
                     for c in self.cur.description:
                         table.AddColumn(c.name)
                         table.AddColumnTypeCode(c.type_code.num)
-                    row = self.cur.fetchone()
                     if blocksize > 0:
-                        k = 0
-                        while row is not None and k < blocksize:
-                            table.AddRow(list(row))
-                            k = k + 1
-                            if k < blocksize:
-                                row = self.cur.fetchone()
+                        table.AddRows(self.cur.fetchmany(blocksize))
                     else:
-                        while row is not None:
-                            table.AddRow(list(row))
-                            row = self.cur.fetchone()
+                        table.AddRows(self.cur.fetchall())
                 if self.start:
                     self.start = False
-                if len(table.Rows) < blocksize:
+                if table.RowCount < blocksize:
                     self.start = True
                 return table
         except Spartacus.Database.Exception as exc:
@@ -3837,7 +4282,7 @@ class Oracle(Generic):
                 table = self.help
             else:
                 aux = self.help.Select("Command", command)
-                if len(aux.Rows) > 0:
+                if aux.RowCount > 0:
                     if command == "\\x" and not self.expanded:
                         status = "Expanded display is on."
                         self.expanded = True
@@ -3867,19 +4312,19 @@ class Oracle(Generic):
                         status = status + "\nTime: {0}".format(
                             datetime.datetime.now() - start_time
                         )
-            if title and table and len(table.Rows) > 0 and status:
+            if title and table and table.RowCount > 0 and status:
                 return (
                     title + "\n" + table.Pretty(self.expanded) + "\n" + status
                 )
-            elif title and table and len(table.Rows) > 0:
+            elif title and table and table.RowCount > 0:
                 return title + "\n" + table.Pretty(self.expanded)
             elif title and status:
                 return title + "\n" + status
             elif title:
                 return title
-            elif table and len(table.Rows) > 0 and status:
+            elif table and table.RowCount > 0 and status:
                 return table.Pretty(self.expanded) + "\n" + status
-            elif table and len(table.Rows) > 0:
+            elif table and table.RowCount > 0:
                 return table.Pretty(self.expanded)
             elif status:
                 return status
@@ -3967,10 +4412,7 @@ class MSSQL(Generic):
             if self.cur.description:
                 for c in self.cur.description:
                     table.AddColumn(c[0])
-                row = self.cur.fetchone()
-                while row is not None:
-                    table.AddRow(list(row))
-                    row = self.cur.fetchone()
+                table.AddRows(self.cur.fetchall())
             return table
         except Spartacus.Database.Exception as exc:
             raise exc
@@ -4139,21 +4581,13 @@ class MSSQL(Generic):
                 if self.cur.description:
                     for c in self.cur.description:
                         table.AddColumn(c[0])
-                    row = self.cur.fetchone()
                     if blocksize > 0:
-                        k = 0
-                        while row is not None and k < blocksize:
-                            table.AddRow(list(row))
-                            k = k + 1
-                            if k < blocksize:
-                                row = self.cur.fetchone()
+                        table.AddRows(self.cur.fetchmany(blocksize))
                     else:
-                        while row is not None:
-                            table.AddRow(list(row))
-                            row = self.cur.fetchone()
+                        table.AddRows(self.cur.fetchall())
                 if self.start:
                     self.start = False
-                if len(table.Rows) < blocksize:
+                if table.RowCount < blocksize:
                     self.start = True
                 return table
         except Spartacus.Database.Exception as exc:
@@ -4296,7 +4730,7 @@ class IBMDB2(Generic):
                     table.AddColumn(c[0])
                 row = self.cur.fetchone()
                 while row is not None:
-                    table.AddRow(list(row))
+                    table.AddRow(row)
                     row = self.cur.fetchone()
             return table
         except Spartacus.Database.Exception as exc:
@@ -4468,13 +4902,13 @@ class IBMDB2(Generic):
                     if blocksize > 0:
                         k = 0
                         while row is not None and k < blocksize:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             k = k + 1
                             if k < blocksize:
                                 row = self.cur.fetchone()
                     else:
                         while row is not None:
-                            table.AddRow(list(row))
+                            table.AddRow(row)
                             row = self.cur.fetchone()
                 if self.start:
                     self.start = False
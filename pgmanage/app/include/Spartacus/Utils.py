@@ -55,6 +55,8 @@ class DataFileWriter(object):
         self.delimiter = delimiter
         self.lineterminator = lineterminator
         self.skip_headers = skip_headers
+        self.worksheet = None
+        self.json_encoder = DjangoJSONEncoder()
         for idx, field in enumerate(fieldnames):
             if field == '?column?':
                 self.header.append(f'?column-{idx}')
@@ -90,27 +92,22 @@ class DataFileWriter(object):
                 for row in p_datatable.Rows:
                     self.writer.writerow(row)
             elif self.extension == 'xlsx':
-                if self.currentrow == 1:
-                    worksheet = self.writer.create_sheet()
+                if self.worksheet is None:
+                    self.worksheet = self.writer.create_sheet()
                     if not self.skip_headers:
-                        worksheet.append(p_datatable.Columns)
+                        self.worksheet.append(p_datatable.Columns)
                         self.currentrow = self.currentrow + 1
-                else:
-                    worksheet = self.writer.active
-                for r in range(0, len(p_datatable.Rows)):
-                    row = []
-                    for c in range(0, len(p_datatable.Columns)):
-                        row.append(p_datatable.Rows[r][c])
-                    worksheet.append(row)
+                append = self.worksheet.append
+                for row in p_datatable.Rows:
+                    append(row)
                 self.currentrow = self.currentrow + len(p_datatable.Rows)
             else:
-                for row in p_datatable.Rows:
-                    print(
-                        json.dumps(
-                            dict(zip (self.header, row)), cls=DjangoJSONEncoder),
-                            end=',\n',
-                            file=self.file_handle
-                    )
+                # one encoder for the whole file and one write per block
+                encode = self.json_encoder.encode
+                header = self.header
+                self.file_handle.write(
+                    ''.join([encode(dict(zip(header, row))) + ',\n' for row in p_datatable.Rows])
+                )
 
         except Spartacus.Utils.Exception as exc:
             raise exc
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+from app.client_manager.connection_pool import connection_pool
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdvancedObjectSearch:
+    """
+    Runs an advanced object search with a bounded pool of connections.
+
+    Every category is one statement and the "Data" category is one statement per
+    table. Statements run on up to ADVANCED_OBJECT_SEARCH_MAX_WORKERS pooled
+    connections, each limited by ADVANCED_OBJECT_SEARCH_STATEMENT_TIMEOUT, and every
+    finished statement is reported on its own. A last report with last_block set
+    follows once all statements finished or the search was stopped.
+
+    Only the backend exists so far: no frontend component sends
+    ADVANCED_OBJECT_SEARCH requests yet, a caller has to pass a context with a
+    callback that consumes the reports.
+
+    Attributes:
+        database: OmniDatabase object of the search tab, used to build the statements.
+        options (dict): The search request: text, case_sensitive, regex, categories,
+            schemas and data_category_filter.
+        on_result (Callable[[dict], Any]): Receives every report.
+        cancel (bool): Set once the search was stopped.
+        tag (dict): "activeConnections" running a statement, guarded by "lock".
+    """
+
+    def __init__(self, database, options: dict, on_result: Callable[[dict], Any]) -> None:
+        self.database = database
+        self.options = options
+        self.on_result = on_result
+        self.cancel = False
+        self.tag = {"lock": threading.Lock(), "activeConnections": []}
+        self._local = threading.local()
+        self._databases = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            name="advanced_object_search", target=self._run, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, p_callback: Optional[Callable] = None) -> None:
+        """Stops the search, statements that did not start yet are skipped.
+
+        Args:
+            p_callback (Optional[Callable], optional): Called with the search to cancel
+                the running statements, defaults to cancel_active_connections.
+        """
+        self.cancel = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        (p_callback or AdvancedObjectSearch.cancel_active_connections)(self)
+
+    def cancel_active_connections(self) -> None:
+        with self.tag["lock"]:
+            for active_connection in self.tag["activeConnections"]:
+                try:
+                    active_connection.Cancel(False)
+                except Exception as exc:
+                    logger.debug("Failed to cancel search statement: %s", exc)
+
+    def get_statements(self) -> list[tuple]:
+        """Builds the statements of the search.
+
+        Returns:
+            list[tuple]: (category, table, sql) tuples, table is only set for "Data".
+
+        Raises:
+            Exception: If the database does not support advanced object search.
+        """
+        if not hasattr(self.database, "AdvancedObjectSearch"):
+            raise Exception("Advanced object search is not supported for this database.")
+        sql_dict = self.database.AdvancedObjectSearch(
+            self.options.get("text", ""),
+            self.options.get("case_sensitive", False),
+            self.options.get("regex", False),
+            self.options.get("categories") or [],
+            self.options.get("schemas") or [],
+            self.options.get("data_category_filter", ""),
+        )
+        # catalog categories are fast, report them before the table scans
+        data = sql_dict.pop("Data", {})
+        statements = [(category, None, sql) for category, sql in sql_dict.items()]
+        statements.extend(("Data", table, sql) for table, sql in data.items())
+        return statements
+
+    def _get_database(self):
+        database = getattr(self._local, "database", None)
+        if database is not None:
+            return database
+        database = connection_pool.acquire(self.database, self.database.active_service)
+        if database is self.database:
+            raise Exception("Could not open a connection to the database.")
+        with self.tag["lock"]:
+            self._databases.append(database)
+        self._local.database = database
+        timeout = settings.ADVANCED_OBJECT_SEARCH_STATEMENT_TIMEOUT
+        if timeout:
+            database.connection.Execute(f"set statement_timeout = {int(timeout * 1000)}")
+        return database
+
+    def _search(self, category: str, table: Optional[str], sql: str) -> None:
+        if self.cancel:
+            return
+        result = {"category": category, "table": table, "last_block": False}
+        try:
+            database = self._get_database()
+            with self.tag["lock"]:
+                self.tag["activeConnections"].append(database.connection)
+            try:
+                data = database.connection.Query(sql)
+            finally:
+                with self.tag["lock"]:
+                    self.tag["activeConnections"].remove(database.connection)
+            result["columns"] = data.Columns
+            result["rows"] = [list(row) for row in data.Rows]
+        except Exception as exc:
+            if self.cancel:
+                return
+            result["error"] = str(exc)
+        self.on_result(result)
+
+    def _release_databases(self) -> None:
+        for database in self._databases:
+            try:
+                if database.connection.GetConStatus() == 1:
+                    database.connection.Execute("reset statement_timeout")
+            except Exception:
+                pass
+            connection_pool.release(database)
+        self._databases = []
+
+    def _run(self) -> None:
+        start = time.monotonic()
+        result = {"last_block": True}
+        try:
+            statements = self.get_statements()
+            if statements and not self.cancel:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(
+                        1, min(settings.ADVANCED_OBJECT_SEARCH_MAX_WORKERS, len(statements))
+                    ),
+                    thread_name_prefix="advanced_object_search",
+                )
+                futures = [
+                    self._executor.submit(self._search, *statement)
+                    for statement in statements
+                ]
+                wait(futures)
+                self._executor.shutdown()
+        except Exception as exc:
+            result["error"] = str(exc)
+        finally:
+            self._release_databases()
+        result["cancelled"] = self.cancel
+        result["duration"] = round(time.monotonic() - start, 3)
+        self.on_result(result)
@@ -0,0 +1,253 @@
+import hashlib
+import logging
+import time
+import zlib
+from datetime import timedelta
+from typing import Optional
+
+from app.models.main import ConsoleHistory, HistorySnippet, QueryHistory
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+HISTORY_MODELS = [QueryHistory, ConsoleHistory]
+
+# trigram tokens, shorter search texts cannot use the search index
+SEARCH_INDEX_MIN_LENGTH = 3
+
+search_index_tables = {}
+
+
+def has_search_index(model) -> bool:
+    """Tells whether the FTS5 search index of a history model exists.
+
+    Args:
+        model: QueryHistory, ConsoleHistory or HistorySnippet.
+
+    Returns:
+        bool: True if the trigram index created by migrations 0031 and 0034 is
+            available.
+    """
+    table = f"{model._meta.db_table}_fts"
+    if table not in search_index_tables:
+        search_index_tables[table] = (
+            connection.vendor == "sqlite"
+            and table in connection.introspection.table_names()
+        )
+    return search_index_tables[table]
+
+
+def search_index_match(model, text: str) -> Optional[RawSQL]:
+    """Returns the ids of the rows of a model whose search index matches a text.
+
+    Args:
+        model: QueryHistory, ConsoleHistory or HistorySnippet.
+        text (str): The case insensitive substring.
+
+    Returns:
+        Optional[RawSQL]: A subquery of candidate ids, None if the index cannot be used.
+    """
+    if len(text) < SEARCH_INDEX_MIN_LENGTH or not has_search_index(model):
+        return None
+    table = f"{model._meta.db_table}_fts"
+    phrase = '"{}"'.format(text.replace('"', '""'))
+    return RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [phrase])
+
+
+def store_snippet(text: str) -> HistorySnippet:
+    """Returns the stored snippet with the given text, storing it if needed.
+
+    Args:
+        text (str): The snippet.
+
+    Returns:
+        HistorySnippet: The snippet, compressed if it is at least
+            HISTORY_SNIPPET_COMPRESS_SIZE characters long.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    snippet = HistorySnippet.objects.filter(digest=digest).first()
+    if snippet is not None:
+        return snippet
+    snippet = HistorySnippet(digest=digest)
+    compress_size = settings.HISTORY_SNIPPET_COMPRESS_SIZE
+    if compress_size and len(text) >= compress_size:
+        snippet.compressed = zlib.compress(text.encode("utf-8"))
+    else:
+        snippet.snippet = text
+    try:
+        with transaction.atomic():
+            snippet.save()
+            # the index gets the text before compression
+            if has_search_index(HistorySnippet):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "INSERT INTO app_historysnippet_fts(rowid, snippet) VALUES (%s, %s)",
+                        [snippet.id, text],
+                    )
+    except IntegrityError:
+        return HistorySnippet.objects.get(digest=digest)
+    return snippet
+
+
+def move_snippet(entry) -> None:
+    """Moves the snippet of a history entry to the snippet table if it is large.
+
+    Args:
+        entry: A QueryHistory or ConsoleHistory instance, saved by the caller.
+    """
+    size = settings.HISTORY_SNIPPET_DEDUP_SIZE
+    if size and entry.snippet_ref_id is None and len(entry.snippet) >= size:
+        entry.snippet_ref = store_snippet(entry.snippet)
+        entry.snippet = ""
+
+
+def filter_snippet_refs(query, command_contains: str) -> list[int]:
+    """Returns the ids of the stored snippets of history entries containing a text.
+
+    Candidates are looked up in the trigram index of the stored snippets when
+    possible, so only those are checked and only compressed ones among them inflated.
+
+    Args:
+        query (QuerySet): History entries.
+        command_contains (str): The case insensitive substring.
+
+    Returns:
+        list[int]: Ids of the matching HistorySnippet referenced by the entries.
+    """
+    snippets = HistorySnippet.objects.filter(
+        id__in=query.filter(snippet_ref__isnull=False).values("snippet_ref")
+    )
+    match = search_index_match(HistorySnippet, command_contains)
+    if match is not None:
+        snippets = snippets.filter(id__in=match)
+    ids = list(
+        snippets.filter(
+            compressed__isnull=True, snippet__icontains=command_contains
+        ).values_list("id", flat=True)
+    )
+    # compressed snippets are only searchable once inflated
+    text = command_contains.casefold()
+    for snippet in snippets.filter(compressed__isnull=False).only("id", "compressed"):
+        if text in snippet.get_text().casefold():
+            ids.append(snippet.id)
+    return ids
+
+
+class HistoryCompactor:
+    """
+    Keeps the query and console history within its retention limits.
+
+    A compaction, run every HISTORY_COMPACTION_INTERVAL seconds by the history writer:
+        - deletes entries older than HISTORY_MAX_AGE_DAYS,
+        - keeps the newest HISTORY_MAX_ROWS_PER_CONNECTION entries of each user and
+          connection and the newest HISTORY_MAX_ROWS_PER_USER entries of each user,
+        - moves snippets of at least HISTORY_SNIPPET_DEDUP_SIZE characters to the
+          snippet table, where identical snippets are stored once,
+        - deletes stored snippets no entry refers to anymore.
+    Every limit set to 0 or None is disabled.
+
+    Attributes:
+        _last_run (float): Monotonic time of the last compaction.
+    """
+
+    def __init__(self) -> None:
+        self._last_run = 0
+
+    def run_if_due(self) -> None:
+        if time.monotonic() - self._last_run >= settings.HISTORY_COMPACTION_INTERVAL:
+            self.run()
+
+    def run(self) -> None:
+        """
+        Runs a compaction, every step in its own transactions.
+        """
+        self._last_run = time.monotonic()
+        for model in HISTORY_MODELS:
+            for step in (self._delete_expired, self._trim_rows, self._move_snippets):
+                try:
+                    step(model)
+                except Exception as exc:
+                    logger.error(
+                        "Failed to compact %s: %s", model._meta.verbose_name, exc
+                    )
+        try:
+            self._delete_orphan_snippets()
+        except Exception as exc:
+            logger.error("Failed to delete unused history snippets: %s", exc)
+
+    def _delete_expired(self, model) -> None:
+        if settings.HISTORY_MAX_AGE_DAYS:
+            oldest = timezone.now() - timedelta(days=settings.HISTORY_MAX_AGE_DAYS)
+            model.objects.filter(start_time__lt=oldest).delete()
+
+    def _trim_rows(self, model) -> None:
+        for group, limit in (
+            (["user_id", "connection_id"], settings.HISTORY_MAX_ROWS_PER_CONNECTION),
+            (["user_id"], settings.HISTORY_MAX_ROWS_PER_USER),
+        ):
+            if not limit:
+                continue
+            groups = (
+                model.objects.values(*group)
+                .annotate(entries=Count("id"))
+                .filter(entries__gt=limit)
+            )
+            for values in groups:
+                del values["entries"]
+                entries = model.objects.filter(**values)
+                start_time, entry_id = entries.order_by(
+                    "-start_time", "-id"
+                ).values_list("start_time", "id")[limit - 1]
+                entries.filter(
+                    Q(start_time__lt=start_time) | Q(id__lt=entry_id),
+                    start_time__lte=start_time,
+                ).delete()
+
+    def _move_snippets(self, model) -> None:
+        if not settings.HISTORY_SNIPPET_DEDUP_SIZE:
+            return
+        large = model.objects.annotate(snippet_length=Length("snippet")).filter(
+            snippet_ref__isnull=True,
+            snippet_length__gte=settings.HISTORY_SNIPPET_DEDUP_SIZE,
+        )
+        while True:
+            entries = list(large[: settings.HISTORY_COMPACTION_BATCH_SIZE])
+            if not entries:
+                return
+            with transaction.atomic():
+                for entry in entries:
+                    move_snippet(entry)
+                model.objects.bulk_update(entries, ["snippet", "snippet_ref"])
+
+    def _delete_orphan_snippets(self) -> None:
+        orphans = HistorySnippet.objects.filter(
+            ~Q(id__in=QueryHistory.objects.filter(snippet_ref__isnull=False).values("snippet_ref")),
+            ~Q(id__in=ConsoleHistory.objects.filter(snippet_ref__isnull=False).values("snippet_ref")),
+        )
+        if not has_search_index(HistorySnippet):
+            orphans.delete()
+            return
+        while True:
+            snippets = list(orphans[: settings.HISTORY_COMPACTION_BATCH_SIZE])
+            if not snippets:
+                return
+            with transaction.atomic():
+                # the index keeps no text, a row is deleted with the text it was given
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        "INSERT INTO app_historysnippet_fts(app_historysnippet_fts, rowid, snippet) "
+                        "VALUES ('delete', %s, %s)",
+                        [(snippet.id, snippet.get_text()) for snippet in snippets],
+                    )
+                HistorySnippet.objects.filter(
+                    id__in=[snippet.id for snippet in snippets]
+                ).delete()
+
+
+history_compactor = HistoryCompactor()
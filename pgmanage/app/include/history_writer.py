@@ -0,0 +1,156 @@
+import atexit
+import logging
+import queue
+import threading
+from collections import defaultdict
+from typing import Optional
+
+from app.include.history_retention import history_compactor, move_snippet
+from app.models.main import Tab
+from django.db import models, transaction
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryWriter:
+    """
+    Writes query and console history from a background thread, in batches.
+
+    Query threads queue unsaved model instances built with foreign key ids. The writer
+    inserts them with bulk_create in one transaction every HISTORY_WRITER_FLUSH_INTERVAL
+    seconds, or as soon as HISTORY_WRITER_BATCH_SIZE entries are waiting, so concurrent
+    queries do not each wait for the write lock of the application database. Tab
+    snippet updates are coalesced per tab. Pending entries are written on exit. Large
+    snippets are stored once in the snippet table and the thread also runs the history
+    compaction.
+
+    Attributes:
+        _queue (queue.Queue): Pending model instances, bounded by HISTORY_WRITER_QUEUE_SIZE.
+        _tabs (dict): Pending field updates keyed by tab id.
+        _lock (threading.Lock): A lock guarding _tabs.
+        _flush_lock (threading.Lock): Held while pending entries are written.
+        _wakeup (threading.Event): Wakes the writer up when a batch is full.
+        _thread (Optional[threading.Thread]): The writer thread, started on first use.
+    """
+
+    def __init__(self) -> None:
+        self._queue = queue.Queue(maxsize=settings.HISTORY_WRITER_QUEUE_SIZE)
+        self._tabs = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                name="history_writer", target=self._run, daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(settings.HISTORY_WRITER_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.error("Failed to write history: %s", exc)
+            history_compactor.run_if_due()
+
+    def add(self, instance: models.Model) -> None:
+        """Queues an unsaved history entry.
+
+        The entry is saved right away when the writer is disabled or its queue is full.
+
+        Args:
+            instance (models.Model): A QueryHistory or ConsoleHistory instance.
+        """
+        if not settings.HISTORY_WRITER_ENABLED:
+            instance.save()
+            return
+        self._start()
+        try:
+            self._queue.put_nowait(instance)
+        except queue.Full:
+            logger.warning("History queue is full, writing entry synchronously")
+            instance.save()
+            return
+        if self._queue.qsize() >= settings.HISTORY_WRITER_BATCH_SIZE:
+            self._wakeup.set()
+
+    def update_tab(self, tab_id: int, **fields) -> None:
+        """Queues an update of the fields of a tab, later updates of a tab win.
+
+        Args:
+            tab_id (int): Id of the Tab.
+            **fields: New field values.
+        """
+        if not settings.HISTORY_WRITER_ENABLED:
+            Tab.objects.filter(id=tab_id).update(**fields)
+            return
+        with self._lock:
+            self._tabs.setdefault(tab_id, {}).update(fields)
+        self._start()
+
+    def flush(self) -> None:
+        """
+        Writes every pending entry and tab update.
+        """
+        with self._flush_lock:
+            entries = []
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            with self._lock:
+                tabs, self._tabs = self._tabs, {}
+            if not entries and not tabs:
+                return
+
+            by_model = defaultdict(list)
+            for entry in entries:
+                by_model[type(entry)].append(entry)
+            try:
+                with transaction.atomic():
+                    for entry in entries:
+                        move_snippet(entry)
+                    for model, instances in by_model.items():
+                        model.objects.bulk_create(
+                            instances, batch_size=settings.HISTORY_WRITER_BATCH_SIZE
+                        )
+                    for tab_id, fields in tabs.items():
+                        Tab.objects.filter(id=tab_id).update(**fields)
+            except Exception as exc:
+                # one bad entry, e.g. of a connection removed meanwhile, must not
+                # take the rest of the batch with it
+                logger.warning("Failed to write history batch, retrying one by one: %s", exc)
+                self._write_one_by_one(entries, tabs)
+
+    def _write_one_by_one(self, entries: list, tabs: dict) -> None:
+        for entry in entries:
+            try:
+                entry.pk = None
+                if entry.snippet_ref_id is not None:
+                    # the stored snippet was rolled back with the batch
+                    entry.snippet = entry.snippet_ref.get_text()
+                    entry.snippet_ref = None
+                entry.save()
+            except Exception as exc:
+                logger.error("Failed to write history entry: %s", exc)
+        for tab_id, fields in tabs.items():
+            try:
+                Tab.objects.filter(id=tab_id).update(**fields)
+            except Exception as exc:
+                logger.error("Failed to update tab %s: %s", tab_id, exc)
+
+
+history_writer = HistoryWriter()
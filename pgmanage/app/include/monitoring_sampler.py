@@ -0,0 +1,258 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.client_manager.connection_pool import connection_pool
+from django.core.serializers.json import DjangoJSONEncoder
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SampleSeries:
+    """
+    Samples of one widget data script on one database.
+
+    Attributes:
+        widget_key: (plugin_name, id) of the widget.
+        script_hash (str): sha256 of the data script, a new script starts a new series.
+        run (Callable): Runs the data script, receives the connection and the previous sample.
+        on_sample (Optional[Callable]): Called with every new sample.
+        database: OmniDatabase object of the last reader, used as template for pooled connections.
+        samples (deque): Ring buffer of (timestamp, result) tuples, oldest first.
+        error (Optional[str]): Error of the last sample, if it failed.
+        intervals (dict): Last read time of each interval requested by the readers.
+        last_read (float): Monotonic time of the last read.
+        next_run (float): Monotonic time of the next sample.
+        running (bool): Whether a sample is being taken.
+        ready (threading.Event): Set once the first sample was taken or failed.
+    """
+
+    def __init__(
+        self,
+        widget_key,
+        script_hash: str,
+        run: Callable,
+        on_sample: Optional[Callable] = None,
+    ) -> None:
+        self.widget_key = widget_key
+        self.script_hash = script_hash
+        self.run = run
+        self.on_sample = on_sample
+        self.database = None
+        self.samples = deque(maxlen=settings.MONITORING_SAMPLER_BUFFER_SIZE)
+        self.error: Optional[str] = None
+        self.intervals = {}
+        self.last_read = time.monotonic()
+        self.next_run = self.last_read
+        self.running = False
+        self.ready = threading.Event()
+
+    @property
+    def interval(self) -> float:
+        """The smallest interval requested by the current readers."""
+        return min(self.intervals)
+
+    def touch(self, database, interval: float) -> None:
+        now = time.monotonic()
+        self.database = database
+        self.last_read = now
+        self.intervals[interval] = now
+        # forget intervals of readers that went away
+        for requested, last_read in list(self.intervals.items()):
+            if now - last_read > max(settings.MONITORING_SAMPLER_IDLE_TIMEOUT, 2 * requested):
+                del self.intervals[requested]
+        self.next_run = min(self.next_run, self.last_sample_time() + self.interval)
+
+    def last_sample_time(self) -> float:
+        return self.samples[-1][0] if self.samples else 0
+
+    def is_idle(self, now: float) -> bool:
+        return now - self.last_read > max(
+            settings.MONITORING_SAMPLER_IDLE_TIMEOUT, 2 * self.interval
+        )
+
+
+class MonitoringSampler:
+    """
+    Runs monitoring widget data scripts once per interval for every dashboard watching them.
+
+    Series are keyed by the connection pool key of the database (connection, server,
+    database and role) and the widget. They are created by the first dashboard reading
+    them, sampled on pooled connections by a background scheduler and dropped once no
+    dashboard has read them for MONITORING_SAMPLER_IDLE_TIMEOUT seconds (or two intervals).
+
+    Attributes:
+        _lock (threading.Lock): A lock guarding the series.
+        _series (dict): SampleSeries keyed by (pool key, widget key).
+        _wakeup (threading.Event): Wakes the scheduler up when a series is added.
+        _thread (Optional[threading.Thread]): The scheduler thread, started on first use.
+        _executor (Optional[ThreadPoolExecutor]): Runs the data scripts.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def _start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.MONITORING_SAMPLER_MAX_WORKERS,
+            thread_name_prefix="monitoring_sampler",
+        )
+        self._thread = threading.Thread(
+            name="monitoring_sampler", target=self._schedule, daemon=True
+        )
+        self._thread.start()
+
+    def _schedule(self) -> None:
+        while True:
+            now = time.monotonic()
+            due = []
+            with self._lock:
+                for key, series in list(self._series.items()):
+                    if series.is_idle(now):
+                        del self._series[key]
+                    elif not series.running and series.next_run <= now:
+                        series.running = True
+                        due.append(series)
+                next_run = min(
+                    (s.next_run for s in self._series.values() if not s.running),
+                    default=now + 1,
+                )
+            for series in due:
+                self._executor.submit(self._sample, series)
+            self._wakeup.wait(min(max(next_run - now, 0.1), 1))
+            self._wakeup.clear()
+
+    def _sample(self, series: SampleSeries) -> None:
+        try:
+            previous_data = series.samples[-1][1] if series.samples else None
+            database = connection_pool.acquire(
+                series.database, series.database.active_service
+            )
+            if database is series.database:
+                # never run scripts on the session object of a reader
+                raise Exception("Could not open a connection to the database.")
+            try:
+                result = series.run(database, previous_data)
+            finally:
+                connection_pool.release(database)
+            # dashboards used to send results back as JSON, scripts expect that shape
+            sample = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+            series.samples.append((time.monotonic(), sample))
+            series.error = None
+            if series.on_sample is not None:
+                try:
+                    series.on_sample(sample)
+                except Exception as exc:
+                    logger.warning("Failed to store monitoring widget sample: %s", exc)
+        except Exception as exc:
+            logger.debug("Monitoring widget sample failed: %s", exc)
+            series.error = str(exc)
+        finally:
+            with self._lock:
+                series.running = False
+                series.next_run = time.monotonic() + series.interval
+            series.ready.set()
+            self._wakeup.set()
+
+    def read(
+        self,
+        database,
+        widget_key,
+        script: str,
+        interval: float,
+        run: Callable[[Any, Any], Any],
+        history: bool = False,
+        on_sample: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """Returns the latest sample of a widget, sampling it now if the series is new.
+
+        Args:
+            database: OmniDatabase object of the dashboard.
+            widget_key: (plugin_name, id) of the widget.
+            script (str): The data script, identifies the series together with widget_key.
+            interval (float): Refresh interval of the dashboard widget in seconds.
+            run (Callable[[Any, Any], Any]): Runs the data script with a connection and the previous sample.
+            history (bool, optional): Return every buffered sample instead of the latest one.
+            on_sample (Optional[Callable[[Any], Any]], optional): Called with every new sample
+                of a series created by this read.
+
+        Returns:
+            Any: The latest sample, or the list of buffered samples if history is set.
+
+        Raises:
+            Exception: If the last sample failed.
+        """
+        script_hash = hashlib.sha256(script.encode()).hexdigest()
+        key = (connection_pool.get_key(database, database.active_service), widget_key)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None or series.script_hash != script_hash:
+                series = SampleSeries(widget_key, script_hash, run, on_sample)
+                self._series[key] = series
+            series.touch(database, max(float(interval or 0), 1))
+            sample_now = not series.samples and not series.running
+            if sample_now:
+                series.running = True
+            self._start()
+
+        if sample_now:
+            self._sample(series)
+        elif not series.ready.wait(settings.MONITORING_SAMPLER_FIRST_SAMPLE_TIMEOUT):
+            raise Exception("Timed out waiting for the first sample.")
+        else:
+            self._wakeup.set()
+
+        if series.error is not None:
+            raise Exception(series.error)
+        if history:
+            return [sample for _, sample in series.samples]
+        return series.samples[-1][1]
+
+    def clear(self) -> None:
+        """
+        Drops every series.
+        """
+        with self._lock:
+            self._series.clear()
+
+
+def merge_timeseries_samples(samples: list) -> Any:
+    """Merges the data points of buffered timeseries samples into the latest one.
+
+    Args:
+        samples (list): Samples in chronological order, each with a list of datasets.
+
+    Returns:
+        Any: A copy of the latest sample whose datasets hold the points of every sample.
+    """
+    latest = json.loads(json.dumps(samples[-1]))
+    datasets = latest.get("datasets") if isinstance(latest, dict) else None
+    if not isinstance(datasets, list):
+        return latest
+    for index, dataset in enumerate(datasets):
+        points = []
+        for sample in samples:
+            sample_datasets = sample.get("datasets") or []
+            if (
+                index < len(sample_datasets)
+                and sample_datasets[index].get("label") == dataset.get("label")
+            ):
+                points.extend(sample_datasets[index].get("data") or [])
+        dataset["data"] = points
+    return latest
+
+
+monitoring_sampler = MonitoringSampler()
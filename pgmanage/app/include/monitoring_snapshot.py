@@ -0,0 +1,200 @@
+import re
+import threading
+import time
+from typing import Optional
+
+from app.client_manager.connection_pool import connection_pool
+
+from pgmanage import settings
+
+# statistics gathered by the snapshot query, builtin widgets list the ones they read
+# in "snapshot_fields". Within one statement PostgreSQL reads each statistics view
+# from the same backend-local snapshot, so the subqueries below cost one scan each.
+SNAPSHOT_FIELDS = {
+    "xact_total": "(SELECT sum(xact_commit + xact_rollback) FROM pg_stat_database)::bigint",
+    "temp_bytes": "(SELECT sum(temp_bytes) FROM pg_stat_database)::bigint",
+    "database_size": """(
+        SELECT sum(pg_database_size(datname))
+        FROM pg_stat_database
+        WHERE datname IS NOT NULL
+    )::bigint""",
+    "backends": "(SELECT count(*) FROM pg_stat_activity)",
+    "autovacuum_workers": "(SELECT count(*) FROM pg_stat_activity WHERE query LIKE 'autovacuum: %')",
+    "autovacuum_max_workers": "current_setting('autovacuum_max_workers')::bigint",
+    "max_connections": "current_setting('max_connections')::bigint",
+    "blocked_locks": "(SELECT count(*) FROM pg_catalog.pg_locks WHERE NOT granted)",
+    "long_transaction": """(
+        SELECT coalesce(max(extract(epoch FROM clock_timestamp() - xact_start)), 0)
+        FROM pg_stat_activity
+        WHERE xact_start IS NOT NULL
+          AND datid IS NOT NULL
+          AND backend_type NOT IN ('walreceiver', 'walsender', 'walwriter', 'autovacuum worker')
+    )::float8""",
+    "long_query": """(
+        SELECT coalesce(max(extract(epoch FROM clock_timestamp() - query_start)), 0)
+        FROM pg_stat_activity
+        WHERE state = 'active'
+          AND query_start IS NOT NULL
+          AND datid IS NOT NULL
+          AND backend_type NOT IN ('walreceiver', 'walsender', 'walwriter', 'autovacuum worker')
+    )::float8""",
+    "long_autovacuum": """(
+        SELECT coalesce(max(extract(epoch FROM clock_timestamp() - query_start)), 0)
+        FROM pg_stat_activity
+        WHERE state = 'active'
+          AND query_start IS NOT NULL
+          AND datid IS NOT NULL
+          AND backend_type = 'autovacuum worker'
+    )::float8""",
+}
+
+# pg_stat_activity has no backend_type before PostgreSQL 10
+SNAPSHOT_FIELDS_PRE_10 = {
+    "long_transaction": """(
+        SELECT coalesce(max(extract(epoch FROM clock_timestamp() - xact_start)), 0)
+        FROM pg_stat_activity
+        WHERE xact_start IS NOT NULL
+          AND datid IS NOT NULL
+          AND query NOT LIKE 'autovacuum: %'
+    )::float8""",
+    "long_query": """(
+        SELECT coalesce(max(extract(epoch FROM clock_timestamp() - query_start)), 0)
+        FROM pg_stat_activity
+        WHERE state = 'active'
+          AND query_start IS NOT NULL
+          AND datid IS NOT NULL
+          AND query NOT LIKE 'autovacuum: %'
+    )::float8""",
+    "long_autovacuum": """(
+        SELECT coalesce(max(extract(epoch FROM clock_timestamp() - query_start)), 0)
+        FROM pg_stat_activity
+        WHERE state = 'active'
+          AND query_start IS NOT NULL
+          AND datid IS NOT NULL
+          AND query LIKE 'autovacuum: %'
+    )::float8""",
+}
+
+
+def get_script_fields(script: str) -> list[str]:
+    """Returns the snapshot fields read by a widget script that does not declare them.
+
+    User created widgets start from the scripts of builtin widgets, which read
+    `snapshot["field"]`.
+
+    Args:
+        script (str): The data script.
+
+    Returns:
+        list[str]: Names of the SNAPSHOT_FIELDS found in the script.
+    """
+    found = re.findall(r"""snapshot\[["'](\w+)["']\]""", script or "")
+    return sorted(set(found) & SNAPSHOT_FIELDS.keys())
+
+
+class SnapshotEntry:
+    """
+    Latest statistics snapshot of one database.
+
+    Attributes:
+        lock (threading.Lock): Held while the snapshot is collected, readers wait for it.
+        fields (dict): Last request time of every field read from this snapshot.
+        values (Optional[dict]): The snapshot, None until first collected.
+        collected (float): Monotonic time of the last collection.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.fields = {}
+        self.values: Optional[dict] = None
+        self.collected = 0
+
+
+class SnapshotCollector:
+    """
+    Collects the statistics read by monitoring widgets with a single query per database.
+
+    Widgets ask for the fields they need, the collector remembers them and gathers every
+    field requested recently in one round trip. Snapshots are shared by the widgets
+    reading them within MONITORING_SNAPSHOT_MAX_AGE seconds, keyed by the connection pool
+    key of the database.
+
+    Attributes:
+        _lock (threading.Lock): A lock guarding the entries.
+        _entries (dict): SnapshotEntry keyed by connection pool key.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _collect(self, connection, fields) -> dict:
+        version_num = connection.version_num
+        expressions = SNAPSHOT_FIELDS_PRE_10 if version_num and version_num < 100000 else {}
+        columns = ",\n".join(
+            f"{expressions.get(field, SNAPSHOT_FIELDS[field])} AS {field}"
+            for field in sorted(fields)
+        )
+        table = connection.Query(
+            "/*pgmanage-dash*/ SELECT extract(epoch FROM clock_timestamp())::float8 AS collected_at,\n"
+            + columns
+        )
+        row = table.Rows[0]
+        return {column: row[column] for column in table.Columns}
+
+    def get(self, connection, fields) -> dict:
+        """Returns the requested statistics of the database of a connection.
+
+        Args:
+            connection: OmniDatabase object used to collect the snapshot if needed.
+            fields (list[str]): Names of SNAPSHOT_FIELDS the caller reads.
+
+        Returns:
+            dict: The requested fields and collected_at, the server time of the snapshot
+                in seconds since the epoch.
+
+        Raises:
+            ValueError: If a field is unknown.
+        """
+        unknown = set(fields) - SNAPSHOT_FIELDS.keys()
+        if unknown:
+            raise ValueError(f"Unknown snapshot fields: {', '.join(sorted(unknown))}.")
+
+        now = time.monotonic()
+        key = connection_pool.get_key(connection, connection.active_service)
+        with self._lock:
+            for entry_key, entry in list(self._entries.items()):
+                if now - entry.collected > settings.MONITORING_SAMPLER_IDLE_TIMEOUT:
+                    del self._entries[entry_key]
+            entry = self._entries.setdefault(key, SnapshotEntry())
+
+        with entry.lock:
+            for field in fields:
+                entry.fields[field] = now
+            # fields no widget asked for lately are not collected anymore
+            for field, requested in list(entry.fields.items()):
+                if now - requested > settings.MONITORING_SAMPLER_IDLE_TIMEOUT:
+                    del entry.fields[field]
+            if (
+                entry.values is None
+                or now - entry.collected > settings.MONITORING_SNAPSHOT_MAX_AGE
+                or not entry.values.keys() >= set(fields)
+            ):
+                entry.values = self._collect(connection, entry.fields)
+                entry.collected = time.monotonic()
+            values = entry.values
+
+        return {
+            "collected_at": values["collected_at"],
+            **{field: values[field] for field in fields},
+        }
+
+    def clear(self) -> None:
+        """
+        Drops every snapshot.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+snapshot_collector = SnapshotCollector()
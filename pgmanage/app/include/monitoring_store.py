@@ -0,0 +1,207 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from pgmanage import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_series_name(database, widget_key) -> str:
+    """Builds the name under which the samples of a widget on a database are stored.
+
+    Args:
+        database: OmniDatabase object.
+        widget_key: (plugin_name, id) of the widget.
+
+    Returns:
+        str: The series name.
+    """
+    return json.dumps([database.conn_id, database.active_service, *widget_key])
+
+
+def to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def consolidate(current: Any, count: int, sample: Any) -> Any:
+    """Merges a sample into the consolidated sample of a bucket.
+
+    Numeric "y" values of timeseries datasets are averaged, everything else keeps
+    the value of the latest sample.
+
+    Args:
+        current (Any): The consolidated sample of the bucket.
+        count (int): Number of samples already consolidated into current.
+        sample (Any): The new sample.
+
+    Returns:
+        Any: The new consolidated sample.
+    """
+    try:
+        datasets = sample["datasets"]
+        current_datasets = current["datasets"]
+    except (KeyError, TypeError):
+        return sample
+    if not isinstance(datasets, list) or not isinstance(current_datasets, list):
+        return sample
+
+    for index, dataset in enumerate(datasets):
+        if index >= len(current_datasets):
+            break
+        points = dataset.get("data") or []
+        current_points = current_datasets[index].get("data") or []
+        if len(points) != 1 or len(current_points) != 1:
+            continue
+        value = to_number(points[0].get("y"))
+        current_value = to_number(current_points[0].get("y"))
+        if value is not None and current_value is not None:
+            points[0]["y"] = round((current_value * count + value) / (count + 1), 6)
+    return sample
+
+
+class MonitoringStore:
+    """
+    Persistent history of timeseries widgets, kept in an SQLite file.
+
+    Samples are consolidated in RRD-style tiers configured by MONITORING_STORE_TIERS,
+    each tier keeps one row per series and bucket of `resolution` seconds for
+    `retention` seconds. Range queries read the finest tier that covers the range.
+
+    Attributes:
+        _lock (threading.Lock): A lock guarding the connection.
+        _connection (Optional[sqlite3.Connection]): Connection to the store, opened on first use.
+        _path (Optional[str]): Path the connection was opened with.
+        _last_prune (float): Time of the last removal of expired rows.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._connection = None
+        self._path = None
+        self._last_prune = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        path = str(settings.MONITORING_STORE_PATH)
+        if self._connection is not None and self._path == path:
+            return self._connection
+        if self._connection is not None:
+            self._connection.close()
+        connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        connection.execute("pragma journal_mode = wal")
+        connection.execute("pragma synchronous = normal")
+        connection.execute(
+            """
+            create table if not exists monitoring_samples (
+                series text not null,
+                resolution integer not null,
+                bucket integer not null,
+                sample_count integer not null,
+                sample text not null,
+                primary key (series, resolution, bucket)
+            ) without rowid
+            """
+        )
+        self._connection = connection
+        self._path = path
+        return connection
+
+    def add(self, series: str, sample: Any, timestamp: Optional[float] = None) -> None:
+        """Stores a sample in every tier.
+
+        Args:
+            series (str): The series name, see get_series_name.
+            sample (Any): JSON serializable sample.
+            timestamp (Optional[float], optional): Unix time of the sample, defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        sample = json.dumps(sample, cls=DjangoJSONEncoder)
+        with self._lock:
+            connection = self._connect()
+            connection.execute("begin")
+            try:
+                for resolution, _ in settings.MONITORING_STORE_TIERS:
+                    bucket = int(timestamp // resolution * resolution)
+                    row = connection.execute(
+                        "select sample_count, sample from monitoring_samples "
+                        "where series = ? and resolution = ? and bucket = ?",
+                        (series, resolution, bucket),
+                    ).fetchone()
+                    value = json.loads(sample)
+                    count = 1
+                    if row is not None:
+                        value = consolidate(json.loads(row[1]), row[0], value)
+                        count = row[0] + 1
+                    connection.execute(
+                        "insert or replace into monitoring_samples "
+                        "(series, resolution, bucket, sample_count, sample) values (?, ?, ?, ?, ?)",
+                        (series, resolution, bucket, count, json.dumps(value)),
+                    )
+                connection.execute("commit")
+            except Exception:
+                connection.execute("rollback")
+                raise
+            if timestamp - self._last_prune >= settings.MONITORING_STORE_PRUNE_INTERVAL:
+                self._prune(connection, timestamp)
+
+    def _prune(self, connection: sqlite3.Connection, now: float) -> None:
+        for resolution, retention in settings.MONITORING_STORE_TIERS:
+            connection.execute(
+                "delete from monitoring_samples where resolution = ? and bucket < ?",
+                (resolution, int(now - retention)),
+            )
+        self._last_prune = now
+
+    def query(
+        self,
+        series: str,
+        start: float,
+        end: Optional[float] = None,
+        max_points: Optional[int] = None,
+    ) -> list[Any]:
+        """Returns the samples of a series within a time range, oldest first.
+
+        Uses the finest tier whose retention covers the range and that returns at most
+        max_points samples, falling back to the coarsest tier.
+
+        Args:
+            series (str): The series name, see get_series_name.
+            start (float): Unix time of the start of the range.
+            end (Optional[float], optional): Unix time of the end of the range, defaults to now.
+            max_points (Optional[int], optional): Maximum number of samples wanted.
+
+        Returns:
+            list[Any]: The samples.
+        """
+        end = time.time() if end is None else end
+        tiers = sorted(settings.MONITORING_STORE_TIERS)
+        resolution = tiers[-1][0]
+        for tier_resolution, retention in tiers:
+            if end - start > retention:
+                continue
+            if max_points and (end - start) / tier_resolution > max_points:
+                continue
+            resolution = tier_resolution
+            break
+
+        with self._lock:
+            rows = self._connect().execute(
+                "select sample from monitoring_samples "
+                "where series = ? and resolution = ? and bucket >= ? and bucket <= ? "
+                "order by bucket",
+                (series, resolution, int(start // resolution * resolution), int(end)),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+monitoring_store = MonitoringStore()
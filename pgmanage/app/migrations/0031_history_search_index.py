@@ -0,0 +1,72 @@
+# Generated by Django 4.2.23 on 2026-10-18 17:28
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+HISTORY_TABLES = ["app_queryhistory", "app_consolehistory"]
+
+
+def create_search_index(apps, schema_editor):
+    # trigram FTS5 tables need SQLite 3.34, without them history search falls back
+    # to a LIKE scan
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for table in HISTORY_TABLES:
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {table}_fts USING fts5("
+                    f"snippet, content='{table}', content_rowid='id', tokenize='trigram')"
+                )
+            except OperationalError:
+                return
+            cursor.execute(
+                f"""CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {table}_fts(rowid, snippet) VALUES (new.id, new.snippet);
+                END"""
+            )
+            cursor.execute(
+                f"""CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {table}_fts({table}_fts, rowid, snippet)
+                    VALUES ('delete', old.id, old.snippet);
+                END"""
+            )
+            cursor.execute(
+                f"""CREATE TRIGGER {table}_fts_update AFTER UPDATE OF snippet ON {table} BEGIN
+                    INSERT INTO {table}_fts({table}_fts, rowid, snippet)
+                    VALUES ('delete', old.id, old.snippet);
+                    INSERT INTO {table}_fts(rowid, snippet) VALUES (new.id, new.snippet);
+                END"""
+            )
+            cursor.execute(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        for table in HISTORY_TABLES:
+            for trigger in ("insert", "delete", "update"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{trigger}")
+            cursor.execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0030_populate_mssql-technology'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consolehistory',
+            index=models.Index(fields=['user', 'connection', 'start_time'], name='consolehistory_user_conn_start'),
+        ),
+        migrations.AddIndex(
+            model_name='queryhistory',
+            index=models.Index(fields=['user', 'connection', 'start_time'], name='queryhistory_user_conn_start'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 17:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0031_history_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorySnippet',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('snippet', models.TextField(default='')),
+                ('compressed', models.BinaryField(null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='consolehistory',
+            name='snippet_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='app.historysnippet'),
+        ),
+        migrations.AddField(
+            model_name='queryhistory',
+            name='snippet_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='app.historysnippet'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.23 on 2026-10-18 18:05
+
+import zlib
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    # a contentless trigram index keeps no copy of the compressed snippets, rows are
+    # added and deleted by app.include.history_retention with the snippet text
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    HistorySnippet = apps.get_model("app", "HistorySnippet")
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE app_historysnippet_fts USING fts5("
+                "snippet, content='', tokenize='trigram')"
+            )
+        except OperationalError:
+            return
+        for snippet in HistorySnippet.objects.iterator():
+            if snippet.compressed is not None:
+                text = zlib.decompress(snippet.compressed).decode("utf-8")
+            else:
+                text = snippet.snippet
+            cursor.execute(
+                "INSERT INTO app_historysnippet_fts(rowid, snippet) VALUES (%s, %s)",
+                [snippet.id, text],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS app_historysnippet_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0033_job_parent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
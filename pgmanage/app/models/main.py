@@ -1,5 +1,6 @@
 import os
 import shutil
+import zlib
 
 from app.utils.crypto import decrypt, encrypt
 from django.contrib.auth.models import User
@@ -154,6 +155,24 @@ class Tab(models.Model):
     database = models.CharField(max_length=200, null=True)
 
 
+class HistorySnippet(models.Model):
+    """
+    A history snippet stored once however often it was executed.
+
+    Snippets are addressed by the sha256 digest of their text, large ones are kept
+    zlib compressed in `compressed` with an empty `snippet`.
+    """
+
+    digest = models.CharField(max_length=64, unique=True)
+    snippet = models.TextField(default="")
+    compressed = models.BinaryField(null=True)
+
+    def get_text(self):
+        if self.compressed is not None:
+            return zlib.decompress(self.compressed).decode("utf-8")
+        return self.snippet
+
+
 class QueryHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     connection = models.ForeignKey(Connection, on_delete=models.CASCADE)
@@ -162,16 +181,44 @@ class QueryHistory(models.Model):
     duration = models.TextField(default="")
     status = models.TextField(default="")
     snippet = models.TextField(default="")
+    snippet_ref = models.ForeignKey(HistorySnippet, null=True, on_delete=models.PROTECT)
     database = models.CharField(max_length=200, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "connection", "start_time"],
+                name="queryhistory_user_conn_start",
+            )
+        ]
+
+    def get_snippet(self):
+        if self.snippet_ref_id is not None:
+            return self.snippet_ref.get_text()
+        return self.snippet
+
 
 class ConsoleHistory(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     connection = models.ForeignKey(Connection, on_delete=models.CASCADE)
     start_time = models.DateTimeField()
     snippet = models.TextField(default="")
+    snippet_ref = models.ForeignKey(HistorySnippet, null=True, on_delete=models.PROTECT)
     database = models.CharField(max_length=200, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "connection", "start_time"],
+                name="consolehistory_user_conn_start",
+            )
+        ]
+
+    def get_snippet(self):
+        if self.snippet_ref_id is not None:
+            return self.snippet_ref.get_text()
+        return self.snippet
+
 
 class Group(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -239,6 +286,9 @@ class Job(models.Model):
     utility_pid = models.IntegerField(null=True)
     process_state = models.IntegerField(null=True)
     connection = models.ForeignKey(Connection, on_delete=models.CASCADE, null=True)
+    parent = models.ForeignKey(
+        "self", on_delete=models.CASCADE, null=True, related_name="children"
+    )
 
 
 class ERDLayout(models.Model):
@@ -51,6 +51,8 @@ const queryRequestCodes = {
   Terminal: 11,
   Ping: 12,
   SchemaEditData: 13,
+  WatchJob: 14,
+  UnwatchJob: 15,
 };
 
 /// <summary>
@@ -73,6 +75,7 @@ const queryResponseCodes = {
   Pong: 13,
   OperationCancelled: 14,
   SchemaEditResult: 15,
+  JobProgress: 16,
 };
 
 const allowedFileTypes = ["application/sql", "text/csv", "text/plain", "Text"];
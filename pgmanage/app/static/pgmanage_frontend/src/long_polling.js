@@ -12,6 +12,12 @@ const uid = new ShortUniqueId({dictionary: 'alpha_upper', length: 4})
 
 let polling_busy = null;
 let request_map = new Map()
+// server push channel, open while requests are pending, long polling is only used while it is not ready
+let push_channel = null;
+let push_ready = false;
+let push_close_timer = null;
+// keeps the channel of back to back requests open, an idle tab holds no server thread
+const PUSH_IDLE_CLOSE_DELAY = 5000;
 
 // send heartbeat to prevent db session from being terminated by back-end
 $(function () {
@@ -27,6 +33,48 @@ $(window).on('beforeunload', () => {
   navigator.sendBeacon(`${app_base_path}/clear_client/`, data)
 })
 
+function open_push_channel() {
+  clearTimeout(push_close_timer)
+  push_close_timer = null
+  if (typeof EventSource === 'undefined' || push_channel !== null)
+    return
+
+  push_channel = new EventSource(`${app_base_path}/push_events/`)
+  push_channel.addEventListener('ready', () => {
+    push_ready = true
+  })
+  push_channel.onmessage = (event) => {
+    try {
+      polling_response(JSON.parse(event.data))
+    } catch(err) {
+      console.log(err)
+    }
+  }
+  push_channel.onerror = () => {
+    // the browser reconnects by itself, keep pending requests alive with long polling meanwhile,
+    // a refused stream (every server slot taken) is closed for good
+    push_ready = false
+    if (push_channel.readyState === EventSource.CLOSED)
+      push_channel = null
+    if (request_map.size !== 0 && polling_busy !== true)
+      call_polling(false)
+  }
+}
+
+function schedule_push_close() {
+  if (request_map.size === 0 && push_channel !== null && push_close_timer === null)
+    push_close_timer = setTimeout(close_push_channel, PUSH_IDLE_CLOSE_DELAY)
+}
+
+function close_push_channel() {
+  push_close_timer = null
+  if (push_channel === null || request_map.size !== 0)
+    return
+  push_channel.close()
+  push_channel = null
+  push_ready = false
+}
+
 function call_polling(startup) {
     polling_busy = true
     axios.post(
@@ -41,7 +89,7 @@ function call_polling(startup) {
           console.log(err)
         }
       });
-      if (request_map.size !== 0) {
+      if (request_map.size !== 0 && !push_ready) {
         call_polling(false)
       } else {
         polling_busy = null
@@ -169,18 +217,35 @@ function polling_response(message) {
         context.callback(message);
         removeContext(context_code);
       }
+      break;
     }
-    default: {
+    case parseInt(queryResponseCodes.JobProgress): {
+      if (context) {
+        context.callback(message.data);
+        //The watch ends once both logs are read to the end
+        if (message.data.out.done && message.data.err.done) {
+          removeContext(context_code);
+        }
+      }
       break;
     }
     case parseInt(queryResponseCodes.AdvancedObjectSearchResult): {
       if (context) {
         SetAcked(context);
-        advancedObjectSearchReturn(message, context);
-        removeContext(context_code);
+        if (context.callback != null) {
+          context.callback(message, context)
+        }
+        //Results arrive per category, the last one closes the search.
+        //No component sends AdvancedObjectSearch requests yet, a caller passes the callback
+        if (message.data.last_block) {
+          removeContext(context_code);
+        }
       }
       break;
     }
+    default: {
+      break;
+    }
   }
 }
 
@@ -214,6 +279,7 @@ function createContext(context) {
 
 function removeContext(context_code) {
   request_map.delete(context_code)
+  schedule_push_close()
 }
 
 function createRequest(request_type, message_data, context) {
@@ -234,11 +300,18 @@ function createRequest(request_type, message_data, context) {
 		}
 	}
 
+  open_push_channel()
+  // requests without a context are not waited for
+  schedule_push_close()
+
   // synchronize call_polling requests, do not run new one when there is a request in progress
-  if (polling_busy === null)
-    call_polling(true)
-  else if (polling_busy === false) {
-    call_polling(false)
+  // responses are delivered through the push channel, long polling takes over when it fails
+  if (push_channel === null) {
+    if (polling_busy === null)
+      call_polling(true)
+    else if (polling_busy === false) {
+      call_polling(false)
+    }
   }
 
   axios.post(
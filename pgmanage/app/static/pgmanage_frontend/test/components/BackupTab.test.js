@@ -262,6 +262,20 @@ describe("BackupTab Component", () => {
     expect(wrapper.vm.roleNames).toEqual(["role1", "role2"]);
   });
 
+  it("calls getDatabaseNames and updates databaseNames on success", async () => {
+    axios.post.mockResolvedValueOnce({
+      data: [{ name: "db1" }, { name: "db2" }],
+    });
+
+    await wrapper.vm.getDatabaseNames();
+    await flushPromises();
+    expect(axios.post).toHaveBeenCalledWith("/get_databases_postgresql/", {
+      database_index: props.databaseIndex,
+      workspace_id: props.workspaceId,
+    });
+    expect(wrapper.vm.databaseNames).toEqual(["db1", "db2"]);
+  });
+
   it("calls getRoleNames and shows an error toast on failure", async () => {
     const errorResponse = {
       response: { data: { data: "Error fetching roles" } },
@@ -66,6 +66,36 @@ describe("MonitoringDashboard", () => {
     ).toHaveProperty("widgetRefreshed");
   });
 
+  test("should refresh due widgets with one request", async () => {
+    // let the mounted widget send its own first refresh
+    vi.advanceTimersByTime(300);
+    await flushPromises();
+
+    axios.post.mockResolvedValueOnce({
+      data: {
+        widgets: [
+          { saved_id: 1, data: [] },
+          { saved_id: 2, error: true, data: "failed" },
+        ],
+      },
+    });
+    const first = dashboardWrapper.vm.requestWidgetRefresh({ saved_id: 1 });
+    const second = dashboardWrapper.vm.requestWidgetRefresh({ saved_id: 2 });
+    vi.advanceTimersByTime(100);
+
+    await expect(first).resolves.toStrictEqual({
+      data: { saved_id: 1, data: [] },
+    });
+    await expect(second).rejects.toStrictEqual({
+      response: { data: { saved_id: 2, error: true, data: "failed" } },
+    });
+    expect(axios.post).toHaveBeenLastCalledWith("/monitoring-widgets/refresh", {
+      database_index: undefined,
+      workspace_id: "workspaceId",
+      widgets: [{ saved_id: 1 }, { saved_id: 2 }],
+    });
+  });
+
   test("should not refresh widgets when none exist", async () => {
     axios.patch.mockResolvedValueOnce();
     await dashboardWrapper.vm.toggleWidget(
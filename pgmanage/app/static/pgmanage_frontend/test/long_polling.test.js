@@ -0,0 +1,143 @@
+import axios from "axios";
+import { flushPromises } from "@vue/test-utils";
+import { afterEach, beforeEach, describe, expect, it, vi } from "vitest";
+import { createRequest } from "@src/long_polling";
+import { queryRequestCodes, queryResponseCodes } from "@src/constants";
+
+vi.mock("@src/notification_control", () => ({
+  showAlert: vi.fn(),
+  showToast: vi.fn(),
+}));
+
+vi.mock("@src/logging/utils", () => ({
+  handleError: vi.fn(),
+}));
+
+// answers the next long polling request with the given messages for a context
+function respondWith(context, messages) {
+  axios.post.mockImplementation((url) => {
+    if (url === "/long_polling/") {
+      return Promise.resolve({
+        data: {
+          returning_rows: messages.map((message) => ({
+            ...message,
+            context_code: context.code,
+          })),
+        },
+      });
+    }
+    return Promise.resolve({ data: {} });
+  });
+}
+
+describe("long_polling", () => {
+  afterEach(() => {
+    vi.clearAllMocks();
+  });
+
+  it("runs the callback of a schema edit result once", async () => {
+    const context = { callback: vi.fn() };
+    respondWith(context, [
+      { response_type: parseInt(queryResponseCodes.SchemaEditResult), data: 1 },
+    ]);
+
+    createRequest(queryRequestCodes.SchemaEditData, {}, context);
+    await flushPromises();
+
+    expect(context.callback).toHaveBeenCalledTimes(1);
+    expect(context.callback).toHaveBeenCalledWith(
+      expect.objectContaining({ data: 1 })
+    );
+  });
+
+  it("runs the callback of job progress with its data", async () => {
+    const context = { callback: vi.fn() };
+    const data = {
+      out: { pos: 1, lines: [], done: true },
+      err: { pos: 1, lines: [], done: true },
+    };
+    respondWith(context, [
+      { response_type: parseInt(queryResponseCodes.JobProgress), data: data },
+    ]);
+
+    createRequest(queryRequestCodes.WatchJob, { job_id: 1 }, context);
+    await flushPromises();
+
+    expect(context.callback).toHaveBeenCalledTimes(1);
+    expect(context.callback).toHaveBeenCalledWith(data);
+  });
+
+  describe("push channel", () => {
+    // the channel of the module outlives a test
+    const channels = [];
+
+    class FakeEventSource {
+      static CLOSED = 2;
+
+      constructor(url) {
+        this.url = url;
+        this.readyState = 1;
+        this.close = vi.fn();
+        channels.push(this);
+      }
+
+      addEventListener(event, listener) {
+        if (event === "ready") listener();
+      }
+    }
+
+    beforeEach(() => {
+      vi.useFakeTimers();
+      vi.stubGlobal("EventSource", FakeEventSource);
+      axios.post.mockResolvedValue({ data: {} });
+    });
+
+    afterEach(() => {
+      vi.useRealTimers();
+      vi.unstubAllGlobals();
+    });
+
+    it("is only open while requests are pending", async () => {
+      const context = { callback: vi.fn() };
+
+      createRequest(queryRequestCodes.SchemaEditData, {}, context);
+      expect(channels).toHaveLength(1);
+      expect(channels[0].url).toEqual("test_folder/push_events/");
+      expect(axios.post).not.toHaveBeenCalledWith(
+        "/long_polling/",
+        expect.anything()
+      );
+
+      channels[0].onmessage({
+        data: JSON.stringify({
+          response_type: parseInt(queryResponseCodes.SchemaEditResult),
+          context_code: context.code,
+          data: 1,
+        }),
+      });
+      expect(context.callback).toHaveBeenCalledTimes(1);
+
+      vi.advanceTimersByTime(4000);
+      expect(channels[0].close).not.toHaveBeenCalled();
+      vi.advanceTimersByTime(1000);
+      expect(channels[0].close).toHaveBeenCalledTimes(1);
+
+      createRequest(queryRequestCodes.SchemaEditData, {}, { callback: vi.fn() });
+      expect(channels).toHaveLength(2);
+      expect(channels[1].close).not.toHaveBeenCalled();
+    });
+
+    it("falls back to long polling when the stream is refused", async () => {
+      const context = { callback: vi.fn() };
+
+      createRequest(queryRequestCodes.SchemaEditData, {}, context);
+      const channel = channels[channels.length - 1];
+      channel.readyState = FakeEventSource.CLOSED;
+      channel.onerror();
+
+      expect(axios.post).toHaveBeenCalledWith("/long_polling/", {
+        startup: false,
+      });
+    });
+  });
+});
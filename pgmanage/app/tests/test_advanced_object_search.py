@@ -0,0 +1,150 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from app.include import OmniDatabase
+from app.include.advanced_object_search import AdvancedObjectSearch
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+def build_database():
+    database = MagicMock()
+    database.active_service = "dellstore"
+    database.AdvancedObjectSearch.return_value = {
+        "Table Name": "select 'Table Name'",
+        "Data": {"public.customers": "select 'customers'", "public.orders": "select 'orders'"},
+        "Schema Name": "select 'Schema Name'",
+    }
+    return database
+
+
+@patch.object(settings, "ADVANCED_OBJECT_SEARCH_MAX_WORKERS", 2)
+@patch.object(settings, "ADVANCED_OBJECT_SEARCH_STATEMENT_TIMEOUT", 5)
+class AdvancedObjectSearchTests(TestCase):
+    def setUp(self):
+        self.database = build_database()
+        self.results = []
+        patcher = patch("app.include.advanced_object_search.connection_pool")
+        self.connection_pool = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.workers = []
+
+        def acquire(database, name):
+            worker = MagicMock()
+            worker.connection.GetConStatus.return_value = 1
+            worker.connection.Query.side_effect = lambda sql: MagicMock(
+                Columns=["match_value"], Rows=[[sql]]
+            )
+            self.workers.append(worker)
+            return worker
+
+        self.connection_pool.acquire.side_effect = acquire
+
+    def run_search(self, search):
+        search._run()
+        return self.results
+
+    def test_every_statement_is_reported(self):
+        search = AdvancedObjectSearch(self.database, {"text": "cust"}, self.results.append)
+        results = self.run_search(search)
+
+        self.assertEqual(len(results), 5)
+        categories = sorted(r["category"] for r in results[:4] if r["category"] != "Data")
+        self.assertEqual(categories, ["Schema Name", "Table Name"])
+        data = sorted(r["table"] for r in results if r.get("category") == "Data")
+        self.assertEqual(data, ["public.customers", "public.orders"])
+        self.assertEqual(results[-1]["last_block"], True)
+        self.assertFalse(results[-1]["cancelled"])
+
+    def test_workers_are_bounded_and_released(self):
+        search = AdvancedObjectSearch(self.database, {"text": "cust"}, self.results.append)
+        self.run_search(search)
+
+        self.assertLessEqual(len(self.workers), 2)
+        for worker in self.workers:
+            worker.connection.Execute.assert_any_call("set statement_timeout = 5000")
+            worker.connection.Execute.assert_called_with("reset statement_timeout")
+            self.connection_pool.release.assert_any_call(worker)
+        self.assertEqual(search.tag["activeConnections"], [])
+
+    def test_failed_statement_does_not_stop_the_search(self):
+        def query(sql):
+            if "orders" in sql:
+                raise Exception("canceling statement due to statement timeout")
+            return MagicMock(Columns=["match_value"], Rows=[[sql]])
+
+        self.connection_pool.acquire.side_effect = None
+        worker = MagicMock()
+        worker.connection.Query.side_effect = query
+        self.connection_pool.acquire.return_value = worker
+        search = AdvancedObjectSearch(self.database, {"text": "cust"}, self.results.append)
+        results = self.run_search(search)
+
+        errors = [r for r in results if "error" in r]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]["table"], "public.orders")
+        self.assertEqual(len(results), 5)
+
+    def test_stop_cancels_running_statements(self):
+        running = threading.Event()
+        cancelled = threading.Event()
+
+        def query(sql):
+            running.set()
+            if not cancelled.wait(5):
+                raise AssertionError("statement was not cancelled")
+            raise Exception("terminating connection")
+
+        self.connection_pool.acquire.side_effect = None
+        worker = MagicMock()
+        worker.connection.Query.side_effect = query
+        worker.connection.Cancel.side_effect = lambda same_connection: cancelled.set()
+        self.connection_pool.acquire.return_value = worker
+        self.database.AdvancedObjectSearch.return_value = {"Table Name": "select 1"}
+        search = AdvancedObjectSearch(self.database, {"text": "cust"}, self.results.append)
+        search.start()
+        self.assertTrue(running.wait(5))
+        search.stop()
+        search._thread.join(5)
+
+        worker.connection.Cancel.assert_called_once_with(False)
+        self.assertEqual(len(self.results), 1)
+        self.assertTrue(self.results[0]["cancelled"])
+
+    def test_unsupported_database(self):
+        search = AdvancedObjectSearch(object(), {}, self.results.append)
+        self.run_search(search)
+
+        self.assertIn("not supported", self.results[0]["error"])
+        self.assertTrue(self.results[0]["last_block"])
+
+
+class AdvancedObjectSearchDatabaseTests(TestCase):
+    def test_search_on_dellstore(self):
+        database = OmniDatabase.Generic.InstantiateDatabase(
+            db_type="postgresql",
+            server="127.0.0.1",
+            port="5433",
+            service="dellstore",
+            user="postgres",
+            password="postgres",
+            conn_id=0,
+            application_name="Pgmanage Tests",
+        )
+        results = []
+        search = AdvancedObjectSearch(
+            database,
+            {
+                "text": "publ",
+                "categories": ["Schema Name", "Table Name", "Data"],
+                "schemas": ["public"],
+            },
+            results.append,
+        )
+        search._run()
+
+        self.assertTrue(all("error" not in result for result in results), results)
+        schemas = next(r for r in results if r.get("category") == "Schema Name")
+        self.assertIn("public", [row[-1] for row in schemas["rows"]])
+        self.assertTrue(results[-1]["last_block"])
@@ -0,0 +1,352 @@
+import json
+import os
+import tempfile
+from pickle import dumps
+from unittest.mock import MagicMock, patch
+
+from app.bgjob.backup_scheduler import BackupScheduler, get_dump_jobs
+from app.bgjob.jobs import PROCESS_STARTED, PROCESS_TERMINATED, BatchJob
+from app.models.main import Job
+from app.views.backup import (
+    Backup,
+    BackupMessage,
+    create_databases_backup,
+    get_database_backup_file,
+    set_number_of_jobs,
+)
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+class DumpJobsTests(TestCase):
+    @patch.object(settings, "BACKUP_MAX_DUMP_JOBS", 8)
+    def test_dump_jobs_share_the_cores(self):
+        with patch("os.cpu_count", return_value=16):
+            self.assertEqual(get_dump_jobs(), 8)
+            self.assertEqual(get_dump_jobs(4), 4)
+        with patch("os.cpu_count", return_value=2):
+            self.assertEqual(get_dump_jobs(4), 1)
+        with patch("os.cpu_count", return_value=None):
+            self.assertEqual(get_dump_jobs(), 1)
+
+    @patch("os.cpu_count", return_value=4)
+    def test_auto_number_of_jobs_only_applies_to_directory_format(self, _):
+        data = {"format": "directory", "number_of_jobs": "auto"}
+        set_number_of_jobs(data, 2)
+        self.assertEqual(data["number_of_jobs"], 2)
+
+        data = {"format": "custom", "number_of_jobs": "auto"}
+        set_number_of_jobs(data)
+        self.assertIsNone(data["number_of_jobs"])
+
+        data = {"format": "directory", "number_of_jobs": 3}
+        set_number_of_jobs(data)
+        self.assertEqual(data["number_of_jobs"], 3)
+
+    def test_database_backup_file(self):
+        self.assertEqual(
+            get_database_backup_file("/backups", "sales/eu", {"format": "custom"}),
+            os.path.join("/backups", "sales_eu.dump"),
+        )
+        self.assertEqual(
+            get_database_backup_file("/backups", "..", {"format": "directory"}),
+            os.path.join("/backups", "__"),
+        )
+        self.assertEqual(
+            get_database_backup_file(
+                "/backups", "sales", {"format": "plain", "pigz": True}
+            ),
+            os.path.join("/backups", "sales.sql.gz"),
+        )
+
+    def test_database_backup_files_are_unique(self):
+        used_names = set()
+        files = [
+            get_database_backup_file("/backups", name, {"format": "custom"}, used_names)
+            for name in ["sales.eu", "sales_eu", "Sales_EU", "sales_eu_2"]
+        ]
+        self.assertEqual(
+            files,
+            [
+                os.path.join("/backups", "sales_eu.dump"),
+                os.path.join("/backups", "sales_eu_2.dump"),
+                os.path.join("/backups", "Sales_EU_3.dump"),
+                os.path.join("/backups", "sales_eu_2_2.dump"),
+            ],
+        )
+
+
+@patch.object(settings, "BACKUP_MAX_CONCURRENT_JOBS", 2)
+@patch.object(BackupScheduler, "_start")
+@patch.object(BatchJob, "start")
+class BackupSchedulerTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.user = User.objects.create_user(username="backup_user")
+        self.scheduler = BackupScheduler()
+        self.next_id = 1
+
+    def create_job(self, database=None, parent=None):
+        job_id = self.next_id
+        self.next_id += 1
+        logdir = os.path.join(self.temp_dir.name, str(job_id))
+        os.makedirs(logdir)
+        description = BackupMessage(
+            Backup.create(Backup.OBJECT), None, "backup", database=database
+        )
+        Job.objects.create(
+            id=job_id,
+            user=self.user,
+            description=dumps(description).hex(),
+            logdir=logdir,
+            parent_id=parent.id if parent else None,
+        )
+        return BatchJob(id=job_id)
+
+    def finish(self, job, exit_code=0):
+        with open(os.path.join(job.log_dir, "status"), "w") as fp:
+            json.dump(
+                {
+                    "start_time": "20250101120000000000",
+                    "end_time": "20250101120100000000",
+                    "exit_code": exit_code,
+                },
+                fp,
+            )
+
+    def read_status(self, job):
+        with open(os.path.join(job.log_dir, "status")) as fp:
+            return json.load(fp)
+
+    def read_log(self, job):
+        with open(job.stdout) as fp:
+            return [line.split(",", 1)[1] for line in fp.read().splitlines()]
+
+    def test_jobs_over_the_limit_wait_for_a_slot(self, start_mock, _):
+        jobs = [self.create_job() for _ in range(3)]
+
+        self.scheduler.submit(jobs)
+        self.assertEqual(start_mock.call_count, 2)
+        self.assertEqual(list(self.scheduler._queue), [jobs[2]])
+
+        self.scheduler._poll()
+        self.scheduler._dispatch()
+        self.assertEqual(start_mock.call_count, 2)
+
+        self.finish(jobs[0])
+        self.scheduler._poll()
+        self.scheduler._dispatch()
+        self.assertEqual(start_mock.call_count, 3)
+        self.assertFalse(self.scheduler._queue)
+        self.assertEqual(set(self.scheduler._running), {str(jobs[1].id), str(jobs[2].id)})
+        self.assertEqual(Job.objects.get(id=jobs[0].id).exit_code, 0)
+
+    def test_parent_job_reports_the_databases(self, start_mock, _):
+        parent = self.create_job(database="sales, hr, crm")
+        jobs = [
+            self.create_job(database=name, parent=parent)
+            for name in ("sales", "hr", "crm")
+        ]
+
+        self.scheduler.submit(jobs, parent)
+        self.assertEqual(start_mock.call_count, 2)
+        self.assertNotIn("exit_code", self.read_status(parent))
+
+        self.finish(jobs[0])
+        self.finish(jobs[1], exit_code=1)
+        self.scheduler._poll()
+        self.scheduler._dispatch()
+        self.finish(jobs[2])
+        self.scheduler._poll()
+
+        status = self.read_status(parent)
+        self.assertEqual(status["exit_code"], 1)
+        self.assertIn("end_time", status)
+        self.assertEqual(
+            self.read_log(parent),
+            [
+                "Queued the backups of 3 databases",
+                "Started the backup of database 'sales'",
+                "Started the backup of database 'hr'",
+                "The backup of database 'sales' finished with exit code 0 (1 of 3)",
+                "The backup of database 'hr' finished with exit code 1 (2 of 3)",
+                "Started the backup of database 'crm'",
+                "The backup of database 'crm' finished with exit code 0 (3 of 3)",
+                "1 of 3 database backups failed: hr",
+            ],
+        )
+        self.assertFalse(self.scheduler._groups)
+
+        _, updated = BatchJob.update_job_info(Job.objects.get(id=parent.id))
+        self.assertTrue(updated)
+
+    def test_stopping_the_parent_cancels_queued_databases(self, start_mock, _):
+        parent = self.create_job(database="sales, hr, crm")
+        jobs = [
+            self.create_job(database=name, parent=parent)
+            for name in ("sales", "hr", "crm")
+        ]
+        self.scheduler.submit(jobs, parent)
+
+        with patch("app.bgjob.backup_scheduler.backup_scheduler", self.scheduler), patch(
+            "psutil.Process"
+        ):
+            BatchJob.stop_job(parent.id, self.user)
+
+        crm = Job.objects.get(id=jobs[2].id)
+        self.assertEqual(crm.exit_code, -1)
+        self.assertEqual(crm.process_state, PROCESS_TERMINATED)
+        self.assertFalse(self.scheduler._queue)
+
+        self.finish(jobs[0], exit_code=-15)
+        self.finish(jobs[1], exit_code=-15)
+        self.scheduler._poll()
+        self.assertEqual(self.read_status(parent)["exit_code"], 1)
+        self.assertIn(
+            "The backup of database 'crm' was cancelled (1 of 3)", self.read_log(parent)
+        )
+        self.assertEqual(start_mock.call_count, 2)
+
+    def test_stopping_a_queued_job_does_not_look_for_its_process(self, start_mock, _):
+        jobs = [self.create_job() for _ in range(3)]
+        self.scheduler.submit(jobs)
+
+        with patch("app.bgjob.backup_scheduler.backup_scheduler", self.scheduler), patch(
+            "psutil.Process"
+        ) as process_mock:
+            BatchJob.stop_job(jobs[2].id, self.user)
+
+        process_mock.assert_not_called()
+        self.assertEqual(Job.objects.get(id=jobs[2].id).exit_code, -1)
+
+    def test_jobs_left_queued_by_a_restart_are_terminated(self, start_mock, _):
+        jobs = [self.create_job() for _ in range(3)]
+        self.scheduler.submit(jobs)
+        Job.objects.filter(id=jobs[1].id).update(process_state=PROCESS_STARTED)
+        self.finish(jobs[0])
+
+        # a new server process knows nothing of the queue of the previous one
+        BackupScheduler().terminate_orphaned_jobs()
+
+        finished, running, queued = (Job.objects.get(id=job.id) for job in jobs)
+        self.assertIsNone(finished.exit_code)
+        self.assertIsNone(running.exit_code)
+        self.assertEqual(queued.exit_code, -1)
+        self.assertEqual(queued.process_state, PROCESS_TERMINATED)
+        self.assertIsNotNone(queued.start_time)
+        self.assertIsNotNone(queued.end_time)
+
+    def test_unfinished_parent_is_terminated_on_restart(self, start_mock, _):
+        parent = self.create_job(database="sales, hr, crm")
+        jobs = [
+            self.create_job(database=name, parent=parent)
+            for name in ("sales", "hr", "crm")
+        ]
+        self.scheduler.submit(jobs, parent)
+        start_time = self.read_status(parent)["start_time"]
+        done = self.create_job(database="sales, hr")
+        child = self.create_job(database="sales", parent=done)
+        self.finish(child)
+        self.finish(done)
+
+        BackupScheduler().terminate_orphaned_jobs()
+
+        status = self.read_status(parent)
+        self.assertEqual(status["exit_code"], -1)
+        self.assertEqual(status["start_time"], start_time)
+        self.assertIn("end_time", status)
+        self.assertEqual(
+            self.read_log(parent)[-1],
+            "The server restarted before the databases were backed up",
+        )
+        row = Job.objects.get(id=parent.id)
+        self.assertEqual(row.exit_code, -1)
+        self.assertEqual(row.process_state, PROCESS_TERMINATED)
+        self.assertIsNotNone(row.end_time)
+        self.assertEqual(Job.objects.get(id=jobs[2].id).exit_code, -1)
+        self.assertEqual(Job.objects.get(id=done.id).exit_code, 0)
+
+    def test_job_failing_to_start_frees_its_slot(self, start_mock, _):
+        start_mock.side_effect = [OSError("no executor"), None, None]
+        jobs = [self.create_job() for _ in range(3)]
+
+        self.scheduler.submit(jobs)
+
+        self.assertEqual(start_mock.call_count, 3)
+        self.assertEqual(Job.objects.get(id=jobs[0].id).exit_code, -1)
+        self.assertEqual(len(self.scheduler._running), 2)
+
+
+class CreateDatabasesBackupTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.user = User.objects.create_user(username="backup_user")
+        self.database = MagicMock(
+            conn_id=None,
+            server="127.0.0.1",
+            port=5432,
+            user="postgres",
+            password="secret",
+            active_service="postgres",
+        )
+
+    @patch("os.cpu_count", return_value=16)
+    @patch.object(settings, "BACKUP_MAX_CONCURRENT_JOBS", 4)
+    @patch("app.views.backup.backup_scheduler")
+    def test_one_child_job_per_database(self, scheduler_mock, _):
+        backup_dir = os.path.join(self.temp_dir.name, "nightly")
+
+        with patch("app.bgjob.jobs.HOME_DIR", self.temp_dir.name):
+            parent = create_databases_backup(
+                self.user,
+                self.database,
+                {"format": "directory", "number_of_jobs": "auto"},
+                ["sales", "hr"],
+                backup_dir,
+                "pg_dump",
+            )
+
+        self.assertTrue(os.path.isdir(backup_dir))
+        jobs, submitted_parent = scheduler_mock.submit.call_args.args
+        self.assertIs(submitted_parent, parent)
+        children = Job.objects.filter(parent_id=parent.id).order_by("id")
+        self.assertEqual(
+            [str(child.id) for child in children], [str(job.id) for job in jobs]
+        )
+        for job, name in zip(jobs, ["sales", "hr"]):
+            self.assertEqual(job.description.database, name)
+            self.assertEqual(job.args[1], os.path.join(backup_dir, name))
+            self.assertEqual(job.args[-1], name)
+            # 16 cores shared by the 2 databases dumped at once
+            self.assertIn("--jobs", job.args)
+            self.assertEqual(job.args[job.args.index("--jobs") + 1], "8")
+            self.assertEqual(os.environ.pop(str(job.id)), "secret")
+
+    @patch("app.views.backup.backup_scheduler")
+    def test_colliding_database_names_get_their_own_file(self, scheduler_mock):
+        backup_dir = os.path.join(self.temp_dir.name, "nightly")
+
+        with patch("app.bgjob.jobs.HOME_DIR", self.temp_dir.name):
+            create_databases_backup(
+                self.user,
+                self.database,
+                {"format": "custom"},
+                ["sales.eu", "sales_eu"],
+                backup_dir,
+                "pg_dump",
+            )
+
+        jobs, _ = scheduler_mock.submit.call_args.args
+        self.assertEqual(
+            [job.args[1] for job in jobs],
+            [
+                os.path.join(backup_dir, "sales_eu.dump"),
+                os.path.join(backup_dir, "sales_eu_2.dump"),
+            ],
+        )
+        for job in jobs:
+            os.environ.pop(str(job.id))
@@ -0,0 +1,100 @@
+from unittest.mock import MagicMock, patch
+
+import app.include.Spartacus.Database as Database
+from app.include.OmniDatabase.catalog_cache import DDL_REGEX, CatalogCache
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+def build_database(service="postgres"):
+    database = MagicMock()
+    database.conn_id = 1
+    database.active_server = "localhost"
+    database.active_port = "5432"
+    database.active_service = service
+    database.active_user = "postgres"
+    return database
+
+
+def build_table(*values):
+    table = Database.DataTable()
+    table.AddColumn("name")
+    for value in values:
+        table.AddRow([value])
+    return table
+
+
+@patch.object(settings, "CATALOG_CACHE_TTL", 300)
+@patch.object(settings, "CATALOG_CACHE_MAX_ENTRIES", 2)
+@patch.object(settings, "CATALOG_CACHE_CHECK_INTERVAL", 0)
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        self.cache = CatalogCache()
+        self.database = build_database()
+        self.query = MagicMock(return_value=build_table("public"))
+
+    def test_results_are_cached_per_database(self):
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        self.assertEqual(self.query.call_count, 1)
+
+        self.cache.get_or_query(build_database("other"), ("QuerySchemas",), self.query)
+        self.assertEqual(self.query.call_count, 2)
+
+    def test_callers_get_copies(self):
+        result = self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        result.Rows.pop()
+        result = self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        self.assertEqual(result.Column("name"), ["public"])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for key in ("a", "b", "a", "c"):
+            self.cache.get_or_query(self.database, (key,), self.query)
+        self.assertEqual(self.query.call_count, 3)
+        self.cache.get_or_query(self.database, ("a",), self.query)
+        self.assertEqual(self.query.call_count, 3)
+        self.cache.get_or_query(self.database, ("b",), self.query)
+        self.assertEqual(self.query.call_count, 4)
+
+    def test_expired_entry_is_queried_again(self):
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        with patch.object(settings, "CATALOG_CACHE_TTL", -1):
+            self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        self.assertEqual(self.query.call_count, 2)
+
+    def test_fingerprint_change_drops_entries(self):
+        fingerprint = MagicMock(return_value="1")
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query, fingerprint)
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query, fingerprint)
+        self.assertEqual(self.query.call_count, 1)
+
+        fingerprint.return_value = "2"
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query, fingerprint)
+        self.assertEqual(self.query.call_count, 2)
+
+    def test_invalidate(self):
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        self.cache.invalidate(self.database)
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        self.assertEqual(self.query.call_count, 2)
+
+    def test_result_of_query_running_during_invalidate_is_not_stored(self):
+        def query():
+            self.cache.invalidate(self.database)
+            return build_table("public")
+
+        self.cache.get_or_query(self.database, ("QuerySchemas",), query)
+        self.cache.get_or_query(self.database, ("QuerySchemas",), self.query)
+        self.assertEqual(self.query.call_count, 1)
+
+
+class DDLRegexTests(TestCase):
+    def test_ddl_statements(self):
+        self.assertTrue(DDL_REGEX.search("create table t (id int)"))
+        self.assertTrue(DDL_REGEX.search("select 1;\n  ALTER TABLE t ADD c int"))
+        self.assertTrue(DDL_REGEX.search("drop view v"))
+
+    def test_other_statements(self):
+        self.assertFalse(DDL_REGEX.search("select * from create_log"))
+        self.assertFalse(DDL_REGEX.search("insert into t values ('drop table x')"))
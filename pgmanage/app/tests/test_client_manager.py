@@ -0,0 +1,251 @@
+import json
+import tempfile
+import threading
+from unittest.mock import patch
+
+from app.client_manager import client_manager
+from app.client_manager.client_manager import Client
+from app.client_manager.response_queue import ResponseQueue
+from app.tests.utils_testing import USERS, execute_client_login
+from django.test import TestCase
+from django.urls import reverse
+
+from pgmanage import settings
+
+
+class ResponseQueueTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.queue = ResponseQueue(
+            max_bytes=10, max_spill_bytes=20, spill_dir=self.temp_dir.name
+        )
+
+    def tearDown(self):
+        self.queue.clear()
+        self.temp_dir.cleanup()
+
+    def test_overflow_is_spilled_in_order(self):
+        self.assertTrue(self.queue.put("aaaaaaaa", timeout=0))
+        self.assertTrue(self.queue.put("bbbbbbbb", timeout=0))
+        self.assertTrue(self.queue.put("c", timeout=0))
+        self.assertEqual(
+            self.queue.stats(),
+            {"responses": 3, "memory_bytes": 8, "spilled_bytes": 9},
+        )
+        self.assertEqual(self.queue.get(100), ["aaaaaaaa", "bbbbbbbb", "c"])
+        self.assertEqual(
+            self.queue.stats(),
+            {"responses": 0, "memory_bytes": 0, "spilled_bytes": 0},
+        )
+
+    def test_put_fails_when_spill_file_is_full(self):
+        self.assertTrue(self.queue.put("a" * 10, timeout=0))
+        self.assertTrue(self.queue.put("b" * 20, timeout=0))
+        self.assertFalse(self.queue.put("c", timeout=0))
+
+    def test_put_does_not_wait_once_spilled(self):
+        self.assertTrue(self.queue.put("a" * 10, timeout=0))
+        self.assertTrue(self.queue.put("b", timeout=0))
+
+        with patch.object(
+            self.queue.condition, "wait_for", wraps=self.queue.condition.wait_for
+        ) as wait_for:
+            self.assertTrue(self.queue.put("c", timeout=5))
+
+        wait_for.assert_not_called()
+        self.assertEqual(self.queue.stats()["spilled_bytes"], 2)
+        self.assertEqual(self.queue.get(100), ["a" * 10, "b", "c"])
+
+    def test_forced_put_ignores_the_spill_limit(self):
+        self.queue.put("a" * 10, timeout=0)
+        self.queue.put("b" * 20, timeout=0)
+        self.assertTrue(self.queue.put("c", timeout=0, force=True))
+        self.assertEqual(self.queue.get(100), ["a" * 10, "b" * 20, "c"])
+
+    def test_get_respects_byte_limit(self):
+        self.queue.put("aaaa", timeout=0)
+        self.queue.put("bbbb", timeout=0)
+        self.assertEqual(self.queue.get(1), ["aaaa"])
+        self.assertEqual(self.queue.get(1), ["bbbb"])
+
+    def test_non_ascii_responses_are_spilled(self):
+        self.queue.put("a" * 10, timeout=0)
+        self.queue.put("ção", timeout=0)
+        self.assertEqual(self.queue.get(100), ["a" * 10, "ção"])
+
+
+class ClientResponseQueueTests(TestCase):
+    def setUp(self):
+        self.client_object = Client(client_id="test_client")
+
+    def tearDown(self):
+        self.client_object.returning_data.clear()
+
+    def get_responses(self, **kwargs):
+        return [
+            json.loads(response)
+            for response in self.client_object.get_responses(**kwargs)
+        ]
+
+    def test_get_responses_drains_queue(self):
+        self.client_object.queue_response({"response_type": 1})
+        self.client_object.queue_response({"response_type": 2})
+        self.assertEqual(
+            self.get_responses(timeout=0),
+            [{"response_type": 1}, {"response_type": 2}],
+        )
+        self.assertEqual(self.get_responses(timeout=0), [])
+
+    def test_queued_response_is_not_affected_by_later_changes(self):
+        data = {"response_type": 1, "data": [1]}
+        self.client_object.queue_response(data)
+        data["data"].append(2)
+        self.assertEqual(
+            self.get_responses(timeout=0), [{"response_type": 1, "data": [1]}]
+        )
+
+    def test_get_responses_wakes_up_on_new_response(self):
+        timer = threading.Timer(
+            0.1, self.client_object.queue_response, args=[{"response_type": 1}]
+        )
+        timer.start()
+        self.assertEqual(self.get_responses(timeout=5), [{"response_type": 1}])
+        timer.join()
+
+    def test_wake_consumers_releases_waiting_consumer(self):
+        timer = threading.Timer(0.1, self.client_object.wake_consumers)
+        timer.start()
+        self.assertEqual(self.client_object.get_responses(timeout=5), [])
+        timer.join()
+
+    @patch.object(settings, "CLIENT_QUEUE_PUT_TIMEOUT", 5)
+    def test_queue_response_waits_for_consumer(self):
+        self.client_object.returning_data.max_bytes = 1
+        self.assertTrue(self.client_object.queue_response({"response_type": 1}))
+
+        timer = threading.Timer(0.1, self.client_object.get_responses, args=[0])
+        timer.start()
+        self.assertTrue(self.client_object.queue_response({"response_type": 2}))
+        timer.join()
+        self.assertEqual(self.client_object.get_queue_stats()["spilled_bytes"], 0)
+        self.assertEqual(self.get_responses(timeout=0), [{"response_type": 2}])
+
+    @patch.object(settings, "CLIENT_QUEUE_PUT_TIMEOUT", 0)
+    def test_queue_response_spills_when_consumer_is_slow(self):
+        self.client_object.returning_data.max_bytes = 1
+        self.assertTrue(self.client_object.queue_response({"response_type": 1}))
+        self.assertTrue(self.client_object.queue_response({"response_type": 2}))
+        self.assertGreater(self.client_object.get_queue_stats()["spilled_bytes"], 0)
+        self.assertEqual(
+            self.get_responses(timeout=0),
+            [{"response_type": 1}, {"response_type": 2}],
+        )
+
+    @patch.object(settings, "CLIENT_QUEUE_PUT_TIMEOUT", 0)
+    def test_full_queue_sends_an_error_and_stops_the_query(self):
+        self.client_object.returning_data.max_bytes = 1
+        self.client_object.returning_data.max_spill_bytes = 150
+        data = {"response_type": 1, "context_code": 7, "data": {"data": "x" * 40}}
+        thread = threading.Thread()
+        thread.cancel = False
+        thread.stop = lambda: setattr(thread, "cancel", True)
+
+        with patch("threading.current_thread", return_value=thread):
+            self.assertTrue(self.client_object.queue_response(data))
+            self.assertTrue(self.client_object.queue_response(data))
+            self.assertFalse(self.client_object.queue_response(data))
+            # the error stays the last response of the context
+            self.assertFalse(self.client_object.queue_response({**data, "data": {}}))
+
+        self.assertTrue(thread.cancel)
+        responses = self.get_responses(timeout=0)
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(responses[-1]["context_code"], 7)
+        self.assertTrue(responses[-1]["error"])
+        self.assertTrue(responses[-1]["data"]["last_block"])
+        self.assertIn("too large", responses[-1]["data"]["message"])
+
+    def test_superseded_push_stream_stops_receiving(self):
+        stream_id = self.client_object.open_push_stream()
+        self.client_object.open_push_stream()
+        self.client_object.queue_response({"response_type": 1})
+        self.assertFalse(self.client_object.is_push_stream_active(stream_id))
+        self.assertEqual(
+            self.client_object.get_responses(timeout=0, stream_id=stream_id), []
+        )
+
+
+class PushEventsViewTests(TestCase):
+    def setUp(self):
+        execute_client_login(
+            p_client=self.client,
+            p_username=USERS["ADMIN"]["USER"],
+            p_password=USERS["ADMIN"]["PASSWORD"],
+        )
+        self.client_object = client_manager.get_or_create_client(
+            client_id=self.client.session.session_key
+        )
+
+    def tearDown(self):
+        client_manager.remove_client(self.client.session.session_key)
+
+    def test_push_events_streams_queued_responses(self):
+        response = self.client.get(reverse("push_events"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        stream = iter(response.streaming_content)
+        self.assertIn(b"event: ready", next(stream))
+
+        self.client_object.queue_response({"response_type": 1, "data": [1, 2]})
+        event = next(stream).decode()
+        self.assertTrue(event.startswith("data: "))
+        self.assertEqual(
+            json.loads(event[len("data: "):]), {"response_type": 1, "data": [1, 2]}
+        )
+        response.close()
+
+    @patch.object(settings, "PUSH_MAX_STREAMS", 1)
+    def test_push_events_over_the_stream_limit_are_refused(self):
+        first = self.client.get(reverse("push_events"))
+        self.assertEqual(first.status_code, 200)
+
+        refused = self.client.get(reverse("push_events"))
+        self.assertEqual(refused.status_code, 503)
+
+        # the slot is given back even though the stream was never read
+        first.close()
+        second = self.client.get(reverse("push_events"))
+        self.assertEqual(second.status_code, 200)
+        second.close()
+
+    def test_closed_push_stream_gives_its_slot_back_once(self):
+        response = self.client.get(reverse("push_events"))
+        streams = client_manager._push_streams
+        next(iter(response.streaming_content))
+        response.close()
+        response.close()
+        self.assertEqual(client_manager._push_streams, streams - 1)
+
+    def test_push_events_without_session(self):
+        self.client.logout()
+        response = self.client.get(reverse("push_events"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_client_queues_reports_queue_size(self):
+        self.client_object.queue_response({"response_type": 1})
+        response = self.client.get(reverse("client_queues"))
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()["data"]
+        self.assertIn(1, [client["responses"] for client in stats])
+        self.assertNotIn(self.client.session.session_key, response.content.decode())
+
+    def test_long_polling_returns_queued_responses(self):
+        self.client_object.queue_response({"response_type": 1})
+        response = self.client.post(
+            reverse("long_polling"),
+            {"startup": False},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"returning_rows": [{"response_type": 1}]})
@@ -1,12 +1,16 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import partial
+from unittest.mock import patch
 
+from app.include.history_retention import HistoryCompactor, has_search_index
 from app.models import Connection, ConsoleHistory, QueryHistory, Technology
 from django.contrib.auth.models import User
 from django.test import Client, TestCase
 from django.urls import reverse
 from django.utils.timezone import make_aware
 
+from pgmanage import settings
+
 
 class CommandsHistoryTests(TestCase):
     def setUp(self):
@@ -170,7 +174,8 @@ class CommandsHistoryTests(TestCase):
         data = response.json()
         self.assertEqual(len(data["command_list"]), 1)
         self.assertEqual(data["command_list"][0]["database"], "analytics")
-        self.assertIn("pages", data)
+        self.assertFalse(data["has_next"])
+        self.assertFalse(data["has_previous"])
         self.assertIn("database_names", data)
         self.assertIn("analytics", data["database_names"])
 
@@ -216,3 +221,123 @@ class CommandsHistoryTests(TestCase):
     def test_get_commands_history_unauthenticated(self):
         response = self.client.post(self.get_url)
         self.assertEqual(response.status_code, 401)
+
+    def create_console_history(self, snippets, start_time=None):
+        start_time = start_time or make_aware(datetime(2025, 1, 1))
+        ConsoleHistory.objects.bulk_create(
+            ConsoleHistory(
+                user=self.user,
+                connection=self.connection,
+                snippet=snippet,
+                start_time=start_time + timedelta(seconds=index // 2),
+            )
+            for index, snippet in enumerate(snippets)
+        )
+
+    def get_history(self, **data):
+        return self.client.post(
+            self.get_url,
+            data={
+                "database_index": self.connection.id,
+                "command_type": "Console",
+                "command_contains": "",
+                **data,
+            },
+        ).json()
+
+    @patch.object(settings, "CH_CMDS_PER_PAGE", 2)
+    def test_get_commands_history_keyset_pages(self):
+        self.login()
+        # pairs of entries share a start_time, ties are ordered by id
+        self.create_console_history([f"command {index}" for index in range(5)])
+
+        first = self.get_history()
+        self.assertEqual(
+            [c["snippet"] for c in first["command_list"]], ["command 4", "command 3"]
+        )
+        self.assertTrue(first["has_next"])
+        self.assertFalse(first["has_previous"])
+
+        second = self.get_history(direction="next", cursor=first["last_cursor"])
+        self.assertEqual(
+            [c["snippet"] for c in second["command_list"]], ["command 2", "command 1"]
+        )
+        self.assertTrue(second["has_next"])
+        self.assertTrue(second["has_previous"])
+
+        third = self.get_history(direction="next", cursor=second["last_cursor"])
+        self.assertEqual([c["snippet"] for c in third["command_list"]], ["command 0"])
+        self.assertFalse(third["has_next"])
+
+        previous = self.get_history(direction="previous", cursor=third["first_cursor"])
+        self.assertEqual(previous["command_list"], second["command_list"])
+        self.assertTrue(previous["has_previous"])
+
+        back = self.get_history(direction="previous", cursor=second["first_cursor"])
+        self.assertEqual(back["command_list"], first["command_list"])
+        self.assertFalse(back["has_previous"])
+
+        last = self.get_history(direction="last")
+        self.assertEqual(
+            [c["snippet"] for c in last["command_list"]], ["command 1", "command 0"]
+        )
+        self.assertFalse(last["has_next"])
+        self.assertTrue(last["has_previous"])
+
+    def test_get_commands_history_uses_search_index(self):
+        self.login()
+        self.assertTrue(has_search_index(ConsoleHistory))
+        self.create_console_history(
+            ["SELECT * FROM Orders", 'select "orders" from x', "select 1", "ord"]
+        )
+
+        found = self.get_history(command_contains="ORDERS")
+        self.assertEqual(len(found["command_list"]), 2)
+        quoted = self.get_history(command_contains='"orders"')
+        self.assertEqual(
+            [c["snippet"] for c in quoted["command_list"]], ['select "orders" from x']
+        )
+        # shorter than a trigram, searched without the index
+        short = self.get_history(command_contains="rd")
+        self.assertEqual(len(short["command_list"]), 3)
+
+    def test_search_index_follows_updates_and_deletes(self):
+        self.login()
+        self.create_console_history(["vacuum analyze", "vacuum full"])
+        entry = ConsoleHistory.objects.get(snippet="vacuum full")
+        entry.snippet = "reindex table"
+        entry.save()
+
+        self.assertEqual(len(self.get_history(command_contains="vacuum")["command_list"]), 1)
+        self.assertEqual(len(self.get_history(command_contains="reindex")["command_list"]), 1)
+
+        response = self.client.post(
+            self.clear_url,
+            data={
+                "database_index": self.connection.id,
+                "command_type": "Console",
+                "command_contains": "vacuum",
+            },
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            [c["snippet"] for c in self.get_history()["command_list"]], ["reindex table"]
+        )
+
+    @patch.object(settings, "HISTORY_SNIPPET_DEDUP_SIZE", 10)
+    @patch.object(settings, "HISTORY_SNIPPET_COMPRESS_SIZE", 100)
+    def test_get_commands_history_stored_snippets(self):
+        self.login()
+        script = "SELECT * FROM Orders;\n" * 10
+        self.create_console_history(
+            [script, "select * from orders", "select 1"],
+            start_time=make_aware(datetime.now()),
+        )
+        HistoryCompactor().run()
+
+        found = self.get_history(command_contains="from orders")
+        self.assertEqual(
+            [c["snippet"] for c in found["command_list"]],
+            ["select * from orders", script],
+        )
+        self.assertEqual(len(self.get_history()["command_list"]), 3)
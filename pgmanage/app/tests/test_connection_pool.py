@@ -0,0 +1,192 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from app.client_manager.client_manager import Client
+from app.client_manager.connection_pool import ConnectionPool
+from app.include import OmniDatabase
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+def build_database(service="postgres", password="secret"):
+    database = MagicMock()
+    database.conn_id = 1
+    database.db_type = "postgresql"
+    database.active_service = service
+    database.active_user = "postgres"
+    database.lock = None
+    database.connection.host = "localhost"
+    database.connection.port = 5432
+    database.connection.password = password
+    database.connection.GetConStatus.return_value = 1
+    del database.pool_created_at
+    return database
+
+
+@patch.object(settings, "CONNECTION_POOL_MAX_IDLE", 2)
+@patch.object(settings, "CONNECTION_POOL_MAX_IDLE_PER_KEY", 2)
+@patch.object(settings, "CONNECTION_POOL_IDLE_TIMEOUT", 600)
+@patch.object(settings, "CONNECTION_POOL_MAX_AGE", 3600)
+@patch.object(settings, "CONNECTION_POOL_HEALTH_CHECK_INTERVAL", 30)
+class ConnectionPoolTests(TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool()
+        self.main_database = build_database()
+        patcher = patch(
+            "app.client_manager.connection_pool.OmniDatabase.Generic.InstantiateDatabase",
+            side_effect=lambda **kwargs: build_database(kwargs["service"]),
+        )
+        self.instantiate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_released_database_is_reused(self):
+        database = self.pool.acquire(self.main_database, "dellstore")
+        self.assertTrue(self.pool.release(database))
+        self.assertIs(self.pool.acquire(self.main_database, "dellstore"), database)
+        self.assertEqual(self.instantiate.call_count, 1)
+        database.connection.Close.assert_not_called()
+
+    def test_databases_are_not_shared_between_keys(self):
+        database = self.pool.acquire(self.main_database, "dellstore")
+        self.pool.release(database)
+        self.assertIsNot(self.pool.acquire(self.main_database, "postgres"), database)
+
+    def test_database_in_transaction_is_closed(self):
+        database = self.pool.acquire(self.main_database, "dellstore")
+        database.connection.GetConStatus.return_value = 3
+        self.assertFalse(self.pool.release(database))
+        database.connection.Close.assert_called_once()
+
+    def test_password_change_discards_idle_database(self):
+        database = self.pool.acquire(self.main_database, "dellstore")
+        self.pool.release(database)
+        self.main_database.connection.password = "changed"
+        self.assertIsNot(self.pool.acquire(self.main_database, "dellstore"), database)
+        database.connection.Close.assert_called_once()
+
+    def test_health_check_after_interval(self):
+        database = self.pool.acquire(self.main_database, "dellstore")
+        self.pool.release(database)
+        database.connection.ExecuteScalar.side_effect = Exception("server closed")
+        with patch.object(settings, "CONNECTION_POOL_HEALTH_CHECK_INTERVAL", 0):
+            self.assertIsNot(
+                self.pool.acquire(self.main_database, "dellstore"), database
+            )
+
+    def test_old_database_is_recycled(self):
+        database = self.pool.acquire(self.main_database, "dellstore")
+        with patch.object(settings, "CONNECTION_POOL_MAX_AGE", 0):
+            self.assertFalse(self.pool.release(database))
+
+    def test_pool_is_bounded(self):
+        databases = [
+            self.pool.acquire(self.main_database, name) for name in ("a", "b", "c")
+        ]
+        for database in databases:
+            self.pool.release(database)
+        databases[0].connection.Close.assert_called_once()
+        self.assertIs(self.pool.acquire(self.main_database, "c"), databases[2])
+
+    def test_prune_closes_idle_databases(self):
+        database = self.pool.acquire(self.main_database, "dellstore")
+        self.pool.release(database)
+        with patch.object(settings, "CONNECTION_POOL_IDLE_TIMEOUT", 0):
+            self.pool.prune()
+        database.connection.Close.assert_called_once()
+
+    def test_main_database_fallback_is_not_closed(self):
+        self.instantiate.side_effect = None
+        self.instantiate.return_value.connection.Open.side_effect = Exception("down")
+        database = self.pool.acquire(self.main_database, "dellstore")
+        self.assertIs(database, self.main_database)
+        self.assertFalse(self.pool.release(database))
+        self.main_database.connection.Close.assert_not_called()
+
+
+class ClientConnectionTabPoolTests(TestCase):
+    def setUp(self):
+        self.client_object = Client(client_id="test_client")
+        self.main_database = build_database()
+
+    @patch("app.client_manager.client_manager.connection_pool")
+    def test_connection_tab_uses_pool(self, connection_pool):
+        pooled = build_database("dellstore")
+        pooled.pool_created_at = 0
+        connection_pool.acquire.return_value = pooled
+        tab = self.client_object.create_main_tab(
+            workspace_id="workspace",
+            tab={"omnidatabase": None, "type": "connection", "tab_list": {}},
+        )
+
+        self.client_object._replace_database(tab, "dellstore", self.main_database, True)
+        self.assertIs(tab["omnidatabase"], pooled)
+        connection_pool.acquire.assert_called_once_with(self.main_database, "dellstore")
+
+        connection_pool.acquire.return_value = build_database("postgres")
+        self.client_object._replace_database(tab, "postgres", self.main_database, True)
+        connection_pool.release.assert_called_once_with(pooled)
+
+
+class ReadLockRequiredTests(TestCase):
+    def build_database(self):
+        database = OmniDatabase.PostgreSQL("localhost", 5432, "dellstore", "postgres", "")
+        database.connection = MagicMock()
+        database.lock = threading.Lock()
+        database.reader_pool = self.pool
+        database.readers = threading.BoundedSemaphore(1)
+        return database
+
+    def setUp(self):
+        self.pool = MagicMock()
+        self.database = self.build_database()
+        self.reader = self.build_database()
+        self.pool.acquire.return_value = self.reader
+
+    def test_idle_database_runs_catalog_reads(self):
+        self.database.QueryRoles()
+        self.database.connection.Query.assert_called_once()
+        self.pool.acquire.assert_not_called()
+        self.assertFalse(self.database.lock.locked())
+
+    def test_busy_database_borrows_a_reader(self):
+        with self.database.lock:
+            self.database.QueryRoles()
+        self.database.connection.Query.assert_not_called()
+        self.reader.connection.Query.assert_called_once()
+        self.pool.acquire.assert_called_once_with(self.database, "dellstore")
+        self.pool.release.assert_called_once_with(self.reader)
+
+    def test_reader_limit_waits_for_the_lock(self):
+        self.database.lock.acquire()
+        self.database.readers.acquire()
+        thread = threading.Thread(target=self.database.QueryRoles)
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+        self.database.lock.release()
+        thread.join(5)
+        self.database.connection.Query.assert_called_once()
+        self.pool.acquire.assert_not_called()
+
+    def test_statements_keep_the_exclusive_lock(self):
+        self.database.lock.acquire()
+        thread = threading.Thread(target=self.database.Execute, args=("vacuum",))
+        thread.start()
+        thread.join(0.1)
+        self.assertTrue(thread.is_alive())
+        self.database.lock.release()
+        thread.join(5)
+        self.database.connection.Execute.assert_called_once_with("vacuum")
+        self.pool.acquire.assert_not_called()
+
+    def test_failed_reader_falls_back_to_the_lock(self):
+        self.pool.acquire.return_value = self.database
+        self.database.lock.acquire()
+        thread = threading.Thread(target=self.database.QueryRoles)
+        thread.start()
+        thread.join(0.1)
+        self.database.lock.release()
+        thread.join(5)
+        self.database.connection.Query.assert_called_once()
+        self.pool.release.assert_not_called()
@@ -0,0 +1,250 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.include.history_retention import (
+    HistoryCompactor,
+    filter_snippet_refs,
+    has_search_index,
+    move_snippet,
+    store_snippet,
+)
+from app.models import ConsoleHistory, HistorySnippet, QueryHistory, Technology
+from app.models.main import Connection
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.utils.timezone import make_aware, now
+
+from pgmanage import settings
+
+
+def search_snippet_index(text):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid FROM app_historysnippet_fts WHERE app_historysnippet_fts MATCH %s",
+            [f'"{text}"'],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+@patch.object(settings, "HISTORY_SNIPPET_DEDUP_SIZE", 10)
+@patch.object(settings, "HISTORY_SNIPPET_COMPRESS_SIZE", 100)
+class SnippetStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.connection = Connection.objects.create(
+            user=self.user,
+            technology=Technology.objects.filter(name="postgresql").first(),
+        )
+
+    def build_entry(self, snippet):
+        return ConsoleHistory(
+            user=self.user,
+            connection=self.connection,
+            snippet=snippet,
+            start_time=now(),
+        )
+
+    def test_identical_snippets_are_stored_once(self):
+        first = store_snippet("select * from orders")
+        second = store_snippet("select * from orders")
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(HistorySnippet.objects.count(), 1)
+        self.assertIsNone(first.compressed)
+
+    def test_large_snippets_are_compressed(self):
+        text = "insert into t values (1);\n" * 100
+        snippet = HistorySnippet.objects.get(id=store_snippet(text).id)
+
+        self.assertEqual(snippet.snippet, "")
+        self.assertLess(len(snippet.compressed), len(text))
+        self.assertEqual(snippet.get_text(), text)
+
+    def test_only_large_snippets_are_moved(self):
+        small = self.build_entry("select 1")
+        large = self.build_entry("select * from orders")
+        move_snippet(small)
+        move_snippet(large)
+        small.save()
+        large.save()
+
+        self.assertIsNone(small.snippet_ref_id)
+        self.assertEqual(large.snippet, "")
+        self.assertEqual(
+            ConsoleHistory.objects.get(id=large.id).get_snippet(), "select * from orders"
+        )
+
+    def test_stored_snippets_are_searched(self):
+        compressed = "SELECT * FROM Orders;\n" * 10
+        for text in ("select * from customers", compressed, "select 1"):
+            entry = self.build_entry(text)
+            move_snippet(entry)
+            entry.save()
+
+        refs = filter_snippet_refs(ConsoleHistory.objects.all(), "orders")
+        self.assertEqual(refs, [HistorySnippet.objects.get(compressed__isnull=False).id])
+        refs = filter_snippet_refs(ConsoleHistory.objects.all(), "CUSTOMERS")
+        self.assertEqual(len(refs), 1)
+
+    def test_stored_snippets_are_indexed_before_compression(self):
+        self.assertTrue(has_search_index(HistorySnippet))
+        compressed = store_snippet("SELECT * FROM Orders;\n" * 10)
+        store_snippet("select * from customers")
+
+        self.assertIsNotNone(compressed.compressed)
+        self.assertEqual(search_snippet_index("from orders"), [compressed.id])
+
+    def test_only_matching_compressed_snippets_are_inflated(self):
+        for text in ("select * from orders;\n" * 10, "select * from customers;\n" * 10):
+            entry = self.build_entry(text)
+            move_snippet(entry)
+            entry.save()
+
+        with patch.object(
+            HistorySnippet, "get_text", autospec=True, side_effect=HistorySnippet.get_text
+        ) as get_text:
+            refs = filter_snippet_refs(ConsoleHistory.objects.all(), "ORDERS")
+
+        self.assertEqual(len(refs), 1)
+        get_text.assert_called_once()
+
+
+class HistoryRetentionDefaultsTests(TestCase):
+    def test_history_is_kept_by_default(self):
+        user = User.objects.create_user(username="testuser", password="testpass")
+        connection = Connection.objects.create(
+            user=user, technology=Technology.objects.filter(name="postgresql").first()
+        )
+        QueryHistory.objects.bulk_create(
+            QueryHistory(
+                user=user,
+                connection=connection,
+                snippet="select 1",
+                start_time=make_aware(datetime(2000, 1, 1)),
+                end_time=make_aware(datetime(2000, 1, 1)),
+            )
+            for _ in range(3)
+        )
+
+        HistoryCompactor().run()
+
+        self.assertEqual(QueryHistory.objects.count(), 3)
+
+
+@patch.object(settings, "HISTORY_MAX_AGE_DAYS", 30)
+@patch.object(settings, "HISTORY_MAX_ROWS_PER_CONNECTION", 0)
+@patch.object(settings, "HISTORY_MAX_ROWS_PER_USER", 0)
+@patch.object(settings, "HISTORY_SNIPPET_DEDUP_SIZE", 10)
+@patch.object(settings, "HISTORY_SNIPPET_COMPRESS_SIZE", 0)
+@patch.object(settings, "HISTORY_COMPACTION_BATCH_SIZE", 2)
+class HistoryCompactorTests(TestCase):
+    def setUp(self):
+        self.compactor = HistoryCompactor()
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.other_user = User.objects.create_user(username="other", password="testpass")
+        technology = Technology.objects.filter(name="postgresql").first()
+        self.connection = Connection.objects.create(user=self.user, technology=technology)
+        self.other_connection = Connection.objects.create(
+            user=self.user, technology=technology
+        )
+        self.start = now() - timedelta(days=1)
+
+    def create_history(self, count, user=None, connection=None, snippet="select 1"):
+        QueryHistory.objects.bulk_create(
+            QueryHistory(
+                user=user or self.user,
+                connection=connection or self.connection,
+                snippet=f"{snippet} -- {index}" if snippet != "select 1" else snippet,
+                start_time=self.start + timedelta(seconds=index // 2),
+                end_time=self.start,
+            )
+            for index in range(count)
+        )
+
+    def test_expired_entries_are_deleted(self):
+        self.create_history(2)
+        ConsoleHistory.objects.create(
+            user=self.user,
+            connection=self.connection,
+            snippet="\\dt",
+            start_time=make_aware(datetime(2000, 1, 1)),
+        )
+        self.compactor.run()
+
+        self.assertEqual(QueryHistory.objects.count(), 2)
+        self.assertEqual(ConsoleHistory.objects.count(), 0)
+
+    def test_newest_entries_of_each_connection_are_kept(self):
+        self.create_history(5)
+        self.create_history(2, connection=self.other_connection)
+        newest = list(
+            QueryHistory.objects.filter(connection=self.connection)
+            .order_by("-start_time", "-id")
+            .values_list("id", flat=True)[:3]
+        )
+        with patch.object(settings, "HISTORY_MAX_ROWS_PER_CONNECTION", 3):
+            self.compactor.run()
+
+        self.assertEqual(
+            sorted(
+                QueryHistory.objects.filter(connection=self.connection).values_list(
+                    "id", flat=True
+                )
+            ),
+            sorted(newest),
+        )
+        self.assertEqual(
+            QueryHistory.objects.filter(connection=self.other_connection).count(), 2
+        )
+
+    def test_newest_entries_of_each_user_are_kept(self):
+        self.create_history(3)
+        self.create_history(3, connection=self.other_connection)
+        self.create_history(2, user=self.other_user)
+        with patch.object(settings, "HISTORY_MAX_ROWS_PER_USER", 4):
+            self.compactor.run()
+
+        self.assertEqual(QueryHistory.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(QueryHistory.objects.filter(user=self.other_user).count(), 2)
+
+    def test_large_snippets_are_moved_and_deduplicated(self):
+        QueryHistory.objects.bulk_create(
+            QueryHistory(
+                user=self.user,
+                connection=self.connection,
+                snippet="select * from orders",
+                start_time=self.start,
+                end_time=self.start,
+            )
+            for _ in range(5)
+        )
+        self.create_history(1)
+        self.compactor.run()
+
+        self.assertEqual(HistorySnippet.objects.count(), 1)
+        self.assertEqual(QueryHistory.objects.filter(snippet_ref__isnull=False).count(), 5)
+        self.assertEqual(QueryHistory.objects.get(snippet="select 1").snippet_ref, None)
+        for entry in QueryHistory.objects.filter(snippet_ref__isnull=False):
+            self.assertEqual(entry.snippet, "")
+            self.assertEqual(entry.get_snippet(), "select * from orders")
+
+    def test_unused_snippets_are_deleted(self):
+        self.create_history(2, snippet="select * from orders")
+        self.compactor.run()
+        self.assertEqual(HistorySnippet.objects.count(), 2)
+
+        QueryHistory.objects.all().delete()
+        self.compactor.run()
+        self.assertEqual(HistorySnippet.objects.count(), 0)
+        self.assertEqual(search_snippet_index("from orders"), [])
+
+    def test_compaction_runs_once_per_interval(self):
+        with patch.object(self.compactor, "run") as run, patch(
+            "app.include.history_retention.time.monotonic", return_value=10000
+        ):
+            self.compactor.run_if_due()
+            self.compactor._last_run = 10000
+            self.compactor.run_if_due()
+
+        run.assert_called_once_with()
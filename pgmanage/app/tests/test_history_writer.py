@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.include.history_writer import HistoryWriter
+from app.models import (
+    Connection,
+    ConsoleHistory,
+    HistorySnippet,
+    QueryHistory,
+    Tab,
+    Technology,
+)
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+@patch.object(settings, "HISTORY_WRITER_ENABLED", True)
+@patch.object(settings, "HISTORY_WRITER_BATCH_SIZE", 2)
+class HistoryWriterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.connection = Connection.objects.create(
+            user=self.user,
+            technology=Technology.objects.filter(name="postgresql").first(),
+        )
+        self.writer = HistoryWriter()
+        # entries are written by the test thread, inside the test transaction
+        patcher = patch.object(self.writer, "_start")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def build_query(self, snippet):
+        now = datetime.now(timezone.utc)
+        return QueryHistory(
+            user_id=self.user.id,
+            connection_id=self.connection.id,
+            start_time=now,
+            end_time=now,
+            snippet=snippet,
+        )
+
+    def test_entries_are_written_on_flush(self):
+        self.writer.add(self.build_query("select 1"))
+        self.writer.add(
+            ConsoleHistory(
+                user_id=self.user.id,
+                connection_id=self.connection.id,
+                start_time=datetime.now(timezone.utc),
+                snippet="\\dt",
+            )
+        )
+        self.assertEqual(QueryHistory.objects.count(), 0)
+        self.assertTrue(self.writer._wakeup.is_set())
+
+        with self.assertNumQueries(4):
+            self.writer.flush()
+
+        self.assertEqual(QueryHistory.objects.get().snippet, "select 1")
+        self.assertEqual(ConsoleHistory.objects.get().snippet, "\\dt")
+
+    def test_large_snippets_are_stored_once(self):
+        script = "insert into t values (1);\n" * 100
+        self.writer.add(self.build_query(script))
+        self.writer.add(self.build_query(script))
+        with patch.object(settings, "HISTORY_SNIPPET_DEDUP_SIZE", 1024):
+            self.writer.flush()
+
+        self.assertEqual(HistorySnippet.objects.count(), 1)
+        for entry in QueryHistory.objects.all():
+            self.assertEqual(entry.snippet, "")
+            self.assertEqual(entry.get_snippet(), script)
+
+    def test_tab_updates_are_coalesced(self):
+        tab = Tab.objects.create(user=self.user, connection=self.connection)
+        self.writer.update_tab(tab.id, snippet="select 1", title="Query")
+        self.writer.update_tab(tab.id, snippet="select 2")
+        self.writer.flush()
+
+        tab.refresh_from_db()
+        self.assertEqual((tab.snippet, tab.title), ("select 2", "Query"))
+
+    def test_failed_batch_is_written_one_by_one(self):
+        self.writer.add(self.build_query("select 1"))
+        self.writer.add(self.build_query("select 2"))
+        with patch.object(
+            QueryHistory.objects, "bulk_create", side_effect=Exception("locked")
+        ):
+            self.writer.flush()
+
+        self.assertEqual(QueryHistory.objects.count(), 2)
+
+    def test_full_queue_writes_synchronously(self):
+        self.writer._queue.maxsize = 1
+        self.writer.add(self.build_query("select 1"))
+        self.writer.add(self.build_query("select 2"))
+
+        self.assertEqual(list(QueryHistory.objects.values_list("snippet", flat=True)), ["select 2"])
+
+    def test_disabled_writer_writes_synchronously(self):
+        with patch.object(settings, "HISTORY_WRITER_ENABLED", False):
+            self.writer.add(self.build_query("select 1"))
+
+        self.assertEqual(QueryHistory.objects.count(), 1)
+        self.assertTrue(self.writer._queue.empty())
@@ -0,0 +1,175 @@
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+from app.bgjob.log_tailer import JobWatcher, LogTail, parse_log_lines
+from app.client_manager import client_manager
+from app.models.main import Job
+from app.views.polling import ResponseType
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+class ParseLogLinesTests(TestCase):
+    def test_lines_are_parsed(self):
+        data = (
+            b"20250101120000000001,pg_dump: dumping contents\n"
+            b"no timestamp here\n"
+            b"123,short timestamp\r\n"
+            b"20250101120000000002,caf\xc3\xa9\n"
+        )
+
+        self.assertEqual(
+            parse_log_lines(data, "utf-8"),
+            [
+                ["20250101120000000001", "pg_dump: dumping contents"],
+                ["123", "short timestamp\r"],
+                ["20250101120000000002", "café"],
+            ],
+        )
+
+
+@patch.object(settings, "JOB_LOG_READ_SIZE", 64)
+class LogTailTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "out")
+
+    def append(self, data):
+        with open(self.path, "ab") as log:
+            log.write(data)
+
+    def test_missing_log(self):
+        tail = LogTail(self.path)
+
+        self.assertEqual(tail.read(10), ([], True))
+        self.assertFalse(tail.has_data())
+
+    def test_lines_being_written_wait_for_their_newline(self):
+        tail = LogTail(self.path)
+        self.addCleanup(tail.close)
+        self.append(b"20250101120000000001,first\n20250101120000000002,sec")
+
+        lines, at_end = tail.read(10)
+        self.assertEqual(lines, [["20250101120000000001", "first"]])
+        self.assertTrue(at_end)
+        self.assertEqual(tail.pos, 27)
+
+        self.append(b"ond\n20250101120000000003,last")
+        self.assertTrue(tail.has_data())
+        lines, _ = tail.read(10)
+        self.assertEqual(lines, [["20250101120000000002", "second"]])
+
+        lines, _ = tail.read(10, finished=True)
+        self.assertEqual(lines, [["20250101120000000003", "last"]])
+        self.assertEqual(tail.pos, os.path.getsize(self.path))
+
+    def test_lines_are_read_in_batches(self):
+        self.append(
+            b"".join(b"2025010112000000%04d,line %d\n" % (i, i) for i in range(100))
+        )
+        tail = LogTail(self.path)
+        self.addCleanup(tail.close)
+
+        first, at_end = tail.read(10)
+        self.assertFalse(at_end)
+        self.assertGreaterEqual(len(first), 10)
+
+        resumed = LogTail(self.path, tail.pos)
+        self.addCleanup(resumed.close)
+        rest, at_end = resumed.read(1000)
+        self.assertTrue(at_end)
+        self.assertEqual(
+            [line[1] for line in first + rest], [f"line {i}" for i in range(100)]
+        )
+
+
+class JobWatcherTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.user = User.objects.create_user(username="testuser", password="testpass")
+        self.job = Job.objects.create(
+            id="1", user=self.user, description="", logdir=self.temp_dir.name
+        )
+        self.client_object = client_manager.get_or_create_client("job-watcher-test")
+        self.addCleanup(client_manager.remove_client, "job-watcher-test")
+        self.client_object.queue_response = MagicMock()
+        self.watcher = JobWatcher()
+        patcher = patch.object(self.watcher, "_start")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write(self, name, data, mode="ab"):
+        with open(os.path.join(self.temp_dir.name, name), mode) as log:
+            log.write(data)
+
+    def write_status(self, **status):
+        self.write("status", json.dumps(status).encode(), "wb")
+
+    def tail(self):
+        (key, watch), = self.watcher._watches.items()
+        return self.watcher._tail(key, watch)
+
+    def reports(self):
+        return [call.args[0] for call in self.client_object.queue_response.call_args_list]
+
+    def test_progress_is_pushed_until_the_job_ends(self):
+        self.write_status(start_time="20250101120000000000", pid=42)
+        self.write("out", b"20250101120000000001,started\n")
+        self.watcher.watch(self.client_object, "ctx", self.job)
+
+        self.tail()
+        report = self.reports()[-1]
+        self.assertEqual(report["response_type"], ResponseType.JOB_PROGRESS)
+        self.assertEqual(report["context_code"], "ctx")
+        self.assertEqual(report["data"]["out"]["lines"], [["20250101120000000001", "started"]])
+        self.assertFalse(report["data"]["out"]["done"])
+        self.assertEqual(Job.objects.get(id="1").utility_pid, 42)
+
+        # nothing new within the progress interval
+        self.tail()
+        self.assertEqual(len(self.reports()), 1)
+
+        self.write("err", b"20250101120000000002,warning\n")
+        self.write_status(
+            start_time="20250101120000000000",
+            end_time="20250101120000000003",
+            exit_code=0,
+            pid=42,
+        )
+        os.utime(os.path.join(self.temp_dir.name, "status"), (1, 1))
+        self.tail()
+        report = self.reports()[-1]
+        self.assertEqual(report["data"]["err"]["lines"], [["20250101120000000002", "warning"]])
+        self.assertTrue(report["data"]["out"]["done"])
+        self.assertTrue(report["data"]["err"]["done"])
+        self.assertEqual(report["data"]["exit_code"], 0)
+        self.assertEqual(self.watcher._watches, {})
+
+    def test_status_file_is_read_when_it_changes(self):
+        self.write_status(start_time="20250101120000000000", pid=42)
+        self.watcher.watch(self.client_object, "ctx", self.job)
+        with patch("app.bgjob.jobs.BatchJob.update_job_info", return_value=(True, False)) as update:
+            self.tail()
+            self.tail()
+
+        update.assert_called_once()
+
+    def test_watch_of_a_removed_client_is_dropped(self):
+        self.watcher.watch(self.client_object, "ctx", self.job)
+        client_manager.remove_client("job-watcher-test")
+        self.tail()
+
+        self.assertEqual(self.watcher._watches, {})
+        self.client_object.queue_response.assert_not_called()
+
+    def test_unwatch(self):
+        self.watcher.watch(self.client_object, "ctx", self.job)
+        self.watcher.unwatch(self.client_object, 1)
+
+        self.assertEqual(self.watcher._watches, {})
@@ -1,19 +1,25 @@
 from datetime import datetime, timedelta
 from functools import partial
+from unittest.mock import patch
 
 from app.include import OmniDatabase
+from app.include.monitoring_sampler import monitoring_sampler
 from app.models.main import Connection, MonWidgets, MonWidgetsConnections, Technology
 from app.tests.utils_testing import USERS, execute_client_login
 from app.utils.crypto import encrypt
 from app.views.monitoring_dashboard import (
+    WidgetScriptCache,
     create_dashboard_monitoring_widget,
     create_widget,
+    monitoring_widget_history,
     monitoring_widgets,
     monitoring_widgets_list,
     refresh_monitoring_widget,
+    refresh_monitoring_widgets,
     test_monitoring_widget,
     user_created_widget_detail,
     widget_detail,
+    widget_script_cache,
     widget_template,
 )
 from app.views.monitoring_widgets.postgresql import (
@@ -23,9 +29,12 @@ from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import resolve, reverse
 
+from pgmanage import settings
+
 User = get_user_model()
 
 
+@patch.object(settings, "MONITORING_STORE_PATH", ":memory:")
 class MonitoringDashboardTests(TestCase):
 
     @classmethod
@@ -122,6 +131,8 @@ class MonitoringDashboardTests(TestCase):
         self.client.post = partial(self.client.post, content_type="application/json")
         self.client.put = partial(self.client.put, content_type="application/json")
         self.client.patch = partial(self.client.patch, content_type="application/json")
+        # stop sampling widgets of this test once the store path is restored
+        self.addCleanup(monitoring_sampler.clear)
 
     def test_get_monitoring_widgets_list(self):
         response = self.client.post(
@@ -416,11 +427,136 @@ class MonitoringDashboardTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "object")
 
+    def test_update_widget_drops_compiled_scripts(self):
+        widget_key = ("", self.widget_mock.id)
+        self.client.post(
+            reverse("refresh-monitoring-widget", args=[self.dashboard_widget_mock.id]),
+            {**self.tab_data, "widget": {"id": self.widget_mock.id, "plugin_name": ""}},
+        )
+        self.assertIn(widget_key, [k[0] for k in widget_script_cache._entries])
+
+        self.client.put(
+            reverse("widget-detail", args=[self.widget_mock.id]),
+            data=self.valid_widget_data,
+        )
+        self.assertNotIn(widget_key, [k[0] for k in widget_script_cache._entries])
+
     def test_refresh_monitoring_widget_resolves_refresh_monitoring_widget_view(self):
         view = resolve(f"/monitoring-widgets/{self.dashboard_widget_mock.id}/refresh")
 
         self.assertEqual(view.func.__name__, refresh_monitoring_widget.__name__)
 
+    def test_refresh_monitoring_widgets_isolates_errors(self):
+        response = self.client.post(
+            reverse("refresh-monitoring-widgets"),
+            {
+                **self.tab_data,
+                "widgets": [
+                    {
+                        "id": self.widget_mock.id,
+                        "plugin_name": "",
+                        "saved_id": self.dashboard_widget_mock.id,
+                    },
+                    {"id": 999, "plugin_name": "", "saved_id": 999},
+                ],
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        widgets = response.json()["widgets"]
+        self.assertEqual(len(widgets), 2)
+        self.assertIn("object", widgets[0])
+        self.assertNotIn("error", widgets[0])
+        self.assertTrue(widgets[1]["error"])
+        self.assertEqual(widgets[1]["saved_id"], 999)
+        self.assertTrue(all("duration" in widget for widget in widgets))
+
+    def test_refresh_monitoring_widgets_without_sampler(self):
+        with patch.object(settings, "MONITORING_SAMPLER_ENABLED", False):
+            response = self.client.post(
+                reverse("refresh-monitoring-widgets"),
+                {
+                    **self.tab_data,
+                    "widgets": [
+                        {
+                            "id": widget["id"],
+                            "plugin_name": "postgresql",
+                            "saved_id": index,
+                            "initial": True,
+                        }
+                        for index, widget in enumerate(postgresql_widgets[:4])
+                    ],
+                },
+            )
+
+        self.assertEqual(response.status_code, 200)
+        widgets = response.json()["widgets"]
+        self.assertEqual([w["saved_id"] for w in widgets], [0, 1, 2, 3])
+        self.assertTrue(all("error" not in widget for widget in widgets))
+
+    def test_refresh_monitoring_widgets_reading_snapshot(self):
+        widgets = [w for w in postgresql_widgets if w.get("snapshot_fields")]
+        previous = {}
+        with patch.object(settings, "MONITORING_SAMPLER_ENABLED", False):
+            for _ in range(2):
+                response = self.client.post(
+                    reverse("refresh-monitoring-widgets"),
+                    {
+                        **self.tab_data,
+                        "widgets": [
+                            {
+                                "id": widget["id"],
+                                "plugin_name": "postgresql",
+                                "saved_id": index,
+                                "widget_data": previous.get(index),
+                            }
+                            for index, widget in enumerate(widgets)
+                        ],
+                    },
+                )
+                results = response.json()["widgets"]
+                self.assertTrue(all("error" not in result for result in results), results)
+                previous = {result["saved_id"]: result["object"] for result in results}
+
+        self.assertTrue(previous[0]["collected_at"])
+        self.assertIn("xact_total", previous[0])
+
+    def test_refresh_monitoring_widgets_resolves_refresh_monitoring_widgets_view(self):
+        view = resolve("/monitoring-widgets/refresh")
+
+        self.assertEqual(view.func.__name__, refresh_monitoring_widgets.__name__)
+
+    def test_monitoring_widget_history_returns_stored_samples(self):
+        widget = {"id": postgresql_widgets[0]["id"], "plugin_name": "postgresql"}
+        for _ in range(2):
+            self.client.post(
+                reverse("refresh-monitoring-widget", args=[0]),
+                {**self.tab_data, "widget": widget},
+            )
+
+        response = self.client.post(
+            reverse("monitoring-widget-history", args=[0]),
+            {**self.tab_data, "widget": widget, "range": 3600},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["type"], "timeseries")
+        self.assertTrue(response.json()["object"]["datasets"])
+
+    def test_monitoring_widget_history_rejects_other_widgets(self):
+        widget = next(w for w in postgresql_widgets if w["type"] != "timeseries")
+        response = self.client.post(
+            reverse("monitoring-widget-history", args=[0]),
+            {**self.tab_data, "widget": {"id": widget["id"], "plugin_name": "postgresql"}},
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_monitoring_widget_history_resolves_monitoring_widget_history_view(self):
+        view = resolve("/monitoring-widgets/1/history")
+
+        self.assertEqual(view.func.__name__, monitoring_widget_history.__name__)
+
     def test_test_monitoring_widget_with_invalid_data(self):
         response = self.client.post(
             reverse("test-monitoring-widget"),
@@ -451,3 +587,33 @@ class MonitoringDashboardTests(TestCase):
         view = resolve("/monitoring-widgets/test")
 
         self.assertEqual(view.func.__name__, test_monitoring_widget.__name__)
+
+
+class WidgetScriptCacheTests(TestCase):
+    def setUp(self):
+        self.cache = WidgetScriptCache()
+
+    def test_script_is_compiled_once(self):
+        byte_code = self.cache.get(("", 1), "result = 1")
+        self.assertIs(self.cache.get(("", 1), "result = 1"), byte_code)
+        self.assertIsNot(self.cache.get(("", 1), "result = 2"), byte_code)
+
+    def test_builtin_scripts_are_precompiled(self):
+        script = postgresql_widgets[0].get("script_data")
+        self.assertIsNotNone(
+            widget_script_cache._builtin.get(
+                widget_script_cache._get_key(("postgresql", -1), script)
+            )
+        )
+
+    def test_invalidate(self):
+        byte_code = self.cache.get(("", 1), "result = 1")
+        self.cache.get(("", 2), "result = 1")
+        self.cache.invalidate(("", 1))
+        self.assertIsNot(self.cache.get(("", 1), "result = 1"), byte_code)
+        self.assertEqual(len(self.cache._entries), 2)
+
+    def test_syntax_error_is_not_cached(self):
+        with self.assertRaises(SyntaxError):
+            self.cache.get(("", 1), "result = (")
+        self.assertEqual(len(self.cache._entries), 0)
@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock, patch
+
+from app.include.monitoring_sampler import MonitoringSampler, merge_timeseries_samples
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+def build_database(service="postgres"):
+    database = MagicMock()
+    database.conn_id = 1
+    database.db_type = "postgresql"
+    database.active_service = service
+    database.active_user = "postgres"
+    database.connection.host = "localhost"
+    database.connection.port = 5432
+    return database
+
+
+@patch.object(settings, "MONITORING_SAMPLER_IDLE_TIMEOUT", 60)
+@patch.object(settings, "MONITORING_SAMPLER_BUFFER_SIZE", 3)
+@patch.object(settings, "MONITORING_SAMPLER_FIRST_SAMPLE_TIMEOUT", 5)
+class MonitoringSamplerTests(TestCase):
+    def setUp(self):
+        self.sampler = MonitoringSampler()
+        self.sampler._start = MagicMock()
+        self.database = build_database()
+        self.pooled_database = build_database()
+        patcher = patch("app.include.monitoring_sampler.connection_pool")
+        self.connection_pool = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connection_pool.get_key.side_effect = lambda database, name: (
+            database.conn_id,
+            name,
+        )
+        self.connection_pool.acquire.return_value = self.pooled_database
+        self.run = MagicMock(side_effect=lambda connection, previous: {
+            "count": (previous or {"count": 0})["count"] + 1
+        })
+
+    def read(self, database=None, widget_key=("postgresql", -1), script="s", **kwargs):
+        return self.sampler.read(
+            database or self.database, widget_key, script, 10, self.run, **kwargs
+        )
+
+    def test_readers_share_samples(self):
+        self.assertEqual(self.read(), {"count": 1})
+        self.assertEqual(self.read(build_database()), {"count": 1})
+        self.assertEqual(self.run.call_count, 1)
+        self.run.assert_called_once_with(self.pooled_database, None)
+        self.connection_pool.release.assert_called_once_with(self.pooled_database)
+
+    def test_series_are_separated_by_database_and_widget(self):
+        self.read()
+        self.read(build_database("dellstore"))
+        self.read(widget_key=("postgresql", -2))
+        self.assertEqual(self.run.call_count, 3)
+
+    def test_scheduled_samples_chain_previous_data(self):
+        self.read()
+        series = next(iter(self.sampler._series.values()))
+        self.sampler._sample(series)
+        self.sampler._sample(series)
+        self.assertEqual(self.read(), {"count": 3})
+        self.assertEqual(self.read(history=True), [{"count": 1}, {"count": 2}, {"count": 3}])
+        self.sampler._sample(series)
+        self.assertEqual(len(self.read(history=True)), 3)
+
+    def test_new_script_starts_new_series(self):
+        self.read()
+        self.read(script="changed")
+        self.assertEqual(self.run.call_count, 2)
+
+    def test_error_is_reported_to_readers(self):
+        self.run.side_effect = Exception("relation does not exist")
+        with self.assertRaisesMessage(Exception, "relation does not exist"):
+            self.read()
+
+    def test_session_database_is_never_used(self):
+        self.connection_pool.acquire.return_value = self.database
+        with self.assertRaisesMessage(Exception, "Could not open a connection"):
+            self.read()
+        self.run.assert_not_called()
+
+    def test_idle_series_is_dropped(self):
+        self.read()
+        series = next(iter(self.sampler._series.values()))
+        self.assertFalse(series.is_idle(series.last_read + 20))
+        self.assertTrue(series.is_idle(series.last_read + 61))
+
+
+class MergeTimeseriesSamplesTests(TestCase):
+    def test_points_are_merged(self):
+        samples = [
+            {"datasets": [{"label": "tps", "data": [{"x": 1, "y": 1}]}], "current": 1},
+            {"datasets": [{"label": "tps", "data": [{"x": 2, "y": 2}]}], "current": 2},
+        ]
+        merged = merge_timeseries_samples(samples)
+        self.assertEqual(merged["datasets"][0]["data"], [{"x": 1, "y": 1}, {"x": 2, "y": 2}])
+        self.assertEqual(merged["current"], 2)
+        self.assertEqual(samples[1]["datasets"][0]["data"], [{"x": 2, "y": 2}])
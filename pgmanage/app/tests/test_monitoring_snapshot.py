@@ -0,0 +1,106 @@
+import re
+from unittest.mock import MagicMock, patch
+
+from app.include.monitoring_snapshot import SnapshotCollector, get_script_fields
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+def build_connection(version_num=160000):
+    connection = MagicMock()
+    connection.conn_id = 1
+    connection.active_service = "postgres"
+    connection.version_num = version_num
+
+    def query(sql):
+        columns = re.findall(r" AS (\w+)", sql)
+        table = MagicMock()
+        table.Columns = columns
+        table.Rows = [{column: index for index, column in enumerate(columns)}]
+        return table
+
+    connection.Query.side_effect = query
+    return connection
+
+
+@patch.object(settings, "MONITORING_SNAPSHOT_MAX_AGE", 2)
+@patch.object(settings, "MONITORING_SAMPLER_IDLE_TIMEOUT", 60)
+class SnapshotCollectorTests(TestCase):
+    def setUp(self):
+        self.collector = SnapshotCollector()
+        self.connection = build_connection()
+        patcher = patch("app.include.monitoring_snapshot.connection_pool")
+        self.connection_pool = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connection_pool.get_key.side_effect = lambda database, name: (
+            database.conn_id,
+            name,
+        )
+
+    def test_widgets_share_one_query(self):
+        with patch("app.include.monitoring_snapshot.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            self.collector.get(self.connection, ["backends"])
+            self.collector.get(self.connection, ["xact_total", "blocked_locks"])
+            self.connection.Query.reset_mock()
+
+            monotonic.return_value = 110
+            first = self.collector.get(self.connection, ["backends"])
+            second = self.collector.get(build_connection(), ["xact_total"])
+
+        self.assertEqual(self.connection.Query.call_count, 1)
+        sql = self.connection.Query.call_args[0][0]
+        for field in ("backends", "xact_total", "blocked_locks"):
+            self.assertIn(f"AS {field}", sql)
+        self.assertEqual(set(first), {"collected_at", "backends"})
+        self.assertEqual(second["collected_at"], first["collected_at"])
+
+    def test_snapshot_is_collected_again_when_expired(self):
+        with patch("app.include.monitoring_snapshot.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            self.collector.get(self.connection, ["backends"])
+            monotonic.return_value = 101
+            self.collector.get(self.connection, ["backends"])
+            self.assertEqual(self.connection.Query.call_count, 1)
+            monotonic.return_value = 103
+            self.collector.get(self.connection, ["backends"])
+            self.assertEqual(self.connection.Query.call_count, 2)
+
+    def test_fields_not_requested_lately_are_dropped(self):
+        with patch("app.include.monitoring_snapshot.time.monotonic") as monotonic:
+            monotonic.return_value = 100
+            self.collector.get(self.connection, ["database_size"])
+            monotonic.return_value = 200
+            self.collector.get(self.connection, ["backends"])
+
+        self.assertNotIn("database_size", self.connection.Query.call_args[0][0])
+
+    def test_databases_have_separate_snapshots(self):
+        self.collector.get(self.connection, ["backends"])
+        other = build_connection()
+        other.active_service = "dellstore"
+        self.collector.get(other, ["backends"])
+
+        self.assertEqual(other.Query.call_count, 1)
+
+    def test_older_servers_use_query_column(self):
+        connection = build_connection(version_num=90600)
+        self.collector.get(connection, ["long_query"])
+
+        sql = connection.Query.call_args[0][0]
+        self.assertNotIn("backend_type", sql)
+        self.assertIn("query NOT LIKE 'autovacuum: %'", sql)
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Unknown snapshot fields: nope."):
+            self.collector.get(self.connection, ["nope"])
+        self.connection.Query.assert_not_called()
+
+
+class GetScriptFieldsTests(TestCase):
+    def test_known_fields_are_found(self):
+        script = """y = snapshot["backends"] + snapshot['xact_total'] + snapshot["nope"]"""
+
+        self.assertEqual(get_script_fields(script), ["backends", "xact_total"])
+        self.assertEqual(get_script_fields(None), [])
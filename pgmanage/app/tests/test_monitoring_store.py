@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock, patch
+
+from app.include.monitoring_store import MonitoringStore, consolidate, get_series_name
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+def build_sample(value, x="12:00:00"):
+    return {
+        "datasets": [{"label": "tps", "data": [{"x": x, "y": value}]}],
+        "current": value,
+    }
+
+
+@patch.object(settings, "MONITORING_STORE_PATH", ":memory:")
+@patch.object(settings, "MONITORING_STORE_TIERS", ((10, 600), (60, 3600)))
+@patch.object(settings, "MONITORING_STORE_PRUNE_INTERVAL", 300)
+class MonitoringStoreTests(TestCase):
+    def setUp(self):
+        self.store = MonitoringStore()
+        self.start = 1_000_000_020
+
+    def values(self, samples):
+        return [sample["datasets"][0]["data"][0]["y"] for sample in samples]
+
+    def test_samples_are_consolidated_per_bucket(self):
+        for offset, value in ((0, 1), (5, 3), (10, 5)):
+            self.store.add("s", build_sample(value), self.start + offset)
+
+        fine = self.store.query("s", self.start, self.start + 60)
+        self.assertEqual(self.values(fine), [2, 5])
+        coarse = self.store.query("s", self.start, self.start + 60, max_points=1)
+        self.assertEqual(self.values(coarse), [3])
+        self.assertEqual(coarse[0]["current"], 5)
+
+    def test_query_uses_tier_covering_the_range(self):
+        for offset in range(0, 1800, 10):
+            self.store.add("s", build_sample(1), self.start + offset)
+
+        end = self.start + 1800
+        self.assertEqual(len(self.store.query("s", end - 300, end)), 30)
+        self.assertEqual(len(self.store.query("s", end - 1800, end)), 30)
+
+    def test_series_are_separated(self):
+        self.store.add("a", build_sample(1), self.start)
+        self.store.add("b", build_sample(2), self.start)
+
+        self.assertEqual(self.values(self.store.query("a", self.start, self.start)), [1])
+
+    def test_expired_rows_are_pruned(self):
+        self.store.add("s", build_sample(1), self.start)
+        self.store.add("s", build_sample(2), self.start + 1200)
+
+        rows = self.store._connect().execute(
+            "select resolution, count(*) from monitoring_samples group by resolution"
+        ).fetchall()
+        self.assertEqual(dict(rows), {10: 1, 60: 2})
+
+    def test_non_numeric_samples_keep_latest_value(self):
+        self.store.add("s", {"rows": [1]}, self.start)
+        self.store.add("s", {"rows": [2]}, self.start + 1)
+
+        self.assertEqual(self.store.query("s", self.start, self.start + 1), [{"rows": [2]}])
+
+
+class ConsolidateTests(TestCase):
+    def test_average_is_weighted_by_count(self):
+        sample = consolidate(build_sample(2), 3, build_sample(6, "12:00:05"))
+
+        self.assertEqual(sample["datasets"][0]["data"], [{"x": "12:00:05", "y": 3}])
+
+    def test_multi_point_datasets_are_replaced(self):
+        current = {"datasets": [{"data": [{"y": 1}, {"y": 2}]}]}
+        sample = {"datasets": [{"data": [{"y": 3}, {"y": 4}]}]}
+
+        self.assertEqual(consolidate(current, 1, sample), sample)
+
+    def test_series_name_includes_database_and_widget(self):
+        database = MagicMock(conn_id=1, active_service="postgres")
+
+        self.assertEqual(
+            get_series_name(database, ("postgresql", -1)), '[1, "postgres", "postgresql", -1]'
+        )
@@ -0,0 +1,361 @@
+import json
+import os
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import app.include.Spartacus.Database as Database
+from app.views import polling
+from app.views.polling import (
+    ConsoleModes,
+    ConsoleOutput,
+    export_data,
+    get_copy_statement,
+    is_copy_supported,
+)
+from django.test import TestCase
+
+from pgmanage import settings
+
+
+class ConsoleOutputTests(TestCase):
+    def setUp(self):
+        self.chunks = []
+        self.output = ConsoleOutput(self.chunks.append)
+
+    def test_line_endings_are_converted(self):
+        self.output.write("a\nb")
+        self.output.write_lines(["c\r\n", "d"])
+
+        self.assertEqual(self.output.finish(), "a\r\nbc\r\nd")
+        self.assertEqual(self.chunks, [])
+
+    @patch.object(polling, "CONSOLE_CHUNK_SIZE", 10)
+    def test_chunks_end_at_line_breaks(self):
+        self.output.write("1234\n5678\nabcdefghijklmn\nxy")
+
+        # only the line longer than a chunk is split
+        self.assertEqual(self.chunks, ["1234\r\n5678", "abcdefghij"])
+        self.assertEqual(self.output.finish(), "klmn\r\nxy")
+
+
+class ThreadConsoleTests(TestCase):
+    def build_table(self, first, count):
+        table = Database.DataTable(alltypesstr=True, simple=True)
+        table.AddColumn("id")
+        for value in range(first, first + count):
+            table.AddRow([value])
+        return table
+
+    @patch.object(polling, "CONSOLE_CHUNK_SIZE", 100)
+    def test_fetch_all_streams_chunks(self):
+        database = MagicMock()
+        database.connection.expanded = False
+        tables = [self.build_table(0, 50), self.build_table(50, 10)]
+
+        def query_block(sql, block_size, alltypesstr, simple):
+            database.connection.start = len(tables) == 1
+            return tables.pop(0)
+
+        database.connection.QueryBlock.side_effect = query_block
+        database.connection.GetStatus.return_value = "SELECT 60"
+        client = MagicMock()
+
+        polling.thread_console(
+            MagicMock(cancel=False),
+            {
+                "sql_cmd": "",
+                "mode": ConsoleModes.FETCH_ALL,
+                "client_object": client,
+                "context_code": 1,
+                "database": database,
+                "workspace_context": {},
+            },
+        )
+
+        responses = [call.args[0] for call in client.queue_response.call_args_list]
+        self.assertGreater(len(responses), 2)
+        for response in responses[:-1]:
+            json.dumps(response)
+            self.assertFalse(response["data"]["last_block"])
+            self.assertLessEqual(len(response["data"]["data"]), 100)
+        self.assertTrue(responses[-1]["data"]["last_block"])
+        self.assertEqual(responses[-1]["data"]["status"], "SELECT 60")
+        text = "\r\n".join(response["data"]["data"] for response in responses)
+        self.assertNotIn("\r\r", text)
+        for value in (0, 49, 50, 59):
+            self.assertIn(f"| {value:<2} |", text)
+
+
+class IsCopySupportedTests(TestCase):
+    def setUp(self):
+        self.database = MagicMock(db_type="postgresql")
+
+    def test_single_select(self):
+        self.assertTrue(is_copy_supported("select * from t", self.database, ","))
+        self.assertTrue(is_copy_supported("select * from t;", self.database, ";"))
+        self.assertTrue(
+            is_copy_supported(
+                "with d as (select 1 as id) select * from d", self.database, ","
+            )
+        )
+
+    def test_comments_are_not_statements(self):
+        for sql in (
+            "select 1 -- note",
+            "select 1; -- note",
+            "select 1\n-- note\n",
+            "-- note\nselect /* ; */ 1;",
+            "select 1; /* note */",
+        ):
+            self.assertTrue(is_copy_supported(sql, self.database, ","), sql)
+
+        self.assertFalse(
+            is_copy_supported("select 1; -- note\nselect 2", self.database, ",")
+        )
+
+    def test_copy_statement_has_no_comments_or_semicolons(self):
+        for sql in (
+            "select 1 -- note",
+            "select 1; -- note",
+            "select 1;\n-- note\n",
+            "/* note */ select 1;;",
+        ):
+            self.assertEqual(get_copy_statement(sql), "select 1", sql)
+
+        self.assertEqual(
+            get_copy_statement("select '--a;' as \"b--\" -- c"),
+            "select '--a;' as \"b--\"",
+        )
+
+    def test_delimiter_must_be_one_character(self):
+        self.assertFalse(is_copy_supported("select 1", self.database, ";;"))
+        self.assertFalse(is_copy_supported("select 1", self.database, ""))
+
+    def test_only_postgresql(self):
+        for db_type in ("mysql", "mariadb", "oracle", "sqlite", "mssql"):
+            self.database.db_type = db_type
+            self.assertFalse(is_copy_supported("select 1", self.database, ","))
+
+    def test_multiple_statements(self):
+        self.assertFalse(is_copy_supported("select 1; select 2", self.database, ","))
+
+    def test_statements_copy_does_not_accept(self):
+        for sql in (
+            "insert into t values (1)",
+            "select * into t2 from t",
+            "with d as (delete from t returning *) select * from d",
+            "explain select 1",
+        ):
+            self.assertFalse(is_copy_supported(sql, self.database, ","), sql)
+
+
+@patch.object(polling, "clean_temp_folder")
+class ExportDataTests(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch.object(settings, "TEMP_DIR", self.temp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.database = MagicMock(db_type="postgresql")
+        self.database.connection.start = False
+
+    def copy_rows(self, rows):
+        def copy_to(sql, file_handle, delimiter, header):
+            if header:
+                file_handle.write(f"id{delimiter}name\n")
+            for row in rows:
+                file_handle.write(f"{row[0]}{delimiter}{row[1]}\n")
+
+        self.database.connection.CopyTo.side_effect = copy_to
+
+    def query_blocks(self, blocks):
+        def query_block(sql, block_size, alltypesstr, simple):
+            table = Database.DataTable(alltypesstr=True, simple=True)
+            table.AddColumn("id")
+            table.AddColumn("name")
+            for row in blocks.pop(0) if blocks else []:
+                table.AddRow(list(row))
+            return table
+
+        self.database.connection.QueryBlock.side_effect = query_block
+
+    def read(self, file_name, encoding="utf-8"):
+        with open(
+            os.path.join(self.temp_dir.name, file_name), encoding=encoding, newline=""
+        ) as fp:
+            return fp.read()
+
+    @patch.object(polling, "EXPORT_BLOCK_SIZE", 2)
+    def test_csv_is_copied_by_the_server(self, _):
+        self.copy_rows([(1, "a"), (2, "b"), (3, "c"), (4, "d"), (5, "e")])
+        progress = []
+
+        file_name, extension = export_data(
+            "select id, name from t;",
+            self.database,
+            "utf-8",
+            ";",
+            "export_csv",
+            progress_callback=progress.append,
+        )
+
+        self.assertEqual(extension, "csv")
+        self.database.connection.CopyTo.assert_called_once()
+        sql, _, delimiter, header = self.database.connection.CopyTo.call_args.args
+        self.assertEqual((sql, delimiter, header), ("select id, name from t", ";", True))
+        self.database.connection.QueryBlock.assert_not_called()
+        self.database.connection.Close.assert_called_once()
+        self.assertEqual(
+            self.read(file_name), "id;name\n1;a\n2;b\n3;c\n4;d\n5;e\n"
+        )
+        # the header line is not counted
+        self.assertEqual(progress, [2, 4])
+
+    def test_copy_leaves_out_comments(self, _):
+        self.copy_rows([(1, "a")])
+
+        for sql in ("select id, name from t -- note", "select id, name from t; -- note"):
+            export_data(sql, self.database, "utf-8", ",", "export_csv")
+
+            self.assertEqual(
+                self.database.connection.CopyTo.call_args.args[0],
+                "select id, name from t",
+            )
+
+    def test_copy_without_headers(self, _):
+        self.copy_rows([(1, "a")])
+
+        file_name, _ = export_data(
+            "select id, name from t",
+            self.database,
+            "utf-8",
+            ",",
+            "export_csv-no_headers",
+        )
+
+        self.assertFalse(self.database.connection.CopyTo.call_args.args[3])
+        self.assertEqual(self.read(file_name), "1,a\n")
+
+    def test_copy_uses_the_session_encoding(self, _):
+        self.copy_rows([(1, "café")])
+
+        file_name, _ = export_data(
+            "select id, name from t", self.database, "latin-1", ",", "export_csv"
+        )
+
+        self.assertEqual(self.read(file_name, "latin-1"), "id,name\n1,café\n")
+        with self.assertRaises(UnicodeDecodeError):
+            self.read(file_name)
+
+    def test_falls_back_to_fetching_blocks(self, _):
+        for sql, db_type in (
+            ("select id, name from t; select 1", "postgresql"),
+            ("select id, name from t", "mysql"),
+        ):
+            self.database.reset_mock()
+            self.database.db_type = db_type
+            self.query_blocks([[(1, "a"), (2, "b")]])
+
+            file_name, extension = export_data(
+                sql, self.database, "utf-8", ";", "export_csv"
+            )
+
+            self.assertEqual(extension, "csv")
+            self.database.connection.CopyTo.assert_not_called()
+            self.assertTrue(self.database.connection.QueryBlock.called)
+            self.assertIn("1;a", self.read(file_name))
+
+    def test_long_delimiter_is_not_copied(self, _):
+        self.query_blocks([[(1, "a")]])
+
+        # the csv writer rejects it, as it did before COPY
+        with self.assertRaises(TypeError):
+            export_data(
+                "select id, name from t", self.database, "utf-8", ";;", "export_csv"
+            )
+
+        self.database.connection.CopyTo.assert_not_called()
+
+    def test_other_formats_fetch_blocks(self, _):
+        self.query_blocks([[(1, "a")]])
+
+        file_name, extension = export_data(
+            "select id, name from t", self.database, "utf-8", ",", "export_json"
+        )
+
+        self.assertEqual(extension, "json")
+        self.database.connection.CopyTo.assert_not_called()
+        self.assertEqual(json.loads(self.read(file_name)), [{"id": "1", "name": "a"}])
+
+    def test_fallback_uses_the_session_encoding(self, _):
+        self.database.db_type = "mysql"
+        self.query_blocks([[(1, "café")]])
+
+        file_name, _ = export_data(
+            "select id, name from t", self.database, "latin-1", ",", "export_csv"
+        )
+
+        self.assertIn("1,café", self.read(file_name, "latin-1"))
+
+    @patch.object(polling, "EXPORT_BLOCK_SIZE", 1)
+    def test_fallback_reports_progress(self, _):
+        self.database.db_type = "mysql"
+        self.query_blocks([[(1, "a")], [(2, "b")], [(3, "c")]])
+        progress = []
+
+        export_data(
+            "select id, name from t",
+            self.database,
+            "utf-8",
+            ",",
+            "export_csv",
+            progress_callback=progress.append,
+        )
+
+        self.assertEqual(progress, [1, 2, 3])
+
+    def test_cancel_stops_fetching_blocks(self, _):
+        self.database.db_type = "mysql"
+        self.query_blocks([[(1, "a")], [(2, "b")], [(3, "c")]])
+        thread = MagicMock(cancel=True)
+
+        file_name, _ = export_data(
+            "select id, name from t",
+            self.database,
+            "utf-8",
+            ",",
+            "export_csv",
+            thread=thread,
+        )
+
+        self.assertEqual(self.database.connection.QueryBlock.call_count, 1)
+        self.database.connection.Close.assert_called_once()
+        content = self.read(file_name)
+        self.assertIn("1,a", content)
+        self.assertNotIn("2,b", content)
+
+    def test_cancelled_copy_raises(self, _):
+        self.database.connection.CopyTo.side_effect = Database.Exception(
+            "canceling statement due to user request"
+        )
+
+        with self.assertRaises(Database.Exception):
+            export_data(
+                "select id, name from t", self.database, "utf-8", ",", "export_csv"
+            )
+
+        self.database.connection.Close.assert_called_once()
+
+    def test_failed_block_closes_the_connection(self, _):
+        self.database.db_type = "mysql"
+        self.database.connection.QueryBlock.side_effect = Database.Exception(
+            "relation \"t\" does not exist"
+        )
+
+        with self.assertRaises(Database.Exception):
+            export_data(
+                "select id, name from t", self.database, "utf-8", ",", "export_csv"
+            )
+
+        self.database.connection.Close.assert_called_once()
@@ -0,0 +1,88 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from app.bgjob import process_executor
+from app.bgjob.process_executor import ProcessLogger
+from django.test import SimpleTestCase
+
+
+class ProcessLoggerTests(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        patcher = patch.object(process_executor, "out_dir", self.temp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.logger = ProcessLogger("err")
+        self.addCleanup(self.logger.release)
+
+    def start(self, script):
+        process = subprocess.Popen(
+            [sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.addCleanup(process.stdout.close)
+        self.addCleanup(process.stderr.close)
+        self.logger.attach_process_stream(process, process.stderr)
+        return process
+
+    def read_log(self):
+        with open(os.path.join(self.temp_dir.name, "err"), "rb") as log:
+            return log.read().decode()
+
+    def test_lines_are_timestamped(self):
+        self.start(
+            "import sys; sys.stderr.write('first\\n\\nsecond\\nlast without newline')"
+        )
+        self.logger.start()
+        self.logger.join(10)
+        self.logger.log(b"failed")
+
+        self.assertFalse(self.logger.is_alive())
+        lines = self.read_log().split("\n")
+        self.assertEqual(
+            [re.sub(r"^\d{20},", "", line) for line in lines],
+            ["first", "second", "last without newline", "failed"],
+        )
+
+    def test_pipes_are_drained_together(self):
+        # the first process only ends once the second one wrote more than a pipe holds,
+        # reading the pipes one after the other would never get there
+        flag = os.path.join(self.temp_dir.name, "flag")
+        self.start(
+            "import os, time\n"
+            f"while not os.path.exists({flag!r}):\n"
+            "    time.sleep(0.05)\n"
+        )
+        self.start(
+            "import sys\n"
+            "sys.stderr.write('x' * 100 + '\\n' * 1 + ('y' * 99 + '\\n') * 5000)\n"
+            "sys.stderr.flush()\n"
+            f"open({flag!r}, 'w').close()\n"
+        )
+        self.logger.start()
+        self.logger.join(10)
+
+        self.assertFalse(self.logger.is_alive())
+        self.assertEqual(len(self.read_log().splitlines()), 5001)
+
+    @patch.object(process_executor, "LOG_IDLE_TIMEOUT", 0.2)
+    def test_logger_ends_when_processes_exited(self):
+        # the grandchild keeps the pipe open after the process exited
+        process = self.start(
+            "import subprocess, sys\n"
+            "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(5)'])\n"
+            "sys.stderr.write('started\\n')\n"
+        )
+        started = time.monotonic()
+        self.logger.start()
+        self.logger.join(4)
+
+        self.assertFalse(self.logger.is_alive())
+        self.assertLess(time.monotonic() - started, 4)
+        self.assertIsNotNone(process.poll())
+        self.assertIn("started", self.read_log())
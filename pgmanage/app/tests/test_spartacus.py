@@ -0,0 +1,364 @@
+import decimal
+from unittest.mock import MagicMock, patch
+
+import app.include.Spartacus.Database as Database
+import sqlparse
+from django.test import TestCase
+
+
+class PostgreSQLTypeCacheTests(TestCase):
+    def setUp(self):
+        self.connection = Database.PostgreSQL(
+            "localhost", 5432, "postgres", "postgres", "postgres"
+        )
+        self.connection.con = MagicMock()
+        self.cursor = self.connection.con.cursor.return_value
+        self.cursor.fetchall.return_value = [(23, "integer"), (25, "text")]
+
+    def test_resolve_type_fills_cache_once(self):
+        self.assertEqual(self.connection.ResolveType(23), "integer")
+        self.assertEqual(self.connection.ResolveType(25), "text")
+        self.assertEqual(self.cursor.execute.call_count, 1)
+
+    def test_resolve_type_queries_unknown_oid(self):
+        self.connection.type_names = {23: "integer"}
+        self.cursor.fetchall.return_value = [(16385, "my_type")]
+        self.assertEqual(self.connection.ResolveType(16385), "my_type")
+        self.assertEqual(self.connection.ResolveType(16385), "my_type")
+        self.cursor.execute.assert_called_once_with(
+            "select oid, format_type(oid, NULL) from pg_type where oid = 16385"
+        )
+
+    def test_resolve_type_returns_placeholder_on_error(self):
+        self.cursor.execute.side_effect = Exception("connection lost")
+        self.assertEqual(self.connection.ResolveType(23), "???")
+
+    def test_type_ddl_invalidates_cache(self):
+        self.connection.type_names = {23: "integer"}
+        self.connection.InvalidateTypeCache("select * from create_table_log")
+        self.assertEqual(self.connection.type_names, {23: "integer"})
+        self.connection.InvalidateTypeCache(
+            "CREATE TYPE mood AS ENUM ('sad', 'ok', 'happy')"
+        )
+        self.assertIsNone(self.connection.type_names)
+
+    def test_create_temp_table_invalidates_cache(self):
+        self.connection.type_names = {23: "integer"}
+        self.connection.InvalidateTypeCache("create temporary table t (id int)")
+        self.assertIsNone(self.connection.type_names)
+
+
+class PostgreSQLStringConversionTests(TestCase):
+    def setUp(self):
+        self.connection = Database.PostgreSQL(
+            "localhost", 5432, "postgres", "postgres", "postgres"
+        )
+        self.description = [
+            MagicMock(type_code=23),
+            MagicMock(type_code=25),
+            MagicMock(type_code=1700),
+            MagicMock(type_code=1009),
+        ]
+        self.rows = [
+            [1, "one", decimal.Decimal("1.50"), ["a", "b"]],
+            [2, None, None, [None]],
+        ]
+
+    def test_converted_rows_match_string(self):
+        converters = self.connection.GetStringConverters(self.description)
+        expected = [
+            [self.connection.String(v) if v is not None else None for v in row]
+            for row in self.rows
+        ]
+        self.assertEqual(
+            self.connection.ConvertColumns(self.rows, converters), expected
+        )
+
+    def test_text_columns_are_kept(self):
+        converters = self.connection.GetStringConverters(self.description[1:2])
+        rows = [["one"], [None]]
+        self.assertIs(self.connection.ConvertColumns(rows, converters), rows)
+
+    def test_null_replacement(self):
+        converters = self.connection.GetStringConverters(self.description[:2])
+        self.assertEqual(
+            self.connection.ConvertColumns([[None, None]], converters, ""), [["", ""]]
+        )
+
+
+class PostgreSQLParseTests(TestCase):
+    def setUp(self):
+        self.connection = Database.PostgreSQL(
+            "localhost", 5432, "postgres", "postgres", "postgres"
+        )
+        self.connection.autocommit = True
+        Database.parse_cache.clear()
+        self.addCleanup(Database.parse_cache.clear)
+
+    def legacy_classification(self, sql):
+        return [
+            (text, Database.IsCursorSelect(statement))
+            for text, statement in zip(sqlparse.split(sql), sqlparse.parse(sql))
+        ]
+
+    def test_last_query_receives_the_cursor(self):
+        sql = "insert into t values (1); select 1; -- done\nselect * from t"
+        parsed = self.connection.Parse(sql)
+
+        self.assertEqual(
+            parsed,
+            "insert into t values (1); select 1; -- done\n"
+            f"DECLARE {self.connection.cursor} CURSOR WITH HOLD FOR select * from t",
+        )
+
+    def test_statements_without_cursor_are_kept(self):
+        for sql in (
+            "select * into t2 from t",
+            "with d as (delete from t returning *) select * from d",
+            "update t set a = 1; vacuum t",
+            "select(1)",
+        ):
+            self.assertEqual(self.connection.Parse(sql), sql)
+            self.assertIsNone(self.connection.cursor)
+
+    def test_classification_matches_sqlparse(self):
+        for sql in (
+            "select 1",
+            "SELECT a FROM t; SELECT b FROM t;",
+            "select ';' as a, \"x;y\" from t; -- c;'\n select 2",
+            "select $$;$$, $tag$ $$ ; $tag$; select 3 /* ; */",
+            "with x as (select 1) select * from x",
+            "with x as (select 1) select replace(a, 'b', 'c') from x",
+            "with x as (select 1) insert into t select * from x",
+            "create function f() returns int as $$ begin return 1; end $$ language plpgsql;"
+            " select f()",
+            "create or replace procedure p() begin atomic select 1; end; select 2",
+            "select 'a\\'; select 2",
+            "select a[1], b[2:3] from t; select 4;\n\n",
+            "begin; select 1; commit;",
+        ):
+            statements = Database.ClassifyStatements(sql)
+            self.assertEqual(
+                [(sql[start:end], cursor) for start, end, cursor in statements],
+                self.legacy_classification(sql),
+                sql,
+            )
+
+    def test_sqlparse_only_runs_for_ambiguous_scripts(self):
+        with patch.object(sqlparse, "parse", wraps=sqlparse.parse) as parse:
+            Database.ClassifyStatements("select 1; select 'a''b'; insert into t values (1)")
+            parse.assert_not_called()
+            Database.ClassifyStatements("select 'a\\'; select 2")
+            parse.assert_called_once()
+
+    def test_classification_is_cached(self):
+        sql = "select * from t"
+        with patch.object(
+            Database, "ScanStatements", wraps=Database.ScanStatements
+        ) as scan:
+            self.connection.Parse(sql)
+            first_cursor = self.connection.cursor
+            self.connection.Parse(sql)
+
+        scan.assert_called_once_with(sql)
+        self.assertNotEqual(self.connection.cursor, first_cursor)
+
+    def test_cache_is_bounded(self):
+        with patch.object(Database, "PARSE_CACHE_SIZE", 2):
+            for sql in ("select 1", "select 2", "select 3"):
+                Database.ClassifyStatements(sql)
+
+        self.assertEqual(len(Database.parse_cache), 2)
+
+
+class ArrayFetchTests(TestCase):
+    def build_cursor(self, connection, blocks):
+        connection.con = MagicMock()
+        connection.cur = MagicMock()
+        column = MagicMock()
+        column.name = "id"
+        column.type_code.num = 2010
+        connection.cur.description = [column]
+        connection.cur.fetchmany.side_effect = blocks
+        connection.start = True
+        return connection.cur
+
+    def test_oracle_query_block(self):
+        connection = Database.Oracle("localhost", 1521, "xe", "system", "oracle")
+        cursor = self.build_cursor(connection, [[(1,), (2,)], [(3,)]])
+
+        table = connection.QueryBlock("select id from t", 2, True, True)
+        self.assertEqual(table.Rows, [["1"], ["2"]])
+        self.assertEqual(cursor.arraysize, 2)
+        self.assertEqual(cursor.prefetchrows, 3)
+        self.assertFalse(connection.start)
+
+        table = connection.QueryBlock("select id from t", 2, True, True)
+        self.assertEqual(table.Rows, [["3"]])
+        self.assertTrue(connection.start)
+        cursor.execute.assert_called_once_with("select id from t")
+        cursor.fetchone.assert_not_called()
+
+    def test_mssql_query_block(self):
+        connection = Database.MSSQL("localhost", 1433, "master", "sa", "mssql")
+        cursor = self.build_cursor(connection, [[(1,), (2,)]])
+        cursor.description = [("id", 3)]
+
+        table = connection.QueryBlock("select id from t", 10, False, True)
+        self.assertEqual(table.Rows, [[1], [2]])
+        cursor.fetchmany.assert_called_once_with(10)
+        self.assertTrue(connection.start)
+
+
+class PostgreSQLCopyToTests(TestCase):
+    def setUp(self):
+        self.connection = Database.PostgreSQL(
+            "localhost", 5432, "postgres", "postgres", "postgres"
+        )
+        self.connection.con = MagicMock()
+        self.connection.cur = MagicMock()
+        self.file_handle = MagicMock()
+
+    def test_copy_formats_csv(self):
+        self.connection.CopyTo("select * from t", self.file_handle, ";", True)
+
+        self.connection.cur.copy_expert.assert_called_once_with(
+            "COPY (select * from t\n) TO STDOUT WITH (FORMAT csv, DELIMITER ';', HEADER true)",
+            self.file_handle,
+        )
+
+    def test_copy_without_header_quotes_delimiter(self):
+        self.connection.CopyTo("select 1", self.file_handle, "'", False)
+
+        self.connection.cur.copy_expert.assert_called_once_with(
+            "COPY (select 1\n) TO STDOUT WITH (FORMAT csv, DELIMITER '''', HEADER false)",
+            self.file_handle,
+        )
+
+    def test_trailing_comment_does_not_swallow_the_copy_options(self):
+        self.connection.CopyTo("select 1 -- note", self.file_handle)
+
+        self.connection.cur.copy_expert.assert_called_once_with(
+            "COPY (select 1 -- note\n) TO STDOUT WITH (FORMAT csv, DELIMITER ',', HEADER true)",
+            self.file_handle,
+        )
+
+    def test_copy_needs_open_connection(self):
+        self.connection.con = None
+
+        with self.assertRaises(Database.Exception):
+            self.connection.CopyTo("select 1", self.file_handle)
+
+    def test_cancelled_copy_raises(self):
+        self.connection.cur.copy_expert.side_effect = (
+            Database.psycopg2.extensions.QueryCanceledError(
+                "canceling statement due to user request"
+            )
+        )
+
+        with self.assertRaisesRegex(Database.Exception, "canceling statement"):
+            self.connection.CopyTo("select 1", self.file_handle)
+
+
+class DataTableTests(TestCase):
+    def build_table(self, alltypesstr=False, simple=False):
+        table = Database.DataTable(alltypesstr=alltypesstr, simple=simple)
+        table.AddColumn("id")
+        table.AddColumn("name")
+        table.AddRow((1, "one"))
+        table.AddRow((2, None))
+        return table
+
+    def test_rows_are_built_on_access(self):
+        table = self.build_table()
+        self.assertIsNone(table._rows)
+        self.assertEqual(table.RowCount, 2)
+        self.assertEqual(table.Column("id"), [1, 2])
+        self.assertIsNone(table._rows)
+        self.assertEqual(
+            table.Rows, [{"id": 1, "name": "one"}, {"id": 2, "name": None}]
+        )
+
+    def test_simple_rows_are_lists(self):
+        table = self.build_table(simple=True)
+        self.assertEqual(table.Rows, [[1, "one"], [2, None]])
+
+    def test_alltypesstr_conversion(self):
+        table = self.build_table(alltypesstr=True)
+        self.assertEqual(list(table.IterValues()), [("1", "one"), ("2", "")])
+        self.assertEqual(table.Rows[1], {"id": "2", "name": ""})
+
+    def test_add_row_after_rows_access(self):
+        table = self.build_table()
+        table.Rows.pop()
+        table.AddRow([3, "three"])
+        self.assertEqual(table.RowCount, 2)
+        self.assertEqual(table.Column("name"), ["one", "three"])
+
+    def test_jsonify_without_materializing(self):
+        table = self.build_table()
+        self.assertEqual(
+            table.Jsonify(), '[{"id": 1, "name": "one"}, {"id": 2, "name": null}]'
+        )
+        self.assertIsNone(table._rows)
+
+    def test_add_rows(self):
+        table = self.build_table(simple=True)
+        table.AddRows([(3, "three"), (4, "four")])
+        self.assertEqual(table.Column("id"), [1, 2, 3, 4])
+        table.AddRows([(5, "five")])
+        self.assertEqual(table.Rows[-1], [5, "five"])
+        with self.assertRaises(Database.Exception):
+            table.AddRows([(6,)])
+
+    def test_add_row_with_wrong_columns(self):
+        table = self.build_table()
+        with self.assertRaises(Database.Exception):
+            table.AddRow([1])
+
+    def test_unknown_column(self):
+        with self.assertRaises(Database.Exception):
+            self.build_table().Column("missing")
+
+    def test_group_by(self):
+        table = self.build_table()
+        table.AddRow((1, "uno"))
+        groups = table.GroupBy("id")
+        self.assertEqual(list(groups), [1, 2])
+        self.assertEqual([r["name"] for r in groups[1]], ["one", "uno"])
+        self.assertEqual(list(table.GroupBy(["id", "name"]))[0], (1, "one"))
+
+    def test_pretty_grid(self):
+        table = self.build_table(alltypesstr=True, simple=True)
+        table.AddRow((3, "日本\nx"))
+
+        self.assertEqual(
+            table.Pretty(),
+            "+----+------+\n"
+            "| id | name |\n"
+            "+----+------+\n"
+            "| 1  | one  |\n"
+            "| 2  |      |\n"
+            "| 3  | 日本 |\n"
+            "|    | x    |\n"
+            "+----+------+",
+        )
+
+    def test_pretty_expanded(self):
+        table = self.build_table()
+        table.AddRow((3, "x" * 50))
+
+        lines = list(table.IterPretty(True, "\r\n"))
+        self.assertEqual(lines[0], "-[ RECORD 1 ]--+" + "-" * 40 + "\r\n")
+        self.assertEqual(lines[1], "id             | 1\r\n")
+        self.assertEqual(lines[-2], "name           | " + "x" * 38 + "+\r\n")
+        self.assertEqual(lines[-1], "               | " + "x" * 12 + "\r\n")
+        self.assertEqual(table.Pretty(True), "".join(lines).replace("\r\n", "\n"))
+
+    def test_pretty_duplicate_columns(self):
+        table = Database.DataTable(simple=True)
+        table.AddColumn("a")
+        table.AddColumn("a")
+        table.AddRow((1, 2))
+
+        self.assertIn("| 1 | 2 |", table.Pretty())
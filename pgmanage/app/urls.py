@@ -17,6 +17,8 @@ base_urlpatterns = [
     # path('upload/', views.plugins.upload_view, name='sign_in'),
 
     path('long_polling/', views.polling.long_polling, name='long_polling'),
+    path('push_events/', views.polling.push_events, name='push_events'),
+    path('client_queues/', views.polling.client_queues, name='client_queues'),
     path('create_request/', views.polling.create_request, name='create_request'),
     path('clear_client/', views.polling.clear_client, name='clear_client'),
     path('client_keep_alive/', views.polling.client_keep_alive, name='client_keep_alive'),
@@ -332,6 +334,8 @@ base_urlpatterns = [
     path("monitoring-widgets/<signedint:widget_id>", views.monitoring_dashboard.widget_detail, name="dashboard-widget-detail"),
     path("monitoring-widgets/<signedint:widget_id>/template", views.monitoring_dashboard.widget_template, name="widget-template"),
     path("monitoring-widgets/<int:widget_saved_id>/refresh", views.monitoring_dashboard.refresh_monitoring_widget, name="refresh-monitoring-widget"),
+    path("monitoring-widgets/<int:widget_saved_id>/history", views.monitoring_dashboard.monitoring_widget_history, name="monitoring-widget-history"),
+    path("monitoring-widgets/refresh", views.monitoring_dashboard.refresh_monitoring_widgets, name="refresh-monitoring-widgets"),
     path("monitoring-widgets/user-created", views.monitoring_dashboard.create_widget, name="create-custom-widget"),
     path("monitoring-widgets/user-created/<int:widget_id>", views.monitoring_dashboard.user_created_widget_detail, name="widget-detail"),
     
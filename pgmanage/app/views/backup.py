@@ -1,8 +1,10 @@
 import functools
 import operator
 import os
+import re
 from abc import abstractmethod
 
+from app.bgjob.backup_scheduler import backup_scheduler, get_dump_jobs
 from app.bgjob.jobs import BatchJob, IJobDesc, escape_dquotes_process_arg
 from app.file_manager.file_manager import FileManager
 from app.models.main import Connection
@@ -10,6 +12,10 @@ from app.utils.decorators import database_required, user_authenticated
 from app.utils.postgresql_utilities import get_utility_path
 from django.http import JsonResponse
 
+from pgmanage import settings
+
+BACKUP_FILE_EXTENSIONS = {"custom": ".dump", "tar": ".tar", "plain": ".sql", "directory": ""}
+
 
 class Backup:
     """
@@ -19,6 +25,7 @@ class Backup:
     GLOBALS = 1
     SERVER = 2
     OBJECT = 3
+    DATABASES = 4
 
     TYPE_MAPPING = {
         "globals": GLOBALS,
@@ -34,6 +41,8 @@ class Backup:
             return ServerBackup()
         if backup_type == cls.OBJECT:
             return ObjectBackup()
+        if backup_type == cls.DATABASES:
+            return DatabasesBackup()
 
     @classmethod
     def get_backup_type(cls, backup_type_str):
@@ -96,6 +105,19 @@ class ObjectBackup(Backup):
         return f"Backing up an object on the server '{connection_name}' from database '{database}'"
 
 
+class DatabasesBackup(Backup):
+    @property
+    def type_desc(self):
+        return "Backing up databases on the server"
+
+    @property
+    def backup_type(self):
+        return "Backup Databases"
+
+    def get_message(self, connection_name: str, database=None):
+        return f"Backing up the databases {database} on the server '{connection_name}'"
+
+
 class BackupMessage(IJobDesc):
     """
     BackupMessage(IJobDesc)
@@ -301,6 +323,106 @@ def get_args_params_values(data, conn, backup_obj_type, backup_file):
     return args
 
 
+def set_number_of_jobs(data, concurrent_dumps=1):
+    """
+    Replaces the auto number of jobs of a directory backup by the number of cores
+    available to it.
+    :param data: input data
+    :param concurrent_dumps: number of backups sharing the cores
+    """
+    if data.get("number_of_jobs") == "auto":
+        data["number_of_jobs"] = (
+            get_dump_jobs(concurrent_dumps) if data.get("format") == "directory" else None
+        )
+
+
+def get_database_backup_file(backup_dir, database_name, data, used_names=None):
+    """
+    Returns the path of one database of a backup of several databases.
+    :param backup_dir: directory holding the backups of the databases
+    :param database_name: database name
+    :param data: input data
+    :param used_names: names given to the other databases of the backup, the
+        name is suffixed with a number when it is taken and then added to it
+    :return: path named after the database
+    """
+    name = re.sub(r"[^\w-]", "_", database_name)
+    if used_names is not None:
+        # compared without case for case insensitive file systems
+        unique_name = name
+        suffix = 1
+        while unique_name.casefold() in used_names:
+            suffix += 1
+            unique_name = f"{name}_{suffix}"
+        name = unique_name
+        used_names.add(name.casefold())
+
+    extension = BACKUP_FILE_EXTENSIONS.get(data.get("format"), "")
+    if data.get("pigz"):
+        extension += ".gz"
+    return os.path.join(backup_dir, name + extension)
+
+
+def create_databases_backup(user, database, data, databases, backup_dir, utility_path):
+    """
+    Creates and queues the jobs of a backup of several databases of a connection.
+    Every database is dumped by its own job into backup_dir, the jobs are children
+    of a parent job reporting their progress and run at most
+    BACKUP_MAX_CONCURRENT_JOBS at a time.
+    :param user: user
+    :param database: database of the connection
+    :param data: input data
+    :param databases: names of the databases
+    :param backup_dir: directory holding the backups of the databases
+    :param utility_path: path of pg_dump
+    :return: the parent job
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+
+    parent = BatchJob(
+        description=BackupMessage(
+            Backup.create(Backup.DATABASES),
+            database.conn_id,
+            backup_dir,
+            *databases,
+            database=", ".join(databases),
+        ),
+        cmd=utility_path,
+        args=databases,
+        user=user,
+    )
+
+    concurrent_dumps = min(len(databases), settings.BACKUP_MAX_CONCURRENT_JOBS)
+    jobs = []
+    used_names = set()
+    for database_name in databases:
+        database_data = {**data, "database": database_name}
+        set_number_of_jobs(database_data, concurrent_dumps)
+        backup_file = get_database_backup_file(
+            backup_dir, database_name, database_data, used_names
+        )
+        args = get_args_params_values(database_data, database, "objects", backup_file)
+
+        job = BatchJob(
+            description=BackupMessage(
+                Backup.create(Backup.OBJECT),
+                database.conn_id,
+                backup_file,
+                *args,
+                database=database_name,
+            ),
+            cmd=utility_path,
+            args=[escape_dquotes_process_arg(arg) for arg in args],
+            user=user,
+            parent_id=parent.id,
+        )
+        os.environ[str(job.id)] = database.password
+        jobs.append(job)
+
+    backup_scheduler.submit(jobs, parent)
+    return parent
+
+
 @database_required(check_timeout=True, open_connection=True)
 @user_authenticated
 def create_backup(request, database):
@@ -344,6 +466,21 @@ def create_backup(request, database):
                 status=400,
             )
 
+    databases = data.get("databases") or []
+    if backup_type_str == "objects" and len(databases) > 1:
+        try:
+            job = create_databases_backup(
+                request.user, database, data, databases, resolved_path, utility_path
+            )
+        except Exception as exc:
+            return JsonResponse(data={"data": str(exc)}, status=410)
+
+        return JsonResponse(
+            data={"job_id": job.id, "description": job.description.message, "Success": 1}
+        )
+
+    set_number_of_jobs(data)
+
     args = get_args_params_values(data, database, backup_type_str, resolved_path)
 
     escaped_args = [escape_dquotes_process_arg(arg) for arg in args]
@@ -379,7 +516,7 @@ def create_backup(request, database):
 
         os.environ[str(job.id)] = database.password
 
-        job.start()
+        backup_scheduler.submit([job])
     except Exception as exc:
         return JsonResponse(data={"data": str(exc)}, status=410)
 
@@ -422,6 +559,17 @@ def preview_command(request, database):
             data["pigz_path"] = pigz_path
         except FileNotFoundError as exc:
             return JsonResponse(data={"data": str(exc)}, status=400)
+
+    databases = data.get("databases") or []
+    if backup_type_str == "objects" and len(databases) > 1:
+        # the command of the first database, the others only differ by name
+        data = {**data, "database": databases[0]}
+        concurrent_dumps = min(len(databases), settings.BACKUP_MAX_CONCURRENT_JOBS)
+        resolved_path = get_database_backup_file(resolved_path, databases[0], data)
+    else:
+        concurrent_dumps = 1
+    set_number_of_jobs(data, concurrent_dumps)
+
     args = get_args_params_values(data, database, backup_type_str, resolved_path)
 
     backup_type = Backup.get_backup_type(backup_type_str)
@@ -1,13 +1,95 @@
+from datetime import datetime
 from typing import Literal, Optional, Union
 
+from app.include.history_retention import filter_snippet_refs, search_index_match
 from app.models.main import Connection, ConsoleHistory, QueryHistory
 from app.utils.decorators import user_authenticated
-from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
 from django.http import HttpResponse, JsonResponse
 
 from pgmanage import settings
 
 
+def filter_snippet(query: QuerySet, command_contains: str) -> QuerySet:
+    """Filters history entries by a case insensitive snippet substring.
+
+    Candidates are looked up in the trigram index when possible, the LIKE filter then
+    only checks those. Snippets moved to the snippet table are searched in its own
+    trigram index.
+
+    Args:
+        query (QuerySet): History entries.
+        command_contains (str): The substring.
+
+    Returns:
+        QuerySet: The entries whose snippet contains the substring.
+    """
+    if not command_contains:
+        return query
+    inline = Q(snippet__icontains=command_contains)
+    match = search_index_match(query.model, command_contains)
+    if match is not None:
+        inline &= Q(id__in=match)
+    snippet_refs = filter_snippet_refs(query, command_contains)
+    if snippet_refs:
+        return query.filter(inline | Q(snippet_ref__in=snippet_refs))
+    return query.filter(inline)
+
+
+def get_page(
+    query: QuerySet, cursor: Optional[dict], direction: Optional[str], page_size: int
+) -> tuple[list, bool, bool]:
+    """Returns a page of history entries, newest first, without counting them.
+
+    Pages are delimited by the (start_time, id) of an entry, so every page is an index
+    range scan no matter how deep it is.
+
+    Args:
+        query (QuerySet): History entries.
+        cursor (Optional[dict]): start_time and id of the first entry of the current
+            page for "previous", of its last entry for "next".
+        direction (Optional[str]): "next", "previous" or "last", the first page otherwise.
+        page_size (int): Number of entries per page.
+
+    Returns:
+        tuple[list, bool, bool]: The entries, whether a next page and whether a
+            previous page exists.
+    """
+    if direction == "last":
+        commands = list(query.order_by("start_time", "id")[: page_size + 1])
+        return commands[:page_size][::-1], False, len(commands) > page_size
+
+    if direction == "previous" and cursor:
+        start_time = datetime.fromisoformat(cursor["start_time"])
+        commands = list(
+            query.filter(
+                Q(start_time__gt=start_time) | Q(id__gt=cursor["id"]),
+                start_time__gte=start_time,
+            ).order_by("start_time", "id")[: page_size + 1]
+        )
+        if len(commands) > page_size:
+            return commands[:page_size][::-1], True, True
+        # back at the newest entries, show a full first page
+        direction = None
+
+    if direction == "next" and cursor:
+        start_time = datetime.fromisoformat(cursor["start_time"])
+        query = query.filter(
+            Q(start_time__lt=start_time) | Q(id__lt=cursor["id"]),
+            start_time__lte=start_time,
+        )
+    else:
+        direction = None
+
+    commands = list(query.order_by("-start_time", "-id")[: page_size + 1])
+    return commands[:page_size], len(commands) > page_size, direction == "next"
+
+
+def get_cursor(command) -> dict:
+    # isoformat keeps the microseconds the JSON encoder would round
+    return {"start_time": command.start_time.isoformat(), "id": command.id}
+
+
 @user_authenticated
 def clear_commands_history(request):
     data = request.data
@@ -22,13 +104,11 @@ def clear_commands_history(request):
     try:
         conn = Connection.objects.get(id=database_index)
         if command_type == "Query":
-            query = QueryHistory.objects.filter(
-                user=request.user, connection=conn, snippet__icontains=command_contains
-            ).order_by("-start_time")
+            query = QueryHistory.objects.filter(user=request.user, connection=conn)
         elif command_type == "Console":
-            query = ConsoleHistory.objects.filter(
-                user=request.user, connection=conn, snippet__icontains=command_contains
-            ).order_by("-start_time")
+            query = ConsoleHistory.objects.filter(user=request.user, connection=conn)
+
+        query = filter_snippet(query, command_contains)
 
         if database_filter:
             query = query.filter(database=database_filter)
@@ -50,32 +130,27 @@ def clear_commands_history(request):
 def get_commands_history(request):
     data = request.data
 
-    current_page: int = data["current_page"]
     database_index: int = data["database_index"]
     database_filter: Optional[str] = data.get("database_filter")
     command_contains: str = data["command_contains"]
     command_from: Optional[str] = data.get("command_from")
     command_to: Optional[str] = data.get("command_to")
     command_type: Union[Literal["Query"], Literal["Console"]] = data["command_type"]
+    cursor: Optional[dict] = data.get("cursor")
+    direction: Optional[str] = data.get("direction")
 
     try:
         conn = Connection.objects.get(id=database_index)
         if command_type == "Query":
-            query = QueryHistory.objects.filter(
-                user=request.user, connection=conn, snippet__icontains=command_contains
-            ).order_by("-start_time")
-            query_dbnames = QueryHistory.objects.filter(
-                user=request.user, connection=conn).exclude(database__isnull=True).values('database').distinct()
-
+            query = QueryHistory.objects.filter(user=request.user, connection=conn)
         elif command_type == "Console":
-            query = ConsoleHistory.objects.filter(
-                user=request.user, connection=conn, snippet__icontains=command_contains
-            ).order_by("-start_time")
-            query_dbnames = ConsoleHistory.objects.filter(
-                user=request.user, connection=conn).exclude(database__isnull=True).values('database').distinct()
+            query = ConsoleHistory.objects.filter(user=request.user, connection=conn)
 
+        query_dbnames = query.exclude(database__isnull=True).values('database').distinct()
         database_names = [x['database'] for x in query_dbnames]
 
+        query = filter_snippet(query, command_contains)
+
         if database_filter:
             query = query.filter(database=database_filter)
 
@@ -85,11 +160,12 @@ def get_commands_history(request):
         if command_to:
             query = query.filter(start_time__lte=command_to)
 
-        p = Paginator(query, settings.CH_CMDS_PER_PAGE)
-
-        if current_page not in list(p.page_range):
-            current_page = 1
-        commands = p.page(current_page).object_list
+        commands, has_next, has_previous = get_page(
+            query.select_related("snippet_ref"),
+            cursor,
+            direction,
+            settings.CH_CMDS_PER_PAGE,
+        )
 
     except Exception as exc:
         return JsonResponse(data={"data": str(exc)}, status=400)
@@ -103,15 +179,24 @@ def get_commands_history(request):
                 "end_time": command.end_time,
                 "duration": command.duration,
                 "status": command.status,
-                "snippet": command.snippet,
+                "snippet": command.get_snippet(),
                 "database": command.database
             }
         elif command_type == "Console":
             command_data = {
                 "start_time": command.start_time,
-                "snippet": command.snippet,
+                "snippet": command.get_snippet(),
                 "database": command.database
             }
         command_list.append(command_data)
 
-    return JsonResponse(data={"command_list": command_list, "pages": p.num_pages, "database_names": database_names})
+    return JsonResponse(
+        data={
+            "command_list": command_list,
+            "has_next": has_next,
+            "has_previous": has_previous,
+            "first_cursor": get_cursor(commands[0]) if commands else None,
+            "last_cursor": get_cursor(commands[-1]) if commands else None,
+            "database_names": database_names,
+        }
+    )
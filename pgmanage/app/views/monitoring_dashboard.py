@@ -1,5 +1,15 @@
+import hashlib
 import json
-
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.client_manager.connection_pool import connection_pool
+from app.include.monitoring_sampler import merge_timeseries_samples, monitoring_sampler
+from app.include.monitoring_snapshot import get_script_fields, snapshot_collector
+from app.include.monitoring_store import get_series_name, monitoring_store
 from app.models.main import Connection, MonWidgets, MonWidgetsConnections, Technology
 from app.utils.decorators import (
     database_required,
@@ -16,6 +26,87 @@ from RestrictedPython import compile_restricted, safe_builtins
 from RestrictedPython.Eval import default_guarded_getitem
 from RestrictedPython.Guards import safer_getattr
 
+from pgmanage import settings
+
+
+class WidgetScriptCache:
+    """
+    LRU cache of compiled widget scripts, keyed by widget and script hash.
+
+    Builtin widget scripts are compiled once when the module is imported and are
+    never evicted. User created widgets are compiled on first use and dropped
+    when the widget is updated or deleted.
+
+    Attributes:
+        _lock (threading.Lock): A lock guarding the compiled scripts.
+        _builtin (dict): Compiled scripts of builtin widgets.
+        _entries (OrderedDict): Compiled scripts of other widgets in LRU order.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._builtin = {}
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def _get_key(widget_key, script: str) -> tuple:
+        return (widget_key, hashlib.sha256(script.encode()).hexdigest())
+
+    def add_builtin(self, widget_key, script: str) -> None:
+        """Compiles a builtin widget script and keeps it for the lifetime of the process.
+
+        Args:
+            widget_key: (plugin_name, id) of the widget.
+            script (str): The script source.
+        """
+        self._builtin[self._get_key(widget_key, script)] = compile_restricted(
+            script, "<inline>", "exec"
+        )
+
+    def get(self, widget_key, script: str):
+        """Returns the compiled script, compiling it if it is not cached.
+
+        Args:
+            widget_key: (plugin_name, id) of the widget, plugin_name is empty for user
+                created widgets. None for scripts that do not belong to a saved widget.
+            script (str): The script source.
+
+        Returns:
+            The code object of the script.
+        """
+        key = self._get_key(widget_key, script)
+        byte_code = self._builtin.get(key)
+        if byte_code is not None:
+            return byte_code
+
+        with self._lock:
+            byte_code = self._entries.get(key)
+            if byte_code is not None:
+                self._entries.move_to_end(key)
+                return byte_code
+
+        byte_code = compile_restricted(script, "<inline>", "exec")
+
+        with self._lock:
+            self._entries[key] = byte_code
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.MONITORING_SCRIPT_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        return byte_code
+
+    def invalidate(self, widget_key) -> None:
+        """Drops the compiled scripts of a widget.
+
+        Args:
+            widget_key: (plugin_name, id) of the widget.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == widget_key]:
+                del self._entries[key]
+
+
+widget_script_cache = WidgetScriptCache()
+
 builtin_monitoring_widgets = {}
 
 
@@ -36,6 +127,15 @@ def get_widgets_data():
     except Exception:
         pass
 
+    for widget_key, mon_widget in builtin_monitoring_widgets.items():
+        for script in (mon_widget.get("script_data"), mon_widget.get("script_chart")):
+            if script:
+                try:
+                    widget_script_cache.add_builtin(widget_key, script)
+                except Exception:
+                    # reported when the widget is refreshed
+                    pass
+
 
 get_widgets_data()
 
@@ -45,6 +145,39 @@ def _hook_import(name, *args, **kwargs):
         raise ImportError(f"You cannot import {name} module in this sandbox.")
     return __import__(name, *args, **kwargs)
 
+
+restricted_builtins = dict(safe_builtins)
+restricted_builtins["__import__"] = _hook_import
+
+
+def get_restricted_globals():
+    return {
+        "__builtins__": restricted_builtins,
+        "_getiter_": iter,
+        "_getattr_": safer_getattr,
+        "_getitem_": default_guarded_getitem,
+    }
+
+
+def get_widget_snapshot(widget_key, script, connection):
+    # widgets read shared statistics instead of querying them each
+    widget = builtin_monitoring_widgets.get(widget_key)
+    if widget:
+        fields = widget.get("snapshot_fields")
+    else:
+        fields = get_script_fields(script)
+    return snapshot_collector.get(connection, fields) if fields else None
+
+
+def run_widget_script(widget_key, script, connection, previous_data):
+    loc = {
+        "connection": connection,
+        "previous_data": previous_data,
+        "snapshot": get_widget_snapshot(widget_key, script, connection),
+    }
+    exec(widget_script_cache.get(widget_key, script), get_restricted_globals(), loc)
+    return loc["result"]
+
 # lists all available widgets with the same db type , used in widget config modal
 # list consist from builtin widgets with the same technology + user customized widgets
 @user_authenticated
@@ -113,6 +246,7 @@ def user_created_widget_detail(request, widget_id):
             return JsonResponse(data={"data": str(exc)}, status=400)
 
         widget.save()
+        widget_script_cache.invalidate(("", widget.id))
 
         return JsonResponse(model_to_dict(widget))
     if request.method == "DELETE":
@@ -121,6 +255,7 @@ def user_created_widget_detail(request, widget_id):
         if not widget:
             return JsonResponse(data={"data": "Widget not found."}, status=404)
 
+        widget_script_cache.invalidate(("", widget.id))
         widget.delete()
 
         return HttpResponse(status=204)
@@ -360,14 +495,11 @@ def widget_detail(request, widget_id):
         return HttpResponse(status=204)
 
 
-@user_authenticated
-@database_required(check_timeout=True, open_connection=True)
-def refresh_monitoring_widget(request, database, widget_saved_id):
-    widget = request.data.get("widget")
-
+def get_widget_definition(widget, widget_saved_id):
     if widget.get("plugin_name") == "":
         widget_data = MonWidgets.objects.get(id=widget.get("id"))
 
+        widget_key = ("", widget_data.id)
         script_data = widget_data.script_data
         script_chart = widget_data.script_chart
 
@@ -385,6 +517,7 @@ def refresh_monitoring_widget(request, database, widget_saved_id):
             (widget.get("plugin_name"), widget.get("id"))
         )
 
+        widget_key = (widget_data["plugin_name"], widget_data["id"])
         script_data = widget_data["script_data"]
         script_chart = widget_data["script_chart"]
 
@@ -396,38 +529,82 @@ def refresh_monitoring_widget(request, database, widget_saved_id):
             "interval": widget_data["interval"],
         }
 
-    try:
-        loc1 = {"connection": database, "previous_data": widget.get("widget_data")}
+    return widget_key, script_data, script_chart, widget_data
+
 
-        loc2 = {"connection": database, "previous_data": widget.get("widget_data")}
+def run_widget(database, widget, widget_key, script_data, script_chart, widget_data):
+    loc1 = {"connection": database, "previous_data": widget.get("widget_data")}
 
-        restricted_globals = dict(__builtins__=safe_builtins)
-        restricted_globals["_getiter_"] = iter
-        restricted_globals["_getattr_"] = safer_getattr
-        restricted_globals["_getitem_"] = default_guarded_getitem
-        restricted_globals["__builtins__"]["__import__"] = _hook_import
+    loc2 = {"connection": database, "previous_data": widget.get("widget_data")}
 
-        byte_code = compile_restricted(script_data, "<inline>", "exec")
+    restricted_globals = get_restricted_globals()
+
+    timeseries = widget_data["type"] == "timeseries"
+    stored = timeseries and settings.MONITORING_STORE_ENABLED
+    series_name = get_series_name(database, widget_key) if stored else None
+
+    if settings.MONITORING_SAMPLER_ENABLED:
+        # every dashboard watching this database reads the same samples
+        history = widget.get("initial") and timeseries and not stored
+        data = monitoring_sampler.read(
+            database,
+            widget_key,
+            script_data,
+            widget.get("interval") or widget_data["interval"],
+            partial(run_widget_script, widget_key, script_data),
+            history=history,
+            on_sample=partial(monitoring_store.add, series_name) if stored else None,
+        )
+        if history:
+            data = merge_timeseries_samples(data)
+    else:
+        byte_code = widget_script_cache.get(widget_key, script_data)
+        loc1["snapshot"] = get_widget_snapshot(widget_key, script_data, database)
         exec(byte_code, restricted_globals, loc1)
         data = loc1["result"]
+        if stored:
+            monitoring_store.add(series_name, data)
+
+    if stored and widget.get("initial"):
+        # open dashboards with the recent history instead of an empty chart
+        samples = monitoring_store.query(
+            series_name,
+            time.time() - settings.MONITORING_STORE_INITIAL_RANGE,
+            max_points=settings.MONITORING_STORE_MAX_POINTS,
+        )
+        if samples:
+            data = merge_timeseries_samples(samples)
+
+    if not widget.get("initial") and widget_data["type"] in ["chart", "timeseries"]:
+        widget_data["object"] = data
+    elif widget_data["type"] == "grid":
+        widget_data["data"] = [dict(row) for row in data.get("data", [])]
+    elif widget_data["type"] == "graph":
+        byte_code = widget_script_cache.get(widget_key, script_chart)
+        exec(byte_code, restricted_globals, loc2)
+        result = loc2["result"]
+        result["elements"] = data
+        widget_data["object"] = result
+    else:
+        byte_code = widget_script_cache.get(widget_key, script_chart)
+        exec(byte_code, restricted_globals, loc2)
+        result = loc2["result"]
+        result["data"] = data
+        widget_data["object"] = result
+
+    return widget_data
 
-        if not widget.get("initial") and widget_data["type"] in ["chart", "timeseries"]:
-            widget_data["object"] = data
-        elif widget_data["type"] == "grid":
-            widget_data["data"] = [dict(row) for row in data.get("data", [])]
-        elif widget_data["type"] == "graph":
-            byte_code = compile_restricted(script_chart, "<inline>", "exec")
-            exec(byte_code, restricted_globals, loc2)
-            result = loc2["result"]
-            result["elements"] = data
-            widget_data["object"] = result
-        else:
-            byte_code = compile_restricted(script_chart, "<inline>", "exec")
-            exec(byte_code, restricted_globals, loc2)
-            result = loc2["result"]
-            result["data"] = data
-            widget_data["object"] = result
 
+@user_authenticated
+@database_required(check_timeout=True, open_connection=True)
+def refresh_monitoring_widget(request, database, widget_saved_id):
+    widget = request.data.get("widget")
+
+    definition = get_widget_definition(widget, widget_saved_id)
+    widget_data = definition[3]
+
+    try:
+        run_widget(database, widget, *definition)
     except Exception as exc:
         response = {"data": str(exc), "saved_id": widget_data.get("saved_id")}
         return JsonResponse(data=response, status=400)
@@ -435,6 +612,77 @@ def refresh_monitoring_widget(request, database, widget_saved_id):
     return JsonResponse(widget_data)
 
 
+def refresh_widget_in_batch(database, widget, definition):
+    start = time.monotonic()
+    try:
+        if isinstance(definition, Exception):
+            raise definition
+        if settings.MONITORING_SAMPLER_ENABLED:
+            widget_data = run_widget(database, widget, *definition)
+        else:
+            # each widget gets its own connection instead of waiting for the tab lock
+            connection = connection_pool.acquire(database, database.active_service)
+            try:
+                widget_data = run_widget(connection, widget, *definition)
+            finally:
+                if connection is not database:
+                    connection_pool.release(connection)
+    except Exception as exc:
+        widget_data = {"saved_id": widget.get("saved_id"), "data": str(exc), "error": True}
+    widget_data["duration"] = round(time.monotonic() - start, 3)
+    return widget_data
+
+
+# refreshes all due widgets of a dashboard in one request
+@user_authenticated
+@database_required(check_timeout=True, open_connection=True)
+def refresh_monitoring_widgets(request, database):
+    widgets = request.data.get("widgets") or []
+
+    # widget definitions are loaded here so worker threads never touch the ORM
+    jobs = []
+    for widget in widgets:
+        try:
+            definition = get_widget_definition(widget, widget.get("saved_id"))
+        except Exception as exc:
+            definition = exc
+        jobs.append((database, widget, definition))
+
+    max_workers = max(1, min(settings.MONITORING_BATCH_MAX_WORKERS, len(jobs)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda job: refresh_widget_in_batch(*job), jobs))
+
+    return JsonResponse(data={"widgets": results})
+
+
+# returns the stored history of a timeseries widget, without querying the database
+@user_authenticated
+@database_required(check_timeout=False, open_connection=False)
+def monitoring_widget_history(request, database, widget_saved_id):
+    widget = request.data.get("widget")
+
+    try:
+        widget_key, _, _, widget_data = get_widget_definition(widget, widget_saved_id)
+        if widget_data["type"] != "timeseries":
+            raise ValueError("Only timeseries widgets have a history.")
+        if not settings.MONITORING_STORE_ENABLED:
+            raise ValueError("Monitoring history is disabled.")
+        range_seconds = float(request.data.get("range") or 86400)
+        end = time.time()
+        samples = monitoring_store.query(
+            get_series_name(database, widget_key),
+            end - range_seconds,
+            end,
+            max_points=settings.MONITORING_STORE_MAX_POINTS,
+        )
+    except Exception as exc:
+        response = {"data": str(exc), "saved_id": widget_saved_id}
+        return JsonResponse(data=response, status=400)
+
+    widget_data["object"] = merge_timeseries_samples(samples) if samples else None
+    return JsonResponse(widget_data)
+
+
 @user_authenticated
 @database_required(check_timeout=False, open_connection=False)
 def create_dashboard_monitoring_widget(request, database):
@@ -467,24 +715,24 @@ def test_monitoring_widget(request, database):
     widget_type = widget.get("type")
     widget_data = {}
     try:
-        loc1 = {"connection": database, "previous_data": None}
+        loc1 = {
+            "connection": database,
+            "previous_data": None,
+            "snapshot": get_widget_snapshot(None, script_data, database),
+        }
 
         loc2 = {"connection": database, "previous_data": None}
 
-        restricted_globals = dict(__builtins__=safe_builtins)
-        restricted_globals["_getiter_"] = iter
-        restricted_globals["_getattr_"] = safer_getattr
-        restricted_globals["_getitem_"] = default_guarded_getitem
-        restricted_globals["__builtins__"]["__import__"] = _hook_import
+        restricted_globals = get_restricted_globals()
 
-        byte_code = compile_restricted(script_data, "<inline>", "exec")
+        byte_code = widget_script_cache.get(None, script_data)
         exec(byte_code, restricted_globals, loc1)
         data = loc1["result"]
 
         if widget_type == "grid":
             widget_data["data"] = [dict(row) for row in data.get("data", [])]
         else:
-            byte_code = compile_restricted(script_chart, "<inline>", "exec")
+            byte_code = widget_script_cache.get(None, script_chart)
             exec(byte_code, restricted_globals, loc2)
             result = loc2["result"]
             result["data"] = data
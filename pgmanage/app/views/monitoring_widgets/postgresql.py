@@ -6,6 +6,7 @@ monitoring_widgets = [{
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['xact_total'],
 'script_chart': """
 result = {
     "type": "line",
@@ -63,14 +64,12 @@ result = {
 """,
 'script_data': """
 from datetime import datetime
-from random import randint
 
-if previous_data != None:
-    query = "/*pgmanage-dash*/ select round((sum(xact_commit+xact_rollback) - " + previous_data["current_count"] + ")/(extract(epoch from now()::time - '" + previous_data["current_time"] + "'::time))::numeric,2) as tps, sum(xact_commit+xact_rollback) as current_count, now()::time as current_time FROM pg_stat_database"
-else:
-    query = '/*pgmanage-dash*/ select 0 as tps, sum(xact_commit+xact_rollback) as current_count, now()::time as current_time FROM pg_stat_database'
-
-query_data = connection.Query(query)
+tps = 0
+if previous_data != None and previous_data.get("collected_at") != None:
+    elapsed = snapshot["collected_at"] - previous_data["collected_at"]
+    if elapsed > 0:
+        tps = round((snapshot["xact_total"] - previous_data["xact_total"]) / elapsed, 2)
 
 datasets = []
 datasets.append({
@@ -82,15 +81,15 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now().isoformat(),
-            "y":query_data.Rows[0]['tps']
+            "y": tps
         }]
 
     })
 
 result = {
     "datasets": datasets,
-    "current_count": query_data.Rows[0]['current_count'],
-    'current_time': query_data.Rows[0]['current_time']
+    "xact_total": snapshot["xact_total"],
+    "collected_at": snapshot["collected_at"]
 }
 """
 },
@@ -102,6 +101,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['backends'],
 'script_chart': """
 max_connections = connection.ExecuteScalar('/*pgmanage-dash*/ SHOW max_connections')
 
@@ -163,12 +163,6 @@ result = {
 'script_data': """
 from datetime import datetime
 
-backends = connection.Query('''
-/*pgmanage-dash*/
-SELECT count(*) as count
-FROM pg_stat_activity
-''')
-
 datasets = []
 datasets.append({
         "label": 'Backends',
@@ -179,7 +173,7 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y":backends.Rows[0]['count']
+            "y": snapshot["backends"]
         }]
     })
 
@@ -196,6 +190,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['autovacuum_workers', 'autovacuum_max_workers'],
 'script_chart': """
 result = {
     "type": "line",
@@ -254,14 +249,7 @@ result = {
 'script_data': """
 from datetime import datetime
 
-query_data = connection.Query('''
-/*pgmanage-dash*/
-SELECT current_setting('autovacuum_max_workers')::bigint - (SELECT count(*) FROM pg_stat_activity WHERE query LIKE 'autovacuum: %') free,
-(SELECT count(*) FROM pg_stat_activity WHERE query LIKE 'autovacuum: %') used,
-current_setting('autovacuum_max_workers')::bigint total
-''')
-
-perc = round((float(query_data.Rows[0]['used']))/(float(query_data.Rows[0]['total']))*100,1)
+perc = round(float(snapshot["autovacuum_workers"])/float(snapshot["autovacuum_max_workers"])*100,1)
 
 datasets = []
 datasets.append({
@@ -430,6 +418,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['temp_bytes'],
 'script_chart': """
 result = {
     "type": "line",
@@ -486,23 +475,12 @@ result = {
 """,
 'script_data': """
 from datetime import datetime
-from random import randint
 
-if previous_data == None:
-    r = connection.Query(\"\"\"
-    /*pgmanage-dash*/
-    SELECT 0 as rate,
-           sum(temp_bytes) current_temp_bytes,
-           now()::text as current_time
-    FROM pg_stat_database
-    \"\"\")
-else:
-    r = connection.Query(\"\"\"
-    SELECT round(((sum(temp_bytes) - \"\"\" + previous_data["current_temp_bytes"] + \"\"\")/1048576.0)/(extract(epoch from now()::time - '\"\"\" + previous_data["current_time"] + \"\"\"'::time))::numeric,2) as rate,
-           sum(temp_bytes) current_temp_bytes,
-           now()::text as current_time
-    FROM pg_stat_database
-    \"\"\")
+rate = 0
+if previous_data != None and previous_data.get("collected_at") != None:
+    elapsed = snapshot["collected_at"] - previous_data["collected_at"]
+    if elapsed > 0:
+        rate = round(((snapshot["temp_bytes"] - previous_data["temp_bytes"])/1048576.0)/elapsed, 2)
 
 datasets = []
 datasets.append({
@@ -514,14 +492,14 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y":r.Rows[0]['rate']
+            "y": rate
         }],
     })
 
 result = {
     "datasets": datasets,
-    "current_temp_bytes": r.Rows[0]['current_temp_bytes'],
-    'current_time': r.Rows[0]['current_time']
+    "temp_bytes": snapshot["temp_bytes"],
+    "collected_at": snapshot["collected_at"]
 }
 """
 },
@@ -633,6 +611,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['blocked_locks'],
 'script_chart': """
 result = {
     "type": "line",
@@ -691,13 +670,6 @@ result = {
 'script_data': """
 from datetime import datetime
 
-query_data = connection.Query('''
-    /*pgmanage-dash*/
-    SELECT count(*)
-    FROM  pg_catalog.pg_locks blocked_locks
-    WHERE NOT blocked_locks.GRANTED;
-''')
-
 datasets = []
 datasets.append({
         "label": 'Locks Blocked',
@@ -708,7 +680,7 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y":query_data.Rows[0]['count']
+            "y": snapshot["blocked_locks"]
         }],
     })
 
@@ -725,6 +697,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['database_size'],
 'script_chart': """
 result = {
     "type": "line",
@@ -782,14 +755,6 @@ result = {
 """,
 'script_data': """
 from datetime import datetime
-from decimal import Decimal
-
-query_data = connection.Query('''
-    /*pgmanage-dash*/
-    SELECT sum(pg_database_size(datname)) AS sum
-    FROM pg_stat_database
-    WHERE datname IS NOT NULL
-''')
 
 datasets = []
 datasets.append({
@@ -801,7 +766,7 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y": round(query_data.Rows[0]["sum"] / Decimal(1048576.0),1)
+            "y": round(snapshot["database_size"] / 1048576.0,1)
         }],
     })
 
@@ -817,6 +782,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['database_size'],
 'script_chart': """
 result = {
     "type": "line",
@@ -876,29 +842,11 @@ result = {
 
 from datetime import datetime
 
-if previous_data != None:
-    query = f'''
-        /*pgmanage-dash*/
-        SELECT round(
-                   ((sum(pg_database_size(datname)) - {previous_data['current_sum']})/1048576.0) / (extract(epoch from now()::time - '{previous_data['current_time']}'::time))::numeric,
-                   2
-               ) AS database_growth,
-               sum(pg_database_size(datname)) AS current_sum,
-               now()::text AS current_time
-        FROM pg_stat_database
-        WHERE datname IS NOT NULL
-    '''
-else:
-    query = '''
-        /*pgmanage-dash*/
-        SELECT 0 AS database_growth,
-               sum(pg_database_size(datname)) AS current_sum,
-               now()::text AS current_time
-        FROM pg_stat_database
-        WHERE datname IS NOT NULL
-    '''
-
-query_data = connection.Query(query)
+database_growth = 0
+if previous_data != None and previous_data.get("collected_at") != None:
+    elapsed = snapshot["collected_at"] - previous_data["collected_at"]
+    if elapsed > 0:
+        database_growth = round(((snapshot["database_size"] - previous_data["database_size"])/1048576.0)/elapsed, 2)
 
 datasets = []
 datasets.append({
@@ -910,14 +858,14 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y": query_data.Rows[0]['database_growth']
+            "y": database_growth
         }],
     })
 
 result = {
     "datasets": datasets,
-    "current_sum": query_data.Rows[0]['current_sum'],
-    'current_time': query_data.Rows[0]['current_time']
+    "database_size": snapshot["database_size"],
+    "collected_at": snapshot["collected_at"]
 }
 """
 },
@@ -1282,6 +1230,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['long_transaction'],
 'script_chart': """
 result = {
     "type": "line",
@@ -1341,37 +1290,6 @@ result = {
 
 from datetime import datetime
 
-if int(connection.ExecuteScalar('show server_version_num')) < 100000:
-    query = '''
-        /*pgmanage-dash*/
-        SELECT seconds
-        FROM (
-            SELECT ROUND(EXTRACT(EPOCH FROM (clock_timestamp()-xact_start))::numeric,2) as seconds
-            FROM pg_stat_activity
-            WHERE xact_start is not null
-              AND datid is not null
-              AND query NOT LIKE 'autovacuum: %'
-        ) x
-        ORDER BY seconds DESC
-        LIMIT 1
-    '''
-else:
-    query = '''
-        /*pgmanage-dash*/
-        SELECT seconds
-        FROM (
-            SELECT ROUND(EXTRACT(EPOCH FROM (clock_timestamp()-xact_start))::numeric,2) as seconds
-            FROM pg_stat_activity
-            WHERE xact_start is not null
-              AND datid is not null
-              AND backend_type NOT IN ('walreceiver','walsender','walwriter','autovacuum worker')
-        ) x
-        ORDER BY seconds DESC
-        LIMIT 1
-    '''
-
-query_data = connection.Query(query)
-
 datasets = []
 datasets.append({
         "label": 'Seconds',
@@ -1382,7 +1300,7 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y": query_data.Rows[0]['seconds']
+            "y": round(snapshot["long_transaction"], 2)
         }],
     })
 
@@ -1398,6 +1316,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['long_query'],
 'script_chart': """
 result = {
     "type": "line",
@@ -1457,43 +1376,6 @@ result = {
 
 from datetime import datetime
 
-if int(connection.ExecuteScalar('show server_version_num')) < 100000:
-    query = '''
-        /*pgmanage-dash*/
-        SELECT seconds
-            FROM (
-                SELECT ROUND(EXTRACT(EPOCH FROM (clock_timestamp()-query_start))::numeric,2) as seconds
-                FROM pg_stat_activity
-                WHERE state='active'
-                  AND query_start is not null
-                  AND datid is not null
-                  AND query NOT LIKE 'autovacuum: %'
-                UNION ALL
-                SELECT 0.0
-            ) x
-            ORDER BY seconds DESC
-            LIMIT 1
-    '''
-else:
-    query = '''
-        /*pgmanage-dash*/
-        SELECT seconds
-        FROM (
-            SELECT ROUND(EXTRACT(EPOCH FROM (clock_timestamp()-query_start))::numeric,2) as seconds
-            FROM pg_stat_activity
-            WHERE state='active'
-              AND query_start is not null
-              AND datid is not null
-              AND backend_type NOT IN ('walreceiver','walsender','walwriter','autovacuum worker')
-            UNION ALL
-            SELECT 0.0
-        ) x
-        ORDER BY seconds DESC
-        LIMIT 1
-    '''
-
-query_data = connection.Query(query)
-
 datasets = []
 datasets.append({
         "label": 'Seconds',
@@ -1504,7 +1386,7 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y": query_data.Rows[0]['seconds']
+            "y": round(snapshot["long_query"], 2)
         }]
     })
 
@@ -1520,6 +1402,7 @@ result = {
 'type': 'timeseries',
 'interval': 10,
 'default': True,
+'snapshot_fields': ['long_autovacuum'],
 'script_chart': """
 result = {
     "type": "line",
@@ -1579,43 +1462,6 @@ result = {
 
 from datetime import datetime
 
-if int(connection.ExecuteScalar('show server_version_num')) < 100000:
-    query = '''
-        /*pgmanage-dash*/
-        SELECT seconds
-        FROM (
-            SELECT ROUND(EXTRACT(EPOCH FROM (clock_timestamp()-query_start))::numeric,2) as seconds
-            FROM pg_stat_activity
-            WHERE state='active'
-              AND query_start is not null
-              AND datid is not null
-              AND query LIKE 'autovacuum: %'
-            UNION ALL
-            SELECT 0.0
-        ) x
-        ORDER BY seconds DESC
-        LIMIT 1
-    '''
-else:
-    query = '''
-        /*pgmanage-dash*/
-        SELECT seconds
-        FROM (
-            SELECT ROUND(EXTRACT(EPOCH FROM (clock_timestamp()-query_start))::numeric,2) as seconds
-            FROM pg_stat_activity
-            WHERE state='active'
-              AND query_start is not null
-              AND datid is not null
-              AND backend_type = 'autovacuum worker'
-            UNION ALL
-            SELECT 0.0
-        ) x
-        ORDER BY seconds DESC
-        LIMIT 1
-    '''
-
-query_data = connection.Query(query)
-
 datasets = []
 datasets.append({
         "label": 'Seconds',
@@ -1626,7 +1472,7 @@ datasets.append({
         "borderWidth": 1.2,
         "data": [{
             "x": datetime.now(),
-            "y": query_data.Rows[0]['seconds']
+            "y": round(snapshot["long_autovacuum"], 2)
         }],
     })
 
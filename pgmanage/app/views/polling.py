@@ -1,4 +1,4 @@
-import copy
+import hashlib
 import io
 import logging
 import os
@@ -8,20 +8,25 @@ import traceback
 from collections import defaultdict
 from datetime import datetime, timezone
 from enum import IntEnum
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 import paramiko
 import sqlparse
 from app.client_manager import Client, client_manager
 from app.include import OmniDatabase
+from app.include.advanced_object_search import AdvancedObjectSearch
 from app.include.custom_paramiko_expect import SSHClientInteraction
+from app.include.history_writer import history_writer
+from app.include.OmniDatabase.catalog_cache import DDL_REGEX, catalog_cache
 from app.include.Session import Session
 from app.include.Spartacus import Utils
-from app.models.main import Connection, ConsoleHistory, QueryHistory, Tab
-from app.utils.decorators import session_required, user_authenticated
+from app.models.main import Connection, ConsoleHistory, Job, QueryHistory, Tab
+from app.utils.decorators import (session_required, superuser_required,
+                                  user_authenticated)
 from django.contrib.auth.models import User
 from django.db import DatabaseError
-from django.http import HttpRequest, JsonResponse
+from django.http import (HttpRequest, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 
 from pgmanage import settings
 from pgmanage.startup import clean_temp_folder
@@ -59,6 +64,8 @@ class RequestType(IntEnum):
     TERMINAL = 11
     PING = 12
     SCHEMA_EDIT_DATA = 13
+    WATCH_JOB = 14
+    UNWATCH_JOB = 15
 
 
 class ResponseType(IntEnum):
@@ -78,6 +85,7 @@ class ResponseType(IntEnum):
     PONG = 13
     OPERATION_CANCELLED = 14
     SCHEMA_EDIT_RESULT = 15
+    JOB_PROGRESS = 16
 
 
 class DebugState(IntEnum):
@@ -134,24 +142,139 @@ def log_history(
 ) -> None:
 
     try:
-
-        query_object = QueryHistory(
-            user=User.objects.get(id=user_id),
-            connection=Connection.objects.get(id=conn_id),
-            start_time=start,
-            end_time=end,
-            duration=duration,
-            status=status,
-            snippet=sql,
-            database=database,
+        history_writer.add(
+            QueryHistory(
+                user_id=user_id,
+                connection_id=conn_id,
+                start_time=start,
+                end_time=end,
+                duration=duration,
+                status=status,
+                snippet=sql,
+                database=database,
+            )
         )
-        query_object.save()
     except Exception as exc:
         logger.error("""*** Exception ***\n{0}""".format(traceback.format_exc()))
 
 
+EXPORT_BLOCK_SIZE = 10000
+
+
+class ExportProgressFile(io.TextIOBase):
+    """Text file wrapper handed to COPY ... TO STDOUT, counts written rows."""
+
+    def __init__(self, file_handle, progress_callback=None, header=False) -> None:
+        super().__init__()
+        self.file_handle = file_handle
+        self.progress_callback = progress_callback
+        self.header = header
+        self.rows = 0
+
+    def write(self, data: str) -> int:
+        self.file_handle.write(data)
+        # COPY writes one line per call, the header line is not a row
+        if self.header:
+            self.header = False
+            return len(data)
+        self.rows += 1
+        if self.progress_callback and self.rows % EXPORT_BLOCK_SIZE == 0:
+            self.progress_callback(self.rows)
+        return len(data)
+
+
+CONSOLE_CHUNK_SIZE = 10000
+
+
+class ConsoleOutput:
+    """Console output in terminal line endings, handed to send in chunks as it grows.
+
+    The terminal writes every chunk as a line of its own, so chunks end at a line break
+    that is left out of the chunk. Only lines longer than CONSOLE_CHUNK_SIZE are split.
+    """
+
+    def __init__(self, send) -> None:
+        self.send = send
+        self.parts: list[str] = []
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        self.write_lines([text.replace("\n", "\r\n")])
+
+    def write_lines(self, lines) -> None:
+        """Adds text that already uses terminal line endings."""
+        for line in lines:
+            self.parts.append(line)
+            self.size += len(line)
+            if self.size >= CONSOLE_CHUNK_SIZE:
+                self._flush()
+
+    def _flush(self) -> None:
+        data = "".join(self.parts)
+        start = 0
+        while len(data) - start >= CONSOLE_CHUNK_SIZE:
+            end = data.rfind("\r\n", start, start + CONSOLE_CHUNK_SIZE + 2)
+            if end < 0:
+                end = start + CONSOLE_CHUNK_SIZE
+                self.send(data[start:end])
+                start = end
+            else:
+                self.send(data[start:end])
+                start = end + 2
+        self.parts = [data[start:]]
+        self.size = len(data) - start
+
+    def finish(self) -> str:
+        """Returns the output not sent yet, which goes in the last response."""
+        data = "".join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def get_copy_statement(sql_cmd: str) -> Optional[str]:
+    """Returns the only statement of sql_cmd without comments and semicolons, to be
+    wrapped in COPY (...), or None if sql_cmd has several statements."""
+    statements: list[str] = [
+        statement.strip().rstrip(";").strip()
+        for statement in sqlparse.split(sqlparse.format(sql_cmd, strip_comments=True))
+    ]
+    statements = [statement for statement in statements if statement]
+    if len(statements) != 1:
+        return None
+    return statements[0]
+
+
+def is_copy_supported(sql_cmd: str, database, delimiter: str) -> bool:
+    if database.db_type != "postgresql" or len(delimiter) != 1:
+        return False
+
+    statement_sql: Optional[str] = get_copy_statement(sql_cmd)
+    if statement_sql is None:
+        return False
+
+    statement = sqlparse.parse(statement_sql)[0]
+    if statement.get_type() != "SELECT":
+        return False
+
+    # COPY does not accept SELECT INTO or data-modifying CTEs
+    for token in statement.flatten():
+        if token.ttype == sqlparse.tokens.Token.Keyword.DML and token.value.upper() != "SELECT":
+            return False
+        if token.is_keyword and token.value.upper() == "INTO":
+            return False
+
+    return True
+
+
 def export_data(
-    sql_cmd: str, database, encoding: str, delimiter: str, cmd_type: str
+    sql_cmd: str,
+    database,
+    encoding: str,
+    delimiter: str,
+    cmd_type: str,
+    thread: Optional[threading.Thread] = None,
+    progress_callback=None,
 ) -> tuple[str, str]:
     skip_headers: bool = False
     # cleaning temp folder
@@ -170,53 +293,64 @@ def export_data(
     if not os.path.exists(export_dir):
         os.makedirs(export_dir)
 
-    database.connection.Open()
-
     file_name: str = f'${str(time.time()).replace(".", "_")}.{extension}'
+    file_path: str = os.path.join(export_dir, file_name)
+    skip_headers = cmd_type in ['export_xlsx-no_headers', 'export_csv-no_headers']
 
-    data = database.connection.QueryBlock(sql_cmd, 1000, False, True)
-
-    name_count = defaultdict(int)
-    columns = []
-    for column in data.Columns:
-        name_count[column] += 1
-        if name_count[column] > 1:
-            columns.append(f"{column}_{name_count[column]}")
-        else:
-            columns.append(column)
+    database.connection.Open()
 
-    data.Columns = columns
+    # let the server format csv rows and stream them straight to disk
+    if extension == "csv" and is_copy_supported(sql_cmd, database, delimiter):
+        try:
+            with open(file_path, "w", encoding=encoding) as file_handle:
+                database.connection.CopyTo(
+                    get_copy_statement(sql_cmd),
+                    ExportProgressFile(file_handle, progress_callback, not skip_headers),
+                    delimiter,
+                    not skip_headers,
+                )
+        finally:
+            database.connection.Close()
+        return file_name, extension
 
-    file_path: str = os.path.join(export_dir, file_name)
-    skip_headers = cmd_type in ['export_xlsx-no_headers', 'export_csv-no_headers']
-    file = Utils.DataFileWriter(
-        file_path, data.Columns, encoding, delimiter, skip_headers=skip_headers
-    )
+    try:
+        data = database.connection.QueryBlock(sql_cmd, EXPORT_BLOCK_SIZE, False, True)
+
+        name_count = defaultdict(int)
+        columns = []
+        for column in data.Columns:
+            name_count[column] += 1
+            if name_count[column] > 1:
+                columns.append(f"{column}_{name_count[column]}")
+            else:
+                columns.append(column)
 
-    file.Open()
+        data.Columns = columns
 
-    has_more_records: bool
-    if database.connection.start:
-        file.Write(data)
-        has_more_records = False
-    elif len(data.Rows) > 0:
-        file.Write(data)
-        has_more_records = True
-    else:
-        has_more_records = False
+        file = Utils.DataFileWriter(
+            file_path, data.Columns, encoding, delimiter, skip_headers=skip_headers
+        )
 
-    while has_more_records:
-        data = database.connection.QueryBlock(sql_cmd, 1000, False, True)
+        file.Open()
 
-        if database.connection.start:
+        rows_written: int = 0
+        has_more_records: bool = True
+        while has_more_records:
             file.Write(data)
-            has_more_records = False
-        elif len(data.Rows) > 0:
-            file.Write(data)
-            has_more_records = True
-        else:
-            has_more_records = False
-    database.connection.Close()
+            rows_written += len(data.Rows)
+
+            if database.connection.start or len(data.Rows) == 0:
+                has_more_records = False
+            elif thread is not None and thread.cancel:
+                break
+            else:
+                if progress_callback:
+                    progress_callback(rows_written)
+                data = database.connection.QueryBlock(
+                    sql_cmd, EXPORT_BLOCK_SIZE, False, True
+                )
+    finally:
+        database.connection.Close()
 
     file.Flush()
 
@@ -250,35 +384,93 @@ def long_polling(request: HttpRequest) -> JsonResponse:
     )
 
     if startup:
-        client_object.release_polling_lock()
+        # make a dangling polling request from a previous page return
+        client_object.wake_consumers()
 
-    # Acquire client polling lock to read returning data
-    client_object.polling_lock.acquire()
+    # responses are already serialized by the queue
+    returning_data: list[str] = client_object.get_responses(
+        timeout=settings.CLIENT_POLLING_TIMEOUT
+    )
 
-    returning_data: list[dict[Any, Any]] = []
+    return HttpResponse(
+        '{"returning_rows": [' + ",".join(returning_data) + "]}",
+        content_type="application/json",
+    )
 
-    client_object.returning_data_lock.acquire()
 
-    while len(client_object.returning_data) > 0:
-        try:
-            returning_data.append(client_object.returning_data.popleft())
-        except IndexError:
-            pass
+class PushEventStream:
+    """
+    The events of a push stream, which gives its slot back when the server closes it.
 
-    client_object.release_returning_data_lock()
-    return JsonResponse({"returning_rows": returning_data})
+    Attributes:
+        _events (Iterator[str]): The events.
+        _released (bool): Whether the slot was given back.
+    """
 
+    def __init__(self, events: Iterator[str]) -> None:
+        self._events = events
+        self._released = False
 
-def queue_response(client: Client, data: dict[str, Any]) -> None:
+    def __iter__(self) -> Iterator[str]:
+        return self._events
 
-    client.returning_data_lock.acquire()
+    def close(self) -> None:
+        # also called when the stream never started, unlike a finally in the generator
+        self._events.close()
+        if not self._released:
+            self._released = True
+            client_manager.release_push_stream()
 
-    client.returning_data.append(data)
 
-    # Attempt to release client polling lock so that the polling thread can read data
-    client.release_polling_lock()
+@session_required(include_session=False)
+def push_events(request: HttpRequest) -> HttpResponse:
+    if not client_manager.acquire_push_stream():
+        # the browser falls back to long polling
+        return HttpResponse(status=503)
 
-    client.release_returning_data_lock()
+    client_object: Client = client_manager.get_or_create_client(
+        client_id=request.session.session_key
+    )
+    stream_id: int = client_object.open_push_stream()
+
+    def event_stream():
+        # tell the browser the channel is ready so it can stop long polling
+        yield "retry: 3000\nevent: ready\ndata: {}\n\n"
+        while client_object.is_push_stream_active(stream_id):
+            responses = client_object.get_responses(
+                timeout=settings.PUSH_KEEPALIVE_INTERVAL, stream_id=stream_id
+            )
+            if not responses:
+                # comment line, keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            for response in responses:
+                yield f"data: {response}\n\n"
+
+    response = StreamingHttpResponse(
+        PushEventStream(event_stream()), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def queue_response(client: Client, data: dict[str, Any]) -> None:
+    client.queue_response(data)
+
+
+@superuser_required
+def client_queues(request: HttpRequest) -> JsonResponse:
+    data = [
+        {
+            # session keys must not leak, identify clients by a digest
+            "client": hashlib.sha256(client.id.encode()).hexdigest()[:12],
+            "last_update": client.last_update,
+            **client.get_queue_stats(),
+        }
+        for client in list(client_manager.clients.values())
+    ]
+    return JsonResponse({"data": data})
 
 
 @session_required
@@ -292,8 +484,8 @@ def create_request(request: HttpRequest, session: Session) -> JsonResponse:
         client_id=request.session.session_key
     )
 
-    # Release lock to avoid dangling ajax polling requests
-    client_object.release_polling_lock()
+    # Avoid dangling ajax polling requests
+    client_object.wake_consumers()
 
     # Cancel thread
     if request_type == RequestType.CANCEL_THREAD:
@@ -345,6 +537,32 @@ def create_request(request: HttpRequest, session: Session) -> JsonResponse:
                     tab.delete()
                 except Exception:
                     pass
+
+    elif request_type in (RequestType.WATCH_JOB, RequestType.UNWATCH_JOB):
+        # the job watcher reports through this module
+        from app.bgjob.jobs import PROCESS_NOT_FOUND
+        from app.bgjob.log_tailer import job_watcher
+
+        if request_type == RequestType.UNWATCH_JOB:
+            job_watcher.unwatch(client_object, request_data["job_id"])
+            return JsonResponse({})
+
+        job = Job.objects.filter(id=request_data["job_id"], user=request.user).first()
+        if job is None:
+            response_data = {
+                "response_type": ResponseType.MESSAGE_EXCEPTION,
+                "context_code": context_code,
+                "data": PROCESS_NOT_FOUND,
+            }
+            queue_response(client_object, response_data)
+            return JsonResponse({})
+        job_watcher.watch(
+            client_object,
+            context_code,
+            job,
+            request_data.get("out", 0),
+            request_data.get("err", 0),
+        )
     else:
         # Check database prompt timeout
         if request_data["db_index"] is not None:
@@ -534,6 +752,26 @@ def create_request(request: HttpRequest, session: Session) -> JsonResponse:
                 workspace_context["type"] = "schema_edit"
                 t.start()
 
+            # Advanced object search, every finished category is sent on its own,
+            # the frontend has no caller for it yet
+            elif request_type == RequestType.ADVANCED_OBJECT_SEARCH:
+
+                def queue_search_result(data, context_code=context_code):
+                    response_data = {
+                        "response_type": ResponseType.ADVANCED_OBJECT_SEARCH_RESULT,
+                        "context_code": context_code,
+                        "error": "error" in data and data["last_block"],
+                        "data": data,
+                    }
+                    queue_response(client_object, response_data)
+
+                thread_pool = AdvancedObjectSearch(
+                    workspace_context["omnidatabase"], request_data, queue_search_result
+                )
+                workspace_context["thread_pool"] = thread_pool
+                workspace_context["type"] = "advancedobjectsearch"
+                thread_pool.start()
+
         # Debugger
         elif request_type == RequestType.DEBUG:
 
@@ -1042,12 +1280,31 @@ def thread_query(self, args) -> None:
             "export_xlsx-no_headers",
             "export_json"
         ]:
+            def export_progress(rows: int) -> None:
+                if not self.cancel:
+                    queue_response(
+                        client_object,
+                        {
+                            "response_type": ResponseType.QUERY_RESULT,
+                            "context_code": args["context_code"],
+                            "error": False,
+                            "data": {
+                                "data": [],
+                                "export_progress": rows,
+                                "last_block": False,
+                                "chunks": True,
+                            },
+                        },
+                    )
+
             file_name, extension = export_data(
                 sql_cmd=sql_cmd,
                 database=database,
                 encoding=session.csv_encoding,
                 delimiter=session.csv_delimiter,
                 cmd_type=cmd_type,
+                thread=self,
+                progress_callback=export_progress,
             )
 
             log_end_time = datetime.now(timezone.utc)
@@ -1114,11 +1371,19 @@ def thread_query(self, args) -> None:
                     queue_response(client_object, response_data)
             elif mode == QueryModes.FETCH_ALL or all_data:
                 has_more_records = True
+                col_types: Optional[list[str]] = None
 
                 while has_more_records:
 
                     data = database.connection.QueryBlock(sql_cmd, 10000, True, True)
 
+                    # every block of the same result set shares the column types
+                    if col_types is None:
+                        col_types = [
+                            database.connection.ResolveType(c)
+                            for c in data.ColumnTypeCodes
+                        ]
+
                     notices = database.connection.GetNotices()
 
                     database.connection.ClearNotices()
@@ -1129,10 +1394,7 @@ def thread_query(self, args) -> None:
 
                     response_data["data"] = {
                         "col_names": data.Columns,
-                        "col_types": [
-                            database.connection.ResolveType(c)
-                            for c in data.ColumnTypeCodes
-                        ],
+                        "col_types": col_types,
                         "data": data.Rows,
                         "last_block": False,
                         "duration": duration,
@@ -1164,10 +1426,7 @@ def thread_query(self, args) -> None:
 
                     response_data["data"] = {
                         "col_names": data.Columns,
-                        "col_types": [
-                            database.connection.ResolveType(c)
-                            for c in data.ColumnTypeCodes
-                        ],
+                        "col_types": col_types,
                         "data": data.Rows,
                         "last_block": True,
                         "duration": duration,
@@ -1233,12 +1492,17 @@ def thread_query(self, args) -> None:
             database=database.active_service,
         )
 
+    if mode == QueryModes.COMMIT or (
+        mode == QueryModes.DATA_OPERATION and DDL_REGEX.search(sql_cmd)
+    ):
+        catalog_cache.invalidate(database)
+
     if mode == QueryModes.DATA_OPERATION and workspace_context.get("tab_db_id") and log_query:
-        tab = Tab.objects.filter(id=workspace_context.get("tab_db_id")).first()
-        if tab:
-            tab.snippet = workspace_context.get("sql_save")
-            tab.title = tab_title
-            tab.save()
+        history_writer.update_tab(
+            workspace_context.get("tab_db_id"),
+            snippet=workspace_context.get("sql_save"),
+            title=tab_title,
+        )
 
 
 def thread_console(self, args) -> None:
@@ -1266,10 +1530,29 @@ def thread_console(self, args) -> None:
         log_start_time = datetime.now(timezone.utc)
         show_fetch_button: bool = False
 
+        def send_chunk(chunk: str) -> None:
+            if self.cancel:
+                return
+            queue_response(
+                client_object,
+                {
+                    **response_data,
+                    "error": False,
+                    "data": {
+                        "data": chunk,
+                        "last_block": False,
+                        "duration": get_duration(log_start_time, datetime.now(timezone.utc)),
+                        "show_fetch_button": False,
+                        "con_status": "",
+                    },
+                },
+            )
+
         try:
             list_sql: list[str] = sqlparse.split(sql_cmd)
 
-            data_return: str = ""
+            # full chunks are sent while the output is produced
+            output = ConsoleOutput(send_chunk)
             run_command_list: bool = True
 
             if mode == ConsoleModes.DATA_OPERATION:
@@ -1284,23 +1567,14 @@ def thread_console(self, args) -> None:
 
             if mode == ConsoleModes.FETCH_MORE:
                 table = database.connection.QueryBlock("", block_size, True, True)
+                output.write("\n")
+                output.write_lines(table.IterPretty(database.connection.expanded, "\r\n"))
+                output.write("\n" + database.connection.GetStatus())
                 # need to stop again
                 if not database.connection.start or len(table.Rows) >= block_size:
-                    data_return += (
-                        "\n"
-                        + table.Pretty(database.connection.expanded)
-                        + "\n"
-                        + database.connection.GetStatus()
-                    )
                     run_command_list = False
                     show_fetch_button = True
                 else:
-                    data_return += (
-                        "\n"
-                        + table.Pretty(database.connection.expanded)
-                        + "\n"
-                        + database.connection.GetStatus()
-                    )
                     run_command_list = True
                     list_sql = workspace_context["remaining_commands"]
             elif mode == ConsoleModes.FETCH_ALL:
@@ -1309,21 +1583,9 @@ def thread_console(self, args) -> None:
                 while has_more_records:
 
                     data = database.connection.QueryBlock("", 10000, True, True)
-                    data_return = (
-                        "\n" + data.Pretty(database.connection.expanded) + "\n"
-                    )
-                    data_return = data_return.replace("\n", "\r\n")
-
-                    log_end_time = datetime.now(timezone.utc)
-                    duration = get_duration(log_start_time, log_end_time)
-
-                    response_data["data"] = {
-                        "data": data_return,
-                        "last_block": False,
-                        "duration": duration,
-                        "show_fetch_button": show_fetch_button,
-                        "con_status": "",
-                    }
+                    output.write("\n")
+                    output.write_lines(data.IterPretty(database.connection.expanded, "\r\n"))
+                    output.write("\n")
 
                     if database.connection.start:
                         has_more_records = False
@@ -1335,9 +1597,6 @@ def thread_console(self, args) -> None:
                     if self.cancel:
                         break
 
-                    if has_more_records:
-                        queue_response(client_object, response_data)
-
             if mode == ConsoleModes.SKIP_FETCH:
                 run_command_list = True
                 list_sql = workspace_context["remaining_commands"]
@@ -1349,7 +1608,7 @@ def thread_console(self, args) -> None:
                     counter = counter + 1
                     try:
                         formated_sql = sql.strip()
-                        data_return += (
+                        output.write(
                             "\n"
                             + database.active_service
                             + "=# "
@@ -1360,15 +1619,17 @@ def thread_console(self, args) -> None:
                         database.connection.ClearNotices()
                         database.connection.start = True
                         data1 = database.connection.Special(sql)
+                        if DDL_REGEX.search(sql):
+                            catalog_cache.invalidate(database)
 
                         notices = database.connection.GetNotices()
                         notices_text = ""
                         if len(notices) > 0:
                             for notice in notices:
                                 notices_text += notice
-                            data_return += notices_text
+                            output.write(notices_text)
 
-                        data_return += data1
+                        output.write(data1)
 
                         if database.use_server_cursor:
                             if database.connection.last_fetched_size == 50:
@@ -1382,58 +1643,26 @@ def thread_console(self, args) -> None:
                             if len(notices) > 0:
                                 for notice in notices:
                                     notices_text += notice
-                                data_return += notices_text
+                                output.write(notices_text)
                         except Exception as exc:
                             None
                         response_data["error"] = True
-                        data_return += str(exc)
+                        output.write(str(exc))
                     workspace_context["remaining_commands"] = []
 
             log_end_time = datetime.now(timezone.utc)
             duration = get_duration(log_start_time, log_end_time)
 
-            data_return = data_return.replace("\n", "\r\n")
-
             response_data["data"] = {
-                "data": data_return,
+                "data": output.finish(),
                 "last_block": True,
                 "duration": duration,
+                "show_fetch_button": show_fetch_button,
                 "con_status": database.connection.GetConStatus(),
+                "status": database.connection.GetStatus(),
             }
-
-            # send data in chunks to avoid blocking the websocket server
-            chunks = (
-                [data_return[x : x + 10000] for x in range(0, len(data_return), 10000)]
-                if not mode == ConsoleModes.FETCH_ALL
-                else []
-            )
-            if len(chunks) > 0:
-                for idx, chunk in enumerate(chunks, 1):
-                    response_data_copy = copy.deepcopy(response_data)
-                    if self.cancel:
-                        break
-                    if idx != len(chunks):
-                        response_data_copy["data"] = {
-                            "data": chunk,
-                            "last_block": False,
-                            "duration": duration,
-                            "show_fetch_button": show_fetch_button,
-                            "con_status": "",
-                        }
-                    else:
-                        response_data_copy["data"] = {
-                            "data": chunk,
-                            "last_block": True,
-                            "duration": duration,
-                            "show_fetch_button": show_fetch_button,
-                            "con_status": database.connection.GetConStatus(),
-                            "status": database.connection.GetStatus(),
-                        }
-                    if not self.cancel:
-                        queue_response(client_object, response_data_copy)
-            else:
-                if not self.cancel:
-                    queue_response(client_object, response_data)
+            if not self.cancel:
+                queue_response(client_object, response_data)
 
             try:
                 database.connection.ClearNotices()
@@ -1454,16 +1683,16 @@ def thread_console(self, args) -> None:
 
         if mode == ConsoleModes.DATA_OPERATION:
             # logging to console history
-            query_object = ConsoleHistory(
-                user=User.objects.get(id=session.user_id),
-                connection=Connection.objects.get(id=database.conn_id),
-                start_time=datetime.now(timezone.utc),
-                snippet=sql_cmd.replace("'", "''"),
-                database=database.active_service,
+            history_writer.add(
+                ConsoleHistory(
+                    user_id=session.user_id,
+                    connection_id=database.conn_id,
+                    start_time=datetime.now(timezone.utc),
+                    snippet=sql_cmd.replace("'", "''"),
+                    database=database.active_service,
+                )
             )
 
-            query_object.save()
-
     except Exception as exc:
         logger.error("""*** Exception ***\n{0}""".format(traceback.format_exc()))
         response_data["error"] = True
@@ -1600,6 +1829,7 @@ def thread_schema_edit_data(self, args) -> None:
         else:
             database.connection.QueryBlock(sql_cmd, 50, True, True)
 
+        catalog_cache.invalidate(database)
         database.connection.ClearNotices()
 
         response_data["data"] = {
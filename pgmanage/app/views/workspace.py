@@ -234,6 +234,8 @@ def draw_graph(request, database):
 
     try:
         tables = database.QueryTables(False, schema)
+        # columns of all tables in a single query instead of one per table
+        fields = database.QueryTablesFieldsGrouped(False, schema)
 
         for table in tables.Rows:
             node_data = {
@@ -243,9 +245,7 @@ def draw_graph(request, database):
                 "columns": []
             }
             table_name = table.get('name_raw') or table["table_name"]
-            table_columns = database.QueryTablesFields(
-                table_name, False, schema
-            ).Rows
+            table_columns = fields.get(table_name, [])
 
             node_data['columns'] = list(({
                 'name': c['column_name'],
@@ -453,23 +453,24 @@ def get_database_meta(request, database):
             }
 
             tables = database.QueryTables(False, schema["schema_name"])
+            table_fields = database.QueryTablesFieldsGrouped(False, schema["schema_name"])
             for table in tables.Rows:
                 table_data = {
                     "name": table["table_name"],
                     "columns": []
                 }
                 table_name = table.get('name_raw') or table["table_name"]
-                table_columns = database.QueryTablesFields(
-                    table_name, False, schema["schema_name"]
-                ).Rows
+                table_columns = table_fields.get(table_name, [])
 
                 table_data['columns'] = list((c['column_name'] for c in table_columns))
                 schema_data['tables'].append(table_data)
             
             if database.has_schema:
                 views = database.QueryViews(all_schemas=False, schema=schema["schema_name"])
+                view_fields = database.QueryViewFieldsGrouped(False, schema["schema_name"])
             else:
                 views = database.QueryViews()
+                view_fields = database.QueryViewFieldsGrouped()
 
             for view in views.Rows:
                 view_data = {
@@ -477,13 +478,9 @@ def get_database_meta(request, database):
                     "columns": []
                 }
                 view_name = view.get('name_raw') or view["table_name"]
+                view_columns = view_fields.get(view_name, [])
 
-                if database.has_schema:
-                    view_columns = database.QueryViewFields(table=view_name, all_schemas=False, schema=schema["schema_name"])
-                else:
-                    view_columns = database.QueryViewFields(table_name=view_name)
-
-                view_data['columns'] = list((c['column_name'] for c in view_columns.Rows))
+                view_data['columns'] = list((c['column_name'] for c in view_columns))
                 schema_data['views'].append(view_data)
 
             schema_list.append(schema_data)
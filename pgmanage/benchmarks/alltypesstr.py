@@ -0,0 +1,100 @@
+"""
+Measures the rows/sec of the alltypesstr conversion done by PostgreSQL.QueryBlock.
+
+Run from the pgmanage directory:
+    PYTHONPATH=. python benchmarks/alltypesstr.py [rows]
+"""
+import decimal
+import sys
+import timeit
+from collections import OrderedDict, namedtuple
+from typing import Dict
+
+import app.include.Spartacus.Database as Database
+import psycopg2.extras
+
+Column = namedtuple("Column", ["name", "type_code"])
+
+DESCRIPTION = [
+    Column("id", 23),
+    Column("name", 25),
+    Column("price", 1700),
+    Column("created_at", 1114),
+    Column("ratio", 701),
+    Column("active", 16),
+    Column("tags", 1009),
+    Column("note", 1043),
+]
+
+
+class FakeCursor:
+    def __init__(self):
+        self.description = DESCRIPTION
+        self.index = OrderedDict((c.name, i) for i, c in enumerate(DESCRIPTION))
+
+
+def build_rows(count):
+    cursor = FakeCursor()
+    rows = []
+    for i in range(count):
+        row = psycopg2.extras.DictRow(cursor)
+        row[:] = [
+            i,
+            "customer {0}".format(i),
+            decimal.Decimal("{0}.99".format(i % 1000)),
+            "2024-01-02 03:04:05.{0:06d}".format(i % 1000000),
+            i / 7,
+            i % 2 == 0,
+            ["a", "b"],
+            None if i % 5 == 0 else "note",
+        ]
+        rows.append(row)
+    return rows
+
+
+def legacy(connection, rows):
+    for i in range(0, len(rows)):
+        for j in range(0, len(DESCRIPTION)):
+            if rows[i][j] != None:
+                rows[i][j] = connection.String(rows[i][j])
+    return rows
+
+
+def vectorized(connection, rows):
+    converters = connection.GetStringConverters(DESCRIPTION)
+    return connection.ConvertColumns(rows, converters)
+
+
+def benchmark(count: int = 10000) -> Dict[str, float]:
+    """Converts count rows the legacy and the vectorized way.
+
+    Args:
+        count (int, optional): Number of rows. Defaults to 10000.
+
+    Returns:
+        Dict[str, float]: Rows/sec of the best of 5 runs, keyed by "legacy" and
+            "vectorized".
+    """
+    connection = Database.PostgreSQL("localhost", 5432, "postgres", "postgres", "")
+    assert [list(r) for r in legacy(connection, build_rows(100))] == vectorized(
+        connection, build_rows(100)
+    )
+    results = {}
+    for name, function in (("legacy", legacy), ("vectorized", vectorized)):
+        elapsed = min(
+            timeit.repeat(
+                "function(connection, rows)",
+                setup="rows = build_rows(count)",
+                globals={**globals(), "function": function, "connection": connection, "count": count},
+                number=1,
+                repeat=5,
+            )
+        )
+        results[name] = count / elapsed
+    return results
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for name, rows_per_sec in benchmark(count).items():
+        print("{0:>10}: {1:>12,.0f} rows/sec".format(name, rows_per_sec))
@@ -25,6 +25,44 @@ CSRF_TRUSTED_ORIGINS = []
 # Max number of threads that can used by each advanced object search request
 THREAD_POOL_MAX_WORKERS = 2
 
+# Memory budget in bytes for query results waiting to be sent to each browser session.
+# Results above the budget slow down the query thread and are then kept in a temporary file
+#CLIENT_QUEUE_MAX_BYTES = 1024**2 * 64
+
+# Worker threads of the webserver. Browser tabs with running requests hold one of them for a push stream,
+# at most PUSH_MAX_STREAMS at once, the others fall back to long polling. Keep it above PUSH_MAX_STREAMS
+#SERVER_THREAD_POOL = 30
+#PUSH_MAX_STREAMS = 20
+
+# Seconds during which catalog queries used by the tree and autocomplete are served from cache, 0 disables it
+#CATALOG_CACHE_TTL = 300
+
+# Max number of idle database connections kept for reuse by the tree and metadata requests
+#CONNECTION_POOL_MAX_IDLE = 20
+
+# Share monitoring dashboard data between everyone watching the same database, sampling each widget once per interval
+#MONITORING_SAMPLER_ENABLED = True
+
+# Keep the history of timeseries monitoring widgets in an SQLite file, downsampled to 10s, 1min and 15min points
+#MONITORING_STORE_ENABLED = True
+
+# Number of connections an advanced object search runs its statements on
+#ADVANCED_OBJECT_SEARCH_MAX_WORKERS = 4
+
+# Query and console history kept per connection and per user, older entries are removed hourly.
+# Disabled by default, 0 keeps everything
+#HISTORY_MAX_AGE_DAYS = 365
+#HISTORY_MAX_ROWS_PER_CONNECTION = 10000
+#HISTORY_MAX_ROWS_PER_USER = 100000
+
+# Snippets of at least this many characters are stored zlib compressed in the history, 0 disables compression
+#HISTORY_SNIPPET_COMPRESS_SIZE = 16384
+
+# Backups running at once across all users, the others wait in a queue. Directory backups with
+# the number of jobs set to auto use at most BACKUP_MAX_DUMP_JOBS pg_dump workers
+#BACKUP_MAX_CONCURRENT_JOBS = 4
+#BACKUP_MAX_DUMP_JOBS = 8
+
 # List of domains that PgManage can serve. '*' serves all domains
 ALLOWED_HOSTS = ['*']
 
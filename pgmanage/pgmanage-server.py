@@ -482,6 +482,7 @@ class DjangoApplication(object):
             v_cherrypy_config = {
                 'server.socket_host': parameters['listening_address'],
                 'server.socket_port': port,
+                'server.thread_pool': pgmanage.settings.SERVER_THREAD_POOL,
                 'engine.autoreload_on': False,
                 'log.screen': False,
                 'log.access_file': '',
@@ -213,6 +213,74 @@ CH_CMDS_PER_PAGE = 20
 PWD_TIMEOUT_TOTAL = 1800
 PWD_TIMEOUT_REFRESH = 300
 THREAD_POOL_MAX_WORKERS = 2
+# responses waiting to be delivered to a browser session
+CLIENT_QUEUE_MAX_BYTES = 1024**2 * 64
+CLIENT_QUEUE_MAX_SPILL_BYTES = 1024**3
+CLIENT_QUEUE_PUT_TIMEOUT = 5
+CLIENT_POLLING_TIMEOUT = 30
+PUSH_KEEPALIVE_INTERVAL = 15
+# worker threads of the CherryPy server, each open push stream holds one of them
+SERVER_THREAD_POOL = 30
+# push streams open at once, the browsers of further streams fall back to long polling
+PUSH_MAX_STREAMS = 20
+# catalog query results shared by the tabs of a database, a TTL of 0 disables the cache
+CATALOG_CACHE_TTL = 300
+CATALOG_CACHE_MAX_ENTRIES = 1000
+CATALOG_CACHE_CHECK_INTERVAL = 2
+# idle connections reused by tree and metadata requests
+CONNECTION_POOL_MAX_IDLE = 20
+CONNECTION_POOL_MAX_IDLE_PER_KEY = 2
+CONNECTION_POOL_IDLE_TIMEOUT = 600
+CONNECTION_POOL_MAX_AGE = 3600
+CONNECTION_POOL_HEALTH_CHECK_INTERVAL = 30
+# pooled connections a busy tree connection borrows for concurrent catalog reads
+CONNECTION_POOL_MAX_READERS = 2
+# compiled scripts of user created monitoring widgets, builtin widgets are always kept
+MONITORING_SCRIPT_CACHE_MAX_ENTRIES = 256
+# monitoring widget data sampled once per interval for all dashboards watching a database
+MONITORING_SAMPLER_ENABLED = True
+MONITORING_SAMPLER_BUFFER_SIZE = 120
+MONITORING_SAMPLER_IDLE_TIMEOUT = 60
+MONITORING_SAMPLER_MAX_WORKERS = 4
+MONITORING_SAMPLER_FIRST_SAMPLE_TIMEOUT = 30
+# statistics read by builtin widgets are collected once and shared for this many seconds
+MONITORING_SNAPSHOT_MAX_AGE = 2
+# widgets of a dashboard refreshed in parallel by one batch request
+MONITORING_BATCH_MAX_WORKERS = 4
+# history of timeseries widgets, as (resolution, retention) tiers in seconds
+MONITORING_STORE_ENABLED = True
+MONITORING_STORE_PATH = os.path.join(HOME_DIR, 'monitoring.db')
+MONITORING_STORE_TIERS = ((10, 3600 * 6), (60, 86400 * 2), (900, 86400 * 30))
+MONITORING_STORE_PRUNE_INTERVAL = 300
+MONITORING_STORE_INITIAL_RANGE = 3600
+MONITORING_STORE_MAX_POINTS = 1000
+# connections and per statement timeout in seconds of the advanced object search
+ADVANCED_OBJECT_SEARCH_MAX_WORKERS = 4
+ADVANCED_OBJECT_SEARCH_STATEMENT_TIMEOUT = 60
+# query and console history written in batches by a background thread
+HISTORY_WRITER_ENABLED = True
+HISTORY_WRITER_FLUSH_INTERVAL = 0.5
+HISTORY_WRITER_BATCH_SIZE = 200
+HISTORY_WRITER_QUEUE_SIZE = 10000
+# history retention, limits set to 0 or None are disabled, admins opt in from config.py
+HISTORY_MAX_AGE_DAYS = 0
+HISTORY_MAX_ROWS_PER_CONNECTION = 0
+HISTORY_MAX_ROWS_PER_USER = 0
+# snippets of at least this many characters are stored once, compressed from the second size
+HISTORY_SNIPPET_DEDUP_SIZE = 1024
+HISTORY_SNIPPET_COMPRESS_SIZE = 16384
+HISTORY_COMPACTION_INTERVAL = 3600
+HISTORY_COMPACTION_BATCH_SIZE = 500
+# background job logs pushed to the clients watching a job
+JOB_LOG_BATCH_LINES = 10000
+JOB_LOG_READ_SIZE = 1024**2
+JOB_LOG_POLL_INTERVAL = 0.2
+JOB_PROGRESS_INTERVAL = 1
+# backup jobs running at once, further backups are queued until one finishes
+BACKUP_MAX_CONCURRENT_JOBS = 4
+# upper bound of the pg_dump --jobs picked for directory backups set to auto
+BACKUP_MAX_DUMP_JOBS = 8
+BACKUP_SCHEDULER_INTERVAL = 1
 MASTER_PASSWORD_REQUIRED = custom_settings.DESKTOP_MODE
 
 DJANGO_VITE_DEV_MODE = DEBUG
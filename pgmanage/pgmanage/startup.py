@@ -21,3 +21,8 @@ def clean_temp_folder(p_all_files = False):
 
 def startup_procedure():
     clean_temp_folder(True)
+    # imported here, the scheduler needs the django apps loaded, and through the
+    # views like the urls do since app.bgjob.jobs imports app.views.polling
+    import app.views
+    from app.bgjob.backup_scheduler import backup_scheduler
+    backup_scheduler.terminate_orphaned_jobs()